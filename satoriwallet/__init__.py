@@ -1,5 +1,5 @@
 from satoriwallet import api
-from satoriwallet.api import Electrumx, ElectrumxAPI
+from satoriwallet.api import Electrumx, ElectrumxAPI, AsyncElectrumx, AsyncElectrumxAPI
 from satoriwallet.lib import ravencoin, evrmore
 from satoriwallet.lib.connection import authPayload
 from satoriwallet.lib.transaction import TxUtils, AssetTransaction, Validate
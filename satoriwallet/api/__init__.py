@@ -1,2 +1,7 @@
 from satoriwallet.api.blockchain.electrumx.electrumx import Electrumx
+from satoriwallet.api.blockchain.electrumx.asyncelectrumx import AsyncElectrumx
 from satoriwallet.api.electrumx import ElectrumxAPI
+from satoriwallet.api.asyncelectrumx import AsyncElectrumxAPI
+from satoriwallet.api.holders import HolderScanner, HolderSnapshot
+from satoriwallet.api.multiaddress import MultiAddressClient
+from satoriwallet.api.headers import HeaderTracker
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import random
+from typing import Union, Dict
+from satoriwallet.api.blockchain import AsyncElectrumx
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+from satoriwallet.api.cache import TransactionCache
+from satoriwallet.api.electrumx import ElectrumxAPI
+
+
+class AsyncElectrumxAPI():
+    '''
+    asyncio version of ElectrumxAPI. many instances can share one
+    AsyncElectrumx connection, pass it in as connection. otherwise call
+    connect() once before use.
+    '''
+
+    def __init__(
+        self,
+        address: str,
+        scripthash: str,
+        servers: list[str],
+        chain: str,
+        connection: AsyncElectrumx = None,
+        type: str = 'wallet',
+        timeout: int = 5,
+        retryAttempts: int = 3,
+        onScripthashNotification=None,
+        onBlockNotification=None,
+        transactionCache: TransactionCache = None,
+    ):
+        self.chain = chain
+        self.address = address
+        self.scripthash = scripthash
+        self.servers = servers
+        self.timeout = timeout
+        self.retryAttempts = retryAttempts
+        self.conn = connection
+        self.onScripthashNotification = onScripthashNotification
+        self.onBlockNotification = onBlockNotification
+        self.type = type
+        self.transactionCache = transactionCache or TransactionCache.default()
+
+    def connected(self) -> bool:
+        return self.conn is not None and self.conn.connected()
+
+    async def connect(self) -> AsyncElectrumx:
+        if self.connected():
+            return self.conn
+        if len(self.servers) == 0:
+            raise Exception("No servers available")
+        if self.conn is not None:
+            for _ in range(self.retryAttempts):
+                try:
+                    await self.conn.reconnect()
+                    return self.conn
+                except Exception as _:
+                    await asyncio.sleep(1)
+            raise Exception('unable to connect to electrumx servers')
+        servers = random.sample(self.servers, len(self.servers))
+        for hostPort in servers:
+            try:
+                self.conn = await AsyncElectrumx.create(
+                    host=hostPort.split(':')[0],
+                    port=int(hostPort.split(':')[1]),
+                    ssl=True)
+                return self.conn
+            except Exception as e:
+                logging.error(f'error connecting to {hostPort}: {e}')
+        raise Exception('unable to connect to electrumx servers')
+
+    async def disconnect(self):
+        if self.conn is not None:
+            await self.conn.disconnect()
+
+    async def _sendRequest(self, method: str, *params):
+        if not self.connected():
+            await self.connect()
+        try:
+            return ElectrumxAPI.interpret(await self.conn.send(method, *params))
+        except asyncio.TimeoutError as e:
+            logging.error(f"Timeout during {method}: {str(e)}")
+            raise
+        except Exception as e:
+            logging.error(f"Error during {method}: {str(e)}")
+            raise
+
+    async def batch(self, calls: list[tuple]) -> list:
+        ''' same contract as ElectrumxAPI.batch '''
+        if not self.connected():
+            await self.connect()
+        results = []
+        for response in await self.conn.sendBatch(calls):
+            if response is None:
+                results.append(ElectrumxError('no response'))
+            elif 'error' in response.keys():
+                results.append(ElectrumxError(response.get('error')))
+            else:
+                results.append(ElectrumxAPI.interpret(response))
+        return results
+
+    async def getCurrency(self):
+        result = await self._sendRequest(
+            'blockchain.scripthash.get_balance', self.scripthash)
+        return (result or {}).get('confirmed', 0) + (result or {}).get('unconfirmed', 0)
+
+    async def getBanner(self):
+        try:
+            return await self._sendRequest('server.banner')
+        except Exception as e:
+            logging.error(f"Error getting banner: {str(e)}")
+            return "timeout error - unable to get banner"
+
+    async def getTransactionHistory(self):
+        try:
+            return await self._sendRequest(
+                'blockchain.scripthash.get_history', self.scripthash)
+        except Exception as e:
+            logging.error(f"Error getting transaction history: {str(e)}")
+            return []
+
+    async def getUnspentCurrency(self):
+        return await self._sendRequest(
+            'blockchain.scripthash.listunspent', self.scripthash)
+
+    async def getUnspentAssets(self):
+        if self.chain == 'Evrmore':
+            return await self._sendRequest(
+                'blockchain.scripthash.listunspent',
+                self.scripthash,
+                'SATORI')
+        else:
+            return await self._sendRequest(
+                'blockchain.scripthash.listassets',
+                self.scripthash)
+
+    async def getBalance(self):
+        if self.chain == 'Evrmore':
+            balances = await self._sendRequest(
+                'blockchain.scripthash.get_asset_balance', self.scripthash, 'SATORI')
+            return balances.get('confirmed', 0) + balances.get('unconfirmed', 0)
+        else:
+            return (await self._sendRequest(
+                'blockchain.scripthash.get_asset_balance', self.scripthash)).get('confirmed', {}).get('SATORI', 0)
+
+    async def getStats(self):
+        return await self._sendRequest('blockchain.asset.get_meta', 'SATORI')
+
+    async def getTransaction(self, tx_hash: str, cached: bool = False):
+        ''' with cached, the transaction without its chain fields may come from the cache '''
+        if cached:
+            tx = self.transactionCache.get(tx_hash)
+            if tx is not None:
+                return tx
+        tx = await self._sendRequest('blockchain.transaction.get', tx_hash, True)
+        self.transactionCache.put(tx_hash, tx)
+        return TransactionCache.body(tx) if cached else tx
+
+    async def getAssetBalanceForHolder(self, scripthash: str):
+        return (await self._sendRequest(
+            'blockchain.scripthash.get_asset_balance', scripthash)).get('confirmed', {}).get('SATORI', 0)
+
+    async def getAssetHolders(self, target_address: Union[str, None] = None, throttle: Union[float, None] = None) -> Dict[str, int]:
+        addresses = {}
+        i = 0
+        while True:
+            response = await self._sendRequest(
+                'blockchain.asset.list_addresses_by_asset', 'SATORI', False, 1000, i)
+            if target_address is not None and target_address in response.keys():
+                return {target_address: response[target_address]}
+            addresses.update(response)
+            if len(response) < 1000:
+                break
+            i += 1000
+            if throttle is not None:
+                await asyncio.sleep(throttle)
+        return addresses
+
+    async def broadcast(self, raw_tx: str):
+        self.sentTx = await self._sendRequest(
+            'blockchain.transaction.broadcast', raw_tx)
+        return self.sentTx
+
+    async def makeSubscriptions(self):
+        await self.subscribeScriptHash()
+        if self.type == 'vault':
+            await self.subscribeBlockHeaders()
+
+    def _onScripthashNotification(self, notification: dict):
+        if callable(self.onScripthashNotification):
+            return self.onScripthashNotification(notification)
+
+    def _onBlockNotification(self, notification: dict):
+        if callable(self.onBlockNotification):
+            return self.onBlockNotification(notification)
+
+    async def subscribeScriptHash(self):
+        ''' returns the initial status hash of self.scripthash '''
+        if not self.connected():
+            await self.connect()
+        initial_status = ElectrumxAPI.interpret(
+            await self.conn.subscribeScripthash(
+                self.scripthash,
+                self._onScripthashNotification))
+        logging.debug(
+            f"Initial status for scripthash {self.scripthash}: {initial_status}")
+        return initial_status
+
+    async def subscribeBlockHeaders(self):
+        if not self.connected():
+            await self.connect()
+        initial_status_header = ElectrumxAPI.interpret(
+            await self.conn.subscribeHeaders(self._onBlockNotification))
+        logging.debug(f"Initial status for header: {initial_status_header}")
+        return initial_status_header
+
+    async def stopScripthashSubscription(self):
+        try:
+            await self.conn.unsubscribeScripthash(
+                self.scripthash,
+                self._onScripthashNotification)
+            logging.debug(
+                f"Unsubscribed from scripthash {self.scripthash}")
+        except Exception as e:
+            logging.error(
+                f"Error while unsubscribing from scripthash {self.scripthash}: {str(e)}")
@@ -1 +1,6 @@
 from .electrumx.electrumx import Electrumx
+from .electrumx.asyncelectrumx import AsyncElectrumx
+from .electrumx.pool import ConnectionPool
+from .electrumx.ratelimit import RateLimiter
+from .electrumx.scoreboard import ServerScoreboard
+from .electrumx.subscriptions import SubscriptionManager
@@ -1 +1,6 @@
 from .electrumx import Electrumx
+from .asyncelectrumx import AsyncElectrumx
+from .pool import ConnectionPool
+from .ratelimit import RateLimiter
+from .scoreboard import ServerScoreboard
+from .subscriptions import SubscriptionManager
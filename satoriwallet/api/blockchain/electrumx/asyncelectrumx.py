@@ -0,0 +1,287 @@
+from typing import Union, Callable
+import asyncio
+import inspect
+import itertools
+import logging
+import json
+import ssl
+import time
+from satoriwallet.api.blockchain.electrumx.ratelimit import RateLimiter
+
+
+class AsyncElectrumx():
+    '''
+    asyncio counterpart to Electrumx. one connection carries requests and
+    subscriptions alike: responses are matched to callers by json-rpc id and
+    notifications are routed to callbacks by scripthash, so a single event
+    loop can serve many wallets over one socket.
+    '''
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ssl: bool = False,
+        timeout: int = 10*60,
+        network: str = 'mainnet',
+        limiter: Union[RateLimiter, None] = None,
+    ):
+        self.log = logging.getLogger(type(self).__name__)
+        self.host = host
+        self.port = port
+        self.ssl = port == 50002 or ssl
+        self.timeout = timeout
+        self.network = network
+        self.limiter = limiter or RateLimiter.default()
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+        self.readTask: asyncio.Task = None
+        self.ids = itertools.count(int(time.time()*1000))
+        self.pending: dict[int, asyncio.Future] = {}
+        self.scripthashCallbacks: dict[str, list[Callable]] = {}
+        self.scripthashStatuses: dict[str, Union[str, None]] = {}
+        self.headerCallbacks: list[Callable] = []
+        self.lastHandshake = 0
+        self.handshaked = None
+
+    @staticmethod
+    async def create(*args, **kwargs) -> 'AsyncElectrumx':
+        ''' returns a connected and handshaked client '''
+        electrumx = AsyncElectrumx(*args, **kwargs)
+        await electrumx.connect()
+        await electrumx.handshake()
+        return electrumx
+
+    def connected(self) -> bool:
+        return (
+            self.writer is not None and
+            not self.writer.is_closing() and
+            self.readTask is not None and
+            not self.readTask.done())
+
+    async def connect(self):
+        await self.disconnect()
+        context = None
+        if self.ssl:
+            # like Connector, this does not verify certificates
+            context = ssl._create_unverified_context()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host,
+                    self.port,
+                    ssl=context,
+                    server_hostname=self.host if self.ssl else None,
+                    # verbose transactions and holder pages are single lines
+                    # of hundreds of KB
+                    limit=2**24),
+                timeout=self.timeout)
+        except Exception as e:
+            logging.error(
+                f'error connecting to {self.host}:{str(self.port)} {e}')
+            raise e
+        self.readTask = asyncio.get_running_loop().create_task(self._read())
+
+    async def reconnect(self):
+        ''' reconnects, handshakes and replays all subscriptions '''
+        await self.connect()
+        await self.handshake()
+        if len(self.headerCallbacks) > 0:
+            await self.send('blockchain.headers.subscribe')
+        for scripthash in list(self.scripthashCallbacks.keys()):
+            await self.send('blockchain.scripthash.subscribe', scripthash)
+
+    async def disconnect(self):
+        if self.writer is not None:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception as _:
+                pass
+        if self.readTask is not None:
+            self.readTask.cancel()
+        self.writer = None
+        self.readTask = None
+
+    async def handshake(self):
+        name = f'Satori Neuron {time.time()}'
+        assetApiVersion = '1.10'
+        logging.debug(f'handshake {name} {assetApiVersion}')
+        self.handshaked = await self.send(
+            'server.version',
+            name,
+            assetApiVersion)
+        self.lastHandshake = time.time()
+        return True
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if line == b'':
+                    break
+                try:
+                    message = json.loads(line)
+                except json.decoder.JSONDecodeError as e:
+                    self.log.error(
+                        "JSONDecodeError: {} in message: {} error in _read".format(e, line))
+                    continue
+                self.log.log(5, "_read {}".format(message))
+                for item in message if isinstance(message, list) else [message]:
+                    self._dispatch(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.log.error(f"Socket error during receive: {str(e)}")
+        finally:
+            error = ConnectionError(
+                f'connection to {self.host}:{self.port} closed')
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending = {}
+
+    def _dispatch(self, item: dict):
+        future = self.pending.pop(item.get('id'), None)
+        if future is not None:
+            if not future.done():
+                future.set_result(item)
+            return
+        method = item.get('method')
+        params = item.get('params') or []
+        if method == 'blockchain.scripthash.subscribe' and len(params) == 2:
+            self.scripthashStatuses[params[0]] = params[1]
+            callbacks = self.scripthashCallbacks.get(params[0], [])
+        elif method == 'blockchain.headers.subscribe':
+            callbacks = self.headerCallbacks
+        else:
+            logging.debug(f'no pending request for message: {item}')
+            return
+        for callback in callbacks:
+            try:
+                result = callback(item)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logging.error(f'error in notification callback: {e}')
+
+    async def _wait(self, requestIds: list[int], futures: list[asyncio.Future], timeout: Union[int, None]):
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*futures),
+                timeout=timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.log.warning("Timeout occurred waiting for response.")
+            for requestId in requestIds:
+                self.pending.pop(requestId, None)
+            return [None for _ in futures]
+
+    async def _write(self, payload) -> None:
+        self.writer.write((json.dumps(payload) + '\n').encode())
+        await self.writer.drain()
+
+    async def send(self, method: str, *args, timeout: Union[int, None] = None) -> Union[dict, None]:
+        ''' returns the raw response, None on timeout '''
+        requestId = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[requestId] = future
+        self.log.log(5, "send {} {}".format(method, args))
+        await self._acquire(method)
+        try:
+            await self._write({
+                "jsonrpc": "2.0",
+                "id": requestId,
+                "method": method,
+                "params": args})
+        except Exception as e:
+            self.pending.pop(requestId, None)
+            raise e
+        response = (await self._wait([requestId], [future], timeout))[0]
+        self.limiter.observe(self.hostPort(), method, response)
+        return response
+
+    def hostPort(self) -> str:
+        return f'{self.host}:{self.port}'
+
+    async def _acquire(self, *methods: str):
+        ''' waits, without blocking the loop, for budget in the limiter '''
+        delay = self.limiter.reserve(self.hostPort(), list(methods))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def sendBatch(self, calls: list[tuple], timeout: Union[int, None] = None) -> list[Union[dict, None]]:
+        ''' same contract as Electrumx.sendBatch '''
+        if len(calls) == 0:
+            return []
+        loop = asyncio.get_running_loop()
+        requestIds = [next(self.ids) for _ in calls]
+        futures = [loop.create_future() for _ in calls]
+        for requestId, future in zip(requestIds, futures):
+            self.pending[requestId] = future
+        self.log.log(5, "sendBatch {} calls".format(len(calls)))
+        await self._acquire(*[call[0] for call in calls])
+        try:
+            await self._write([{
+                "jsonrpc": "2.0",
+                "id": requestId,
+                "method": call[0],
+                "params": tuple(call[1:])}
+                for requestId, call in zip(requestIds, calls)])
+        except Exception as e:
+            for requestId in requestIds:
+                self.pending.pop(requestId, None)
+            raise e
+        responses = await self._wait(requestIds, futures, timeout)
+        self.limiter.observeBatch(self.hostPort(), calls, responses)
+        return responses
+
+    async def subscribeScripthash(self, scripthash: str, callback: Callable) -> Union[dict, None]:
+        '''
+        registers callback for notifications on scripthash and returns the
+        raw subscribe response, which carries the current status hash.
+        the server is only asked once per scripthash. if it doesn't take the
+        subscription callback isn't registered.
+        '''
+        callbacks = self.scripthashCallbacks.setdefault(scripthash, [])
+        callbacks.append(callback)
+        if len(callbacks) > 1:
+            return {'result': self.scripthashStatuses.get(scripthash)}
+        try:
+            response = await self.send('blockchain.scripthash.subscribe', scripthash)
+        except Exception as e:
+            self._unregister(scripthash, callback)
+            raise e
+        if not isinstance(response, dict) or 'result' not in response:
+            # not subscribed, so later subscribers must ask the server again
+            self._unregister(scripthash, callback)
+            return response
+        self.scripthashStatuses[scripthash] = response['result']
+        return response
+
+    def _unregister(self, scripthash: str, callback: Callable):
+        callbacks = self.scripthashCallbacks.get(scripthash, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if len(callbacks) == 0:
+            self.scripthashCallbacks.pop(scripthash, None)
+            self.scripthashStatuses.pop(scripthash, None)
+
+    async def unsubscribeScripthash(self, scripthash: str, callback: Union[Callable, None] = None):
+        callbacks = self.scripthashCallbacks.get(scripthash, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if callback is None or len(callbacks) == 0:
+            self.scripthashCallbacks.pop(scripthash, None)
+            self.scripthashStatuses.pop(scripthash, None)
+            return await self.send('blockchain.scripthash.unsubscribe', scripthash)
+
+    async def subscribeHeaders(self, callback: Callable) -> Union[dict, None]:
+        self.headerCallbacks.append(callback)
+        try:
+            response = await self.send('blockchain.headers.subscribe')
+        except Exception as e:
+            self.headerCallbacks.remove(callback)
+            raise e
+        if not isinstance(response, dict) or 'result' not in response:
+            self.headerCallbacks.remove(callback)
+        return response
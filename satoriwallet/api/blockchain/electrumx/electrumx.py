@@ -1,15 +1,66 @@
 from typing import Union
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import itertools
 import logging
 import socket
 import json
 import time
 import threading
 from satoriwallet.api.blockchain.electrumx.connector import Connector
+from satoriwallet.api.blockchain.electrumx.framing import FrameReader
+from satoriwallet.api.blockchain.electrumx.ratelimit import RateLimiter
+
+
+class ElectrumxError(Exception):
+    ''' an error object returned by the server for a single request '''
+
+    def __init__(self, error: Union[dict, str, None]):
+        if not isinstance(error, dict):
+            error = {'message': str(error)}
+        self.code = error.get('code')
+        self.message = error.get('message')
+        super().__init__(f'{self.code}: {self.message}')
 
 
 class Electrumx(Connector):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        pipelined: bool = False,
+        subscriptions: bool = True,
+        keepaliveInterval: Union[int, None] = 60,
+        onNotification: Union[callable, None] = None,
+        limiter: Union[RateLimiter, None] = None,
+        **kwargs
+    ):
         self.log = logging.getLogger(type(self).__name__)
+        # sessions that only serve requests, like those in a ConnectionPool,
+        # skip opening the wallet and vault subscription sockets.
+        self.subscriptions = subscriptions
+        # pipelined mode lets many requests be in flight on the main
+        # connection at once, a background reader routes each response to
+        # its caller by json-rpc id.
+        self.pipelined = pipelined
+        self.ids = itertools.count(int(time.time()*1000))
+        self.pending: dict[int, tuple[socket.socket, Future]] = {}
+        self.pendingLock = threading.Lock()
+        self.writeLock = threading.Lock()
+        self.pipelineThread: threading.Thread = None
+        self.frameReaders: dict[socket.socket, FrameReader] = {}
+        self.frameReadersLock = threading.Lock()
+        # liveness is judged from real traffic, a background ping keeps
+        # idle connections (which servers time out) busy enough to judge.
+        self.keepaliveInterval = keepaliveInterval
+        self.keepaliveThread: threading.Thread = None
+        # in pipelined mode, server notifications arriving on the main
+        # connection are handed to this callable
+        self.onNotification = onNotification
+        # subscribe requests sent on the subscription sockets by id, their
+        # replies come back in the notification streams
+        self.subscriptionRequests: dict[int, tuple[str, tuple]] = {}
+        # requests wait for budget in the per server limiter, shared by
+        # every connection in the process unless one is given
+        self.limiter = limiter or RateLimiter.default()
         super(type(self), self).__init__(*args, **kwargs)
         self.lock = threading.Lock()  # Lock for general connection
         self.walletSubscriptionLock = threading.Lock()  # Lock for subscriptions
@@ -20,49 +71,32 @@ class Electrumx(Connector):
 
     def connect(self) -> bool:
         super().connect()
-        super().connectSubscriptions()
+        self._frameReader(self.connection)
+        if self.subscriptions:
+            super().connectSubscriptions()
+            self._frameReader(self.connectionWalletSubscription)
+            self._frameReader(self.connectionVaultSubscription)
+        if self.pipelined:
+            self.startPipeline()
+        if self.keepaliveInterval:
+            self.startKeepalive()
 
     def connected(self) -> bool:
+        '''
+        no round trip: the connection is up if it hasn't failed and, when
+        keepalive is on, it has received something in the last few intervals.
+        '''
         if self.connection is None:
             return False
-        try:
-            logging.debug('checking connected')
-            # Test the connection by sending a lightweight request
-            response = self.send('server.ping')
-            if response is None:
-                logging.debug('checking connected - False')
-                return False
-            logging.debug('checking connected - True')
-            return True
-        except Exception as e:
-            self.log.error(f"Connection check failed: {e}")
-            logging.debug(f'checking connected - {e}')
-            return False
-        # if self.send('server.ping') == None:
-        #    return False
-        # return True
+        return self._frameReader(self.connection).alive(
+            staleAfter=self.keepaliveInterval * 3 if self.keepaliveInterval else None)
 
     def connectedSubscription(self, conn: socket.socket) -> bool:
         if conn is None:
             conn = self.connectionWalletSubscription
-        if self.connectionWalletSubscription is None:
-            return False
-        try:
-            logging.debug('checking connected')
-            # Test the connection by sending a lightweight request
-            response = self.send('server.ping')
-            if response is None:
-                logging.debug('checking connected - False')
-                return False
-            logging.debug('checking connected - True')
-            return True
-        except Exception as e:
-            self.log.error(f"Connection check failed: {e}")
-            logging.debug(f'checking connected - {e}')
+        if conn is None:
             return False
-        # if self.send('server.ping') == None:
-        #    return False
-        # return True
+        return self._frameReader(conn).alive()
 
     def connectedWalletSubscription(self) -> bool:
         return self.connectedSubscription(self.connectionWalletSubscription)
@@ -80,6 +114,8 @@ class Electrumx(Connector):
                 name,
                 assetApiVersion)
             self.lastHandshake = time.time()
+            if not self.subscriptions:
+                return True
             self.handshakedWalletSubscription = self.sendWalletSubscription(
                 'server.version',
                 f'Satori Wallet {time.time()}',
@@ -94,104 +130,363 @@ class Electrumx(Connector):
         except Exception as e:
             logging.error(f'error in handshake initial {e}')
 
-    def _receive(self, timeout: Union[int, None] = None) -> Union[dict, list, None]:
+    def startKeepalive(self):
+        ''' starts pinging self.connection whenever it has been idle '''
+        self.keepaliveThread = threading.Thread(
+            target=self._keepalive,
+            args=(self.connection,),
+            name=f'ElectrumxKeepalive {self.host}:{self.port}',
+            daemon=True)
+        self.keepaliveThread.start()
+
+    def _keepalive(self, conn: socket.socket):
+        reader = self._frameReader(conn)
+        while True:
+            time.sleep(self.keepaliveInterval)
+            if conn is not self.connection or not reader.alive():
+                break
+            if time.time() - reader.lastRead < self.keepaliveInterval:
+                continue
+            try:
+                logging.debug('keepalive ping')
+                if self.send('server.ping', timeout=min(self.keepaliveInterval, 30)) is None:
+                    logging.debug('keepalive ping got no response')
+                if self.subscriptions:
+                    # replies arrive in the notification streams and keep
+                    # the server from timing out idle subscription sessions
+                    self.sendWalletSubscription('server.ping')
+                    self.sendVaultSubscription('server.ping')
+            except Exception as e:
+                logging.debug(f'keepalive ping failed: {e}')
+
+    def _markFailed(self, conn: socket.socket):
+        self._frameReader(conn).failed = True
+
+    def _frameReader(self, conn: socket.socket) -> FrameReader:
+        '''
+        each socket keeps its own buffer of partial and complete frames.
+        connect() makes the readers up front, this only makes one for a
+        socket opened elsewhere (a reconnected subscription, say).
+        '''
+        reader = self.frameReaders.get(conn)
+        if reader is not None:
+            return reader
+        with self.frameReadersLock:
+            reader = self.frameReaders.get(conn)
+            if reader is None:
+                self.frameReaders = {
+                    c: r for c, r in self.frameReaders.items() if not r.closed()}
+                reader = FrameReader(conn)
+                self.frameReaders[conn] = reader
+        return reader
+
+    def _receiveFrom(self, conn: socket.socket, timeout: Union[int, None] = None) -> Union[dict, list, None]:
         if timeout is not None:
-            self.connection.settimeout(timeout)
-        buffer = ''
+            conn.settimeout(timeout)
         try:
-            while True:
-                try:
-                    raw = self.connection.recv(1024 * 16).decode('utf-8')
-                    buffer += raw
-                    if raw == '':
-                        return None
-                    if '\n' in raw:
-                        # Split on the first newline to handle multiple messages
-                        message, _, buffer = buffer.partition('\n')
-                        try:
-                            r = json.loads(message)
-                            self.log.log(5, "_receive {}".format(r))
-                            return r  # Return the parsed JSON object
-                        except json.decoder.JSONDecodeError as e:
-                            # Log the error and the problematic message part
-                            self.log.error(
-                                "JSONDecodeError: {} in message: {} error in _receive".format(e, message))
-                            # Optionally continue or break depending on the scenario
-                            break
-                except socket.timeout:
-                    self.log.warning("Socket timeout occurred during receive.")
-                    return None  # Timeout, no message received
-                except Exception as e:
-                    self.log.error(f"Socket error during receive: {str(e)}")
-                    return None
+            message = self._frameReader(conn).read()
+            if message is None:
+                return None
+            r = json.loads(message)
+            self.log.log(5, "_receive {}".format(r))
+            return r  # Return the parsed JSON object
+        except json.decoder.JSONDecodeError as e:
+            # Log the error and the problematic message part
+            self.log.error(
+                "JSONDecodeError: {} in message: {} error in _receive".format(e, message))
+        except socket.timeout:
+            self.log.warning("Socket timeout occurred during receive.")
+            return None  # Timeout, no message received
+        except Exception as e:
+            self.log.error(f"Socket error during receive: {str(e)}")
+            return None
         finally:
             # Reset the timeout to blocking mode
-            self.connection.settimeout(None)
+            conn.settimeout(None)
         return None
 
+    def _receive(self, timeout: Union[int, None] = None) -> Union[dict, list, None]:
+        return self._receiveFrom(self.connection, timeout)
+
+    def _receiveResponse(self, requestIds: list[int], timeout: Union[int, None] = None) -> Union[dict, list, None]:
+        '''
+        the response to requestIds on self.connection, without a pipeline.
+        anything else that comes first (a late reply to a timed out request,
+        a notification) is not ours and is skipped, so one slow reply can't
+        shift every later caller onto the wrong response.
+        '''
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+            response = self._receiveFrom(self.connection, remaining)
+            if response is None:
+                return None
+            items = response if isinstance(response, list) else [response]
+            if any(
+                isinstance(item, dict) and (
+                    item.get('id') in requestIds or
+                    # the server couldn't parse or rejected the whole batch
+                    (item.get('id') is None and 'error' in item))
+                for item in items
+            ):
+                return response
+            for item in items:
+                if isinstance(item, dict) and 'method' in item and callable(self.onNotification):
+                    try:
+                        self.onNotification(item)
+                    except Exception as e:
+                        logging.error(f'error handling notification: {e}')
+                else:
+                    logging.debug(f'skipping response for another request: {item}')
+
     def _receiveSubscriptions(self, conn: socket.socket, timeout: Union[int, None] = None) -> Union[dict, list, None]:
         if conn is None:
             conn = self.connectionWalletSubscription
-        if timeout is not None:
-            conn.settimeout(timeout)
-        buffer = ''
+        return self._receiveFrom(conn, timeout)
+
+    def startPipeline(self):
+        ''' starts the reader that routes responses on self.connection '''
+        self.pipelineThread = threading.Thread(
+            target=self._readPipeline,
+            args=(self.connection,),
+            name=f'ElectrumxPipeline {self.host}:{self.port}',
+            daemon=True)
+        self.pipelineThread.start()
+
+    def _readPipeline(self, conn: socket.socket):
+        '''
+        reads responses off the connection until it closes, resolving the
+        pending future with the matching id for each one.
+        '''
+        reader = self._frameReader(conn)
         try:
             while True:
                 try:
-                    raw = conn.recv(
-                        1024 * 16).decode('utf-8')
-                    buffer += raw
-                    if '\n' in raw:
-                        # Split on the first newline to handle multiple messages
-                        message, _, buffer = buffer.partition('\n')
-                        try:
-                            r = json.loads(message)
-                            self.log.log(5, "_receive {}".format(r))
-                            return r  # Return the parsed JSON object
-                        except json.decoder.JSONDecodeError as e:
-                            # Log the error and the problematic message part
-                            self.log.error(
-                                "JSONDecodeError: {} in message: {} error in _receiveSubscriptions".format(e, message))
-                            # Optionally continue or break depending on the scenario
-                            break
+                    message = reader.read()
                 except socket.timeout:
-                    self.log.warning("Socket timeout occurred during receive.")
-                    return None  # Timeout, no message received
-                except Exception as e:
-                    self.log.error(f"Socket error during receive: {str(e)}")
-                    return None
+                    continue
+                if message is None:
+                    break
+                self._dispatch(message)
+        except Exception as e:
+            logging.debug(f'pipeline reader stopped: {e}')
         finally:
-            # Reset the timeout to blocking mode
-            conn.settimeout(None)
-        return None
+            # marked before failing what's pending, so a request registered
+            # after this sees the reader is gone instead of waiting on it
+            reader.failed = True
+            self._failPending(
+                conn,
+                ConnectionError(f'connection to {self.host}:{self.port} closed'))
 
-    def send(self, method: str, *args, **kwargs):
-        payload = json.dumps({
+    def _dispatch(self, message: bytes):
+        try:
+            response = json.loads(message)
+        except json.decoder.JSONDecodeError as e:
+            self.log.error(
+                "JSONDecodeError: {} in message: {} error in _dispatch".format(e, message))
+            return
+        self.log.log(5, "_dispatch {}".format(response))
+        # a batch comes back as one array, its items resolve independently
+        for item in response if isinstance(response, list) else [response]:
+            with self.pendingLock:
+                _, future = self.pending.pop(item.get('id'), (None, None))
+            if future is None and 'method' in item and callable(self.onNotification):
+                try:
+                    self.onNotification(item)
+                except Exception as e:
+                    logging.error(f'error handling notification: {e}')
+                continue
+            if future is None:
+                logging.debug(f'no pending request for message: {item}')
+                continue
+            if not future.done():
+                future.set_result(item)
+
+    def _failPending(self, conn: socket.socket, error: Exception):
+        with self.pendingLock:
+            failed = [
+                (requestId, future)
+                for requestId, (pendingConn, future) in self.pending.items()
+                if pendingConn is conn]
+            for requestId, _ in failed:
+                self.pending.pop(requestId)
+        for _, future in failed:
+            if not future.done():
+                future.set_exception(error)
+
+    @staticmethod
+    def _request(requestId: int, method: str, args: tuple) -> dict:
+        return {
             "jsonrpc": "2.0",
-            "id": int(time.time()*1000),
+            "id": requestId,
             "method": method,
-            "params": args
-        }) + '\n'
-        payload = payload.encode()
+            "params": args}
+
+    def _payload(self, requestId: int, method: str, args: tuple) -> bytes:
+        return (json.dumps(Electrumx._request(requestId, method, args)) + '\n').encode()
+
+    def sendAsync(self, method: str, *args, **kwargs) -> Future:
+        '''
+        returns a future of the raw response. in pipelined mode the request
+        is written immediately and the future is resolved by the reader, so
+        many requests can be in flight at once. otherwise this is a blocking
+        send wrapped in an already resolved future.
+        '''
+        future = Future()
+        if not self.pipelined:
+            try:
+                future.set_result(self.send(method, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.limiter.acquire(self.hostPort(), method)
+        future.add_done_callback(lambda f: self._observe(method, f))
+        requestId = next(self.ids)
+        conn = self.connection
+        with self.pendingLock:
+            self.pending[requestId] = (conn, future)
+        # a future failed or cancelled by its caller won't be answered
+        future.add_done_callback(lambda f: self._forget(requestId))
+        if not self._pipelineAlive(conn):
+            with self.pendingLock:
+                self.pending.pop(requestId, None)
+            future.set_exception(
+                ConnectionError(f'connection to {self.host}:{self.port} closed'))
+            return future
+        self.log.log(5, "sendAsync {} {}".format(method, args))
+        try:
+            with self.writeLock:
+                conn.sendall(self._payload(requestId, method, args))
+        except Exception as e:
+            self._markFailed(conn)
+            with self.pendingLock:
+                self.pending.pop(requestId, None)
+            future.set_exception(e)
+        return future
+
+    def _forget(self, requestId: int):
+        with self.pendingLock:
+            self.pending.pop(requestId, None)
+
+    def _pipelineAlive(self, conn: socket.socket) -> bool:
+        ''' is a reader still there to resolve requests written to conn '''
+        return (
+            conn is not None and
+            self.pipelineThread is not None and
+            self.pipelineThread.is_alive() and
+            self._frameReader(conn).alive())
+
+    def _wait(self, future: Future, timeout: Union[int, None] = None) -> Union[dict, list, None]:
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            self.log.warning("Timeout occurred waiting for pipelined response.")
+            with self.pendingLock:
+                for requestId, (_, pendingFuture) in list(self.pending.items()):
+                    if pendingFuture is future:
+                        self.pending.pop(requestId)
+            return None
+
+    def send(self, method: str, *args, **kwargs):
+        if self.pipelined:
+            return self._wait(
+                self.sendAsync(method, *args),
+                timeout=kwargs.get('timeout'))
+        requestId = next(self.ids)
+        payload = self._payload(requestId, method, args)
         self.log.log(5, "send {} {}".format(method, args))
+        self.limiter.acquire(self.hostPort(), method)
+        with self.lock:
+            self._sendRaw(self.connection, payload)
+            response = self._receiveResponse([requestId], timeout=kwargs.get('timeout'))
+        self.limiter.observe(self.hostPort(), method, response)
+        return response
+
+    def hostPort(self) -> str:
+        return f'{self.host}:{self.port}'
+
+    def _observe(self, method: str, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.limiter.observe(self.hostPort(), method, future.result())
+
+    def _sendRaw(self, conn: socket.socket, payload: bytes):
+        try:
+            conn.sendall(payload)
+        except Exception as e:
+            self._markFailed(conn)
+            raise e
+
+    def sendBatch(self, calls: list[tuple], **kwargs) -> list[Union[dict, None]]:
+        '''
+        sends calls like [('blockchain.transaction.get', txid, True), ...] as
+        one json-rpc array and returns the raw responses in the same order.
+        a call the server did not answer comes back as None.
+        '''
+        if len(calls) == 0:
+            return []
+        requestIds = [next(self.ids) for _ in calls]
+        payload = (json.dumps([
+            Electrumx._request(requestId, call[0], tuple(call[1:]))
+            for requestId, call in zip(requestIds, calls)
+        ]) + '\n').encode()
+        self.log.log(5, "sendBatch {} calls".format(len(calls)))
+        self.limiter.acquire(self.hostPort(), *[call[0] for call in calls])
+        timeout = kwargs.get('timeout')
+        if self.pipelined:
+            futures = [Future() for _ in calls]
+            conn = self.connection
+            with self.pendingLock:
+                for requestId, future in zip(requestIds, futures):
+                    self.pending[requestId] = (conn, future)
+            if not self._pipelineAlive(conn):
+                with self.pendingLock:
+                    for requestId in requestIds:
+                        self.pending.pop(requestId, None)
+                raise ConnectionError(f'connection to {self.host}:{self.port} closed')
+            try:
+                with self.writeLock:
+                    conn.sendall(payload)
+            except Exception as e:
+                self._markFailed(conn)
+                with self.pendingLock:
+                    for requestId in requestIds:
+                        self.pending.pop(requestId, None)
+                raise e
+            responses = [self._wait(future, timeout=timeout) for future in futures]
+            self.limiter.observeBatch(self.hostPort(), calls, responses)
+            return responses
         with self.lock:
-            self.connection.send(payload)
-            return self._receive(timeout=kwargs.get('timeout'))
+            self._sendRaw(self.connection, payload)
+            responses = self._receiveResponse(requestIds, timeout=timeout)
+        if isinstance(responses, dict):
+            # the server rejected the batch as a whole
+            responses = [{**responses, 'id': requestId} for requestId in requestIds]
+        byId = {r.get('id'): r for r in responses or [] if isinstance(r, dict)}
+        responses = [byId.get(requestId) for requestId in requestIds]
+        self.limiter.observeBatch(self.hostPort(), calls, responses)
+        return responses
 
     def sendSubscription(self, conn: socket.socket = None, method: str = None, *args, **kwargs):
         if method is None:
             return ''
         if conn is None:
             conn = self.connectionWalletSubscription
+        requestId = next(self.ids)
+        if method in ('blockchain.scripthash.subscribe', 'blockchain.headers.subscribe'):
+            self.subscriptionRequests[requestId] = (method, args)
         payload = json.dumps({
             "jsonrpc": "2.0",
-            "id": int(time.time()*1000),
+            "id": requestId,
             "method": method,
             "params": args
         }) + '\n'
         payload = payload.encode()
         self.log.log(5, "send {} {}".format(method, args))
-        conn.send(payload)
+        self._sendRaw(conn, payload)
         return f'subscribed to {payload}'
 
     def sendWalletSubscription(self, method, *args, **kwargs):
@@ -205,12 +500,24 @@ class Electrumx(Connector):
     def receiveNotifications(self, conn: socket.socket):
         """
         Continuously listens for notifications from the server.
+        the reply to a subscribe request is yielded like a notification
+        carrying the current status (or header), with the request's id.
         """
         while True:
             try:
                 update = self._receiveSubscriptions(conn)
                 logging.debug('update: {}'.format(update))
-                if update and 'method' in update:
+                if isinstance(update, dict) and update.get('id') in self.subscriptionRequests:
+                    method, args = self.subscriptionRequests.pop(update.get('id'))
+                    if 'error' in update:
+                        logging.error(f"{method} failed: {update.get('error')}")
+                        continue
+                    yield {
+                        'jsonrpc': '2.0',
+                        'id': update.get('id'),
+                        'method': method,
+                        'params': [*args, update.get('result')]}
+                elif update and 'method' in update:
                     if update['method'] in ['blockchain.scripthash.subscribe', 'blockchain.headers.subscribe', 'blockchain.scripthash.unsubscribe']:
                         yield update
                     else:
@@ -0,0 +1,72 @@
+from typing import Union
+from collections import deque
+import socket
+import time
+
+
+class FrameReader():
+    '''
+    splits the newline delimited json-rpc stream of one socket into frames.
+    bytes are received into a reusable chunk and appended to a bytearray,
+    only newly arrived bytes are scanned for newlines, and every complete
+    frame is queued, so messages that arrive together are never dropped and
+    a partial frame carries over to the next read. it also records when
+    data last arrived and whether the socket has failed, which is how the
+    liveness of a connection is judged without a round trip.
+    '''
+
+    def __init__(self, conn: socket.socket, chunkSize: int = 1024 * 16):
+        self.conn = conn
+        self.chunk = bytearray(chunkSize)
+        self.view = memoryview(self.chunk)
+        self.buffer = bytearray()
+        self.frames: deque[bytes] = deque()
+        self.lastRead = time.time()
+        self.failed = False
+
+    def closed(self) -> bool:
+        return self.conn.fileno() == -1
+
+    def alive(self, staleAfter: Union[float, None] = None) -> bool:
+        ''' no error or eof seen, and traffic within staleAfter seconds '''
+        return (
+            not self.failed and
+            not self.closed() and
+            (staleAfter is None or time.time() - self.lastRead < staleAfter))
+
+    def fill(self) -> int:
+        ''' receives once, queues any frames completed, returns bytes read '''
+        try:
+            received = self.conn.recv_into(self.view)
+        except socket.timeout:
+            raise
+        except Exception as e:
+            self.failed = True
+            raise e
+        if received == 0:
+            self.failed = True
+            return 0
+        self.lastRead = time.time()
+        scanFrom = len(self.buffer)
+        self.buffer += self.view[:received]
+        start = 0
+        end = self.buffer.find(b'\n', scanFrom)
+        while end != -1:
+            if end > start:
+                self.frames.append(bytes(self.buffer[start:end]))
+            start = end + 1
+            end = self.buffer.find(b'\n', start)
+        if start > 0:
+            del self.buffer[:start]
+        return received
+
+    def read(self) -> Union[bytes, None]:
+        '''
+        returns the next complete frame, receiving until one is available.
+        returns None if the connection is closed. socket.timeout propagates
+        and leaves any partial frame buffered.
+        '''
+        while len(self.frames) == 0:
+            if self.fill() == 0:
+                return None
+        return self.frames.popleft()
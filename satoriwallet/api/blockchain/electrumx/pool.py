@@ -0,0 +1,209 @@
+from typing import Union
+from concurrent.futures import Future
+import logging
+import threading
+import time
+from satoriwallet.api.blockchain.electrumx.electrumx import Electrumx
+from satoriwallet.api.blockchain.electrumx.scoreboard import ServerScoreboard
+
+
+class ConnectionPool():
+    '''
+    keeps a number of warm, handshaked request sessions spread across the
+    given servers and sends each request to the least busy one. a session
+    that fails is dropped and replaced on the next request. one pool can be
+    shared by any number of ElectrumxAPI instances, subscriptions stay on
+    each ElectrumxAPI's own connection.
+    '''
+
+    def __init__(
+        self,
+        servers: list[str],
+        size: int = 3,
+        pipelined: bool = True,
+        ssl: bool = True,
+        timeout: int = 10*60,
+        refillInterval: int = 30,
+        scoreboard: ServerScoreboard = None,
+    ):
+        self.servers = servers
+        self.size = size
+        self.pipelined = pipelined
+        self.ssl = ssl
+        self.timeout = timeout
+        self.refillInterval = refillInterval
+        self.scoreboard = scoreboard or ServerScoreboard.default()
+        self.lastFill = 0
+        self.lock = threading.Lock()
+        self.sessions: list[Electrumx] = []
+        self.hostPorts: dict[Electrumx, str] = {}
+        self.inflight: dict[Electrumx, int] = {}
+        self.used: dict[Electrumx, int] = {}
+        self.fill()
+
+    def connected(self) -> bool:
+        return len(self.sessions) > 0
+
+    def _open(self, hostPort: str) -> Union[Electrumx, None]:
+        host, port = hostPort.split(':')[0], int(hostPort.split(':')[1])
+        try:
+            session = Electrumx(
+                host=host,
+                port=port,
+                hostSubscription=host,
+                portSubscription=port,
+                ssl=self.ssl,
+                sslSubscription=self.ssl,
+                timeout=self.timeout,
+                pipelined=self.pipelined,
+                subscriptions=False)
+        except Exception as e:
+            logging.error(f'error opening pool session to {hostPort}: {e}')
+            raise e
+        if session.handshaked is None:
+            session.disconnect()
+            return None
+        return session
+
+    def fill(self):
+        '''
+        opens sessions until the pool is full, fewest per server first and
+        the best scoring server among those, skipping benched servers.
+        '''
+        self.lastFill = time.time()
+        with self.lock:
+            missing = self.size - len(self.sessions)
+            perServer = {hostPort: 0 for hostPort in self.servers}
+            for hostPort in self.hostPorts.values():
+                perServer[hostPort] = perServer.get(hostPort, 0) + 1
+        failed = []
+        while missing > 0:
+            candidates = [
+                h for h in self.scoreboard.ranked(self.servers)
+                if h not in failed and self.scoreboard.available(h)]
+            if len(candidates) == 0:
+                break
+            hostPort = min(candidates, key=lambda h: perServer.get(h, 0))
+            session = self.scoreboard.attempt(hostPort, self._open)
+            if session is None:
+                failed.append(hostPort)
+                continue
+            with self.lock:
+                self.sessions.append(session)
+                self.hostPorts[session] = hostPort
+                self.inflight[session] = 0
+                self.used[session] = 0
+            perServer[hostPort] = perServer.get(hostPort, 0) + 1
+            missing -= 1
+        if len(self.sessions) < self.size:
+            logging.warning(
+                f'connection pool has {len(self.sessions)} of {self.size} sessions')
+
+    def drop(self, session: Electrumx):
+        with self.lock:
+            if session not in self.inflight:
+                return
+            self.sessions.remove(session)
+            self.hostPorts.pop(session, None)
+            self.inflight.pop(session, None)
+            self.used.pop(session, None)
+        session.disconnect()
+
+    def acquire(self) -> Electrumx:
+        '''
+        returns the least busy live session, counting the request against
+        it. sessions whose connection has failed or gone quiet are dropped.
+        '''
+        for session in [s for s in list(self.sessions) if not s.connected()]:
+            logging.warning(f'dropping dead pool session {self.hostPorts.get(session)}')
+            self.drop(session)
+        if len(self.sessions) == 0 or (
+            len(self.sessions) < self.size and
+            time.time() - self.lastFill > self.refillInterval
+        ):
+            self.fill()
+        with self.lock:
+            if len(self.sessions) == 0:
+                raise Exception('unable to connect to electrumx servers')
+            session = min(
+                self.sessions,
+                key=lambda s: (self.inflight[s], self.used[s]))
+            self.inflight[session] += 1
+            self.used[session] += 1
+            return session
+
+    def release(self, session: Electrumx, failed: bool = False, start: Union[float, None] = None):
+        hostPort = self.hostPorts.get(session)
+        if hostPort is not None and failed:
+            self.scoreboard.recordError(hostPort)
+        elif hostPort is not None and start is not None:
+            self.scoreboard.recordRtt(hostPort, time.time() - start)
+        if failed:
+            logging.error(
+                f'dropping pool session {self.hostPorts.get(session)}')
+            return self.drop(session)
+        with self.lock:
+            if session in self.inflight:
+                self.inflight[session] -= 1
+
+    @staticmethod
+    def _unanswered(result) -> bool:
+        ''' a request (or whole batch) that timed out comes back as None '''
+        if isinstance(result, list):
+            return len(result) > 0 and all(r is None for r in result)
+        return result is None
+
+    def _withSession(self, call: callable):
+        '''
+        runs call on a session, once more on another if that one fails or
+        doesn't answer in time.
+        '''
+        result = None
+        for attempt in range(2):
+            try:
+                session = self.acquire()
+            except Exception as e:
+                if attempt == 0:
+                    raise e
+                # nowhere else to try, the first answer (None) stands
+                return result
+            failed = False
+            start = time.time()
+            try:
+                result = call(session)
+                failed = ConnectionPool._unanswered(result)
+                if not failed or attempt == 1:
+                    return result
+            except Exception as e:
+                failed = True
+                if attempt == 1:
+                    raise e
+            finally:
+                self.release(session, failed=failed, start=start)
+
+    def send(self, method: str, *args, **kwargs):
+        return self._withSession(
+            lambda session: session.send(method, *args, **kwargs))
+
+    def sendAsync(self, method: str, *args, **kwargs) -> Future:
+        session = self.acquire()
+        start = time.time()
+        try:
+            future = session.sendAsync(method, *args, **kwargs)
+        except Exception as e:
+            self.release(session, failed=True)
+            raise e
+        future.add_done_callback(
+            lambda f: self.release(
+                session,
+                failed=not f.cancelled() and f.exception() is not None,
+                start=start))
+        return future
+
+    def sendBatch(self, calls: list[tuple], **kwargs) -> list[Union[dict, None]]:
+        return self._withSession(
+            lambda session: session.sendBatch(calls, **kwargs))
+
+    def close(self):
+        for session in list(self.sessions):
+            self.drop(session)
@@ -0,0 +1,163 @@
+from typing import Union
+import threading
+import time
+
+
+class TokenBucket():
+    '''
+    allows rate requests per second on average and up to burst at once.
+    while the bucket has tokens nothing waits. the rate adapts: it is
+    halved (down to floor) when the server says we're using too much and
+    creeps back up to its ceiling with every request that goes through.
+    '''
+
+    def __init__(self, rate: float, burst: float, floor: float = 0.2):
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = burst
+        self.floor = min(floor, rate)
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float = 1) -> float:
+        '''
+        takes cost tokens, going into debt if there aren't enough, and
+        returns how many seconds the caller should wait before sending.
+        '''
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= cost
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self, cost: float = 1) -> float:
+        ''' blocks until cost tokens are available, returns seconds waited '''
+        delay = self.reserve(cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def slowDown(self):
+        with self.lock:
+            self.rate = max(self.floor, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def speedUp(self):
+        with self.lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling / 100)
+
+
+class RateLimiter():
+    '''
+    a token bucket per server and method class, shared by every connection
+    to that server so the limit holds however many callers there are.
+    methods are grouped into classes by how expensive they are for the
+    server, anything not listed falls into the default class.
+    '''
+
+    # class: (requests per second, burst). a holder page is heavy for the
+    # server, but the burst still lets a HolderScanner keep its default 4
+    # pages in flight. pass classes={'asset': (rate, burst)} to change it.
+    classes: dict[str, tuple[float, float]] = {
+        'default': (20, 50),
+        'scripthash': (10, 30),
+        'transaction': (25, 250),
+        'asset': (4, 8),
+    }
+
+    methodClasses: dict[str, str] = {
+        'blockchain.scripthash.get_balance': 'scripthash',
+        'blockchain.scripthash.get_history': 'scripthash',
+        'blockchain.scripthash.listunspent': 'scripthash',
+        'blockchain.scripthash.listassets': 'scripthash',
+        'blockchain.scripthash.get_asset_balance': 'scripthash',
+        'blockchain.transaction.get': 'transaction',
+        'blockchain.asset.list_addresses_by_asset': 'asset',
+    }
+
+    # phrases in error messages that mean the server is throttling us
+    limitedMessages = (
+        'excessive resource usage',
+        'rate limit',
+        'too many',
+        'server busy',
+    )
+
+    shared: 'RateLimiter' = None
+
+    @staticmethod
+    def default() -> 'RateLimiter':
+        ''' the limiter shared by everything that doesn't bring its own '''
+        if RateLimiter.shared is None:
+            RateLimiter.shared = RateLimiter()
+        return RateLimiter.shared
+
+    @staticmethod
+    def limited(response: Union[dict, None]) -> bool:
+        ''' is response an error telling us to slow down '''
+        if not isinstance(response, dict) or not isinstance(response.get('error'), dict):
+            return False
+        message = str(response['error'].get('message', '')).lower()
+        return any(phrase in message for phrase in RateLimiter.limitedMessages)
+
+    def __init__(
+        self,
+        classes: Union[dict[str, tuple[float, float]], None] = None,
+        methodClasses: Union[dict[str, str], None] = None,
+    ):
+        self.classes = {**RateLimiter.classes, **(classes or {})}
+        self.methodClasses = {**RateLimiter.methodClasses, **(methodClasses or {})}
+        self.lock = threading.Lock()
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+
+    def methodClass(self, method: str) -> str:
+        return self.methodClasses.get(method, 'default')
+
+    def bucket(self, hostPort: str, methodClass: str) -> TokenBucket:
+        key = (hostPort, methodClass)
+        with self.lock:
+            if key not in self.buckets:
+                rate, burst = self.classes[methodClass]
+                self.buckets[key] = TokenBucket(rate, burst)
+            return self.buckets[key]
+
+    def reserve(self, hostPort: str, methods: list[str]) -> float:
+        ''' takes a token per method, returns the seconds to wait for them '''
+        costs: dict[str, int] = {}
+        for method in methods:
+            methodClass = self.methodClass(method)
+            costs[methodClass] = costs.get(methodClass, 0) + 1
+        delay = 0
+        for methodClass, cost in costs.items():
+            delay = max(delay, self.bucket(hostPort, methodClass).reserve(cost))
+        return delay
+
+    def acquire(self, hostPort: str, *methods: str) -> float:
+        ''' blocks until hostPort may be sent methods, returns seconds waited '''
+        delay = self.reserve(hostPort, list(methods))
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def observe(self, hostPort: str, method: str, response: Union[dict, None]):
+        ''' adapts the rate of method's class on hostPort to the response '''
+        if RateLimiter.limited(response):
+            self.bucket(hostPort, self.methodClass(method)).slowDown()
+        elif response is not None:
+            self.bucket(hostPort, self.methodClass(method)).speedUp()
+
+    def observeBatch(self, hostPort: str, calls: list[tuple], responses: list[Union[dict, None]]):
+        ''' like observe for each call, but slows down at most once per method '''
+        slowed = set()
+        for call, response in zip(calls, responses):
+            if RateLimiter.limited(response):
+                if call[0] in slowed:
+                    continue
+                slowed.add(call[0])
+            self.observe(hostPort, call[0], response)
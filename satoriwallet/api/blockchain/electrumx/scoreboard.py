@@ -0,0 +1,252 @@
+from typing import Union, Callable
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+
+class ServerStats():
+    ''' what we've observed of one host:port '''
+
+    def __init__(
+        self,
+        handshakeTime: Union[float, None] = None,
+        rtt: Union[float, None] = None,
+        successes: int = 0,
+        errors: int = 0,
+        timeouts: int = 0,
+        consecutiveFailures: int = 0,
+        retryAt: float = 0,
+    ):
+        self.handshakeTime = handshakeTime
+        self.rtt = rtt
+        self.successes = successes
+        self.errors = errors
+        self.timeouts = timeouts
+        self.consecutiveFailures = consecutiveFailures
+        self.retryAt = retryAt
+
+    def errorRate(self) -> float:
+        total = self.successes + self.errors + self.timeouts
+        if total == 0:
+            return 0
+        return (self.errors + self.timeouts) / total
+
+    def score(self, unknown: float = 1.0) -> float:
+        ''' expected seconds per call, penalized by failures, lower is better '''
+        latency = self.rtt if self.rtt is not None else self.handshakeTime
+        return (latency if latency is not None else unknown) * (1 + 4 * self.errorRate())
+
+    def toDict(self) -> dict:
+        return {
+            'handshakeTime': self.handshakeTime,
+            'rtt': self.rtt,
+            'successes': self.successes,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'consecutiveFailures': self.consecutiveFailures,
+            'retryAt': self.retryAt}
+
+
+class ServerScoreboard():
+    '''
+    tracks handshake time, round trip time, errors and timeouts per
+    host:port for as long as the process lives (and across restarts if a
+    path is given). servers are ranked fastest healthy first, and a failing
+    server is benched with exponential backoff plus jitter.
+    '''
+
+    shared: 'ServerScoreboard' = None
+
+    @staticmethod
+    def default() -> 'ServerScoreboard':
+        ''' the scoreboard shared by everything that doesn't bring its own '''
+        if ServerScoreboard.shared is None:
+            ServerScoreboard.shared = ServerScoreboard()
+        return ServerScoreboard.shared
+
+    @staticmethod
+    def jitter(attempt: int, base: float = 1, cap: float = 5*60) -> float:
+        ''' exponential delay for the nth consecutive failure, with jitter '''
+        delay = min(cap, base * 2 ** max(attempt - 1, 0))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def __init__(
+        self,
+        path: Union[str, None] = None,
+        alpha: float = 0.3,
+        baseBackoff: float = 1,
+        maxBackoff: float = 5*60,
+        saveInterval: float = 60,
+    ):
+        self.path = path
+        self.alpha = alpha
+        self.baseBackoff = baseBackoff
+        self.maxBackoff = maxBackoff
+        self.saveInterval = saveInterval
+        self.lastSave = 0
+        self.lock = threading.Lock()
+        self.stats: dict[str, ServerStats] = {}
+        self.load()
+
+    def get(self, hostPort: str) -> ServerStats:
+        with self.lock:
+            return self.stats.setdefault(hostPort, ServerStats())
+
+    def _average(self, previous: Union[float, None], seconds: float) -> float:
+        if previous is None:
+            return seconds
+        return self.alpha * seconds + (1 - self.alpha) * previous
+
+    def _succeeded(self, stats: ServerStats):
+        stats.successes += 1
+        stats.consecutiveFailures = 0
+        stats.retryAt = 0
+
+    def _failed(self, hostPort: str, stats: ServerStats):
+        stats.consecutiveFailures += 1
+        stats.retryAt = time.time() + ServerScoreboard.jitter(
+            stats.consecutiveFailures,
+            base=self.baseBackoff,
+            cap=self.maxBackoff)
+        logging.debug(
+            f'{hostPort} benched for {round(stats.retryAt - time.time(), 1)}s')
+
+    def recordHandshake(self, hostPort: str, seconds: float):
+        stats = self.get(hostPort)
+        with self.lock:
+            stats.handshakeTime = self._average(stats.handshakeTime, seconds)
+            self._succeeded(stats)
+        self._maybeSave()
+
+    def recordRtt(self, hostPort: str, seconds: float):
+        stats = self.get(hostPort)
+        with self.lock:
+            stats.rtt = self._average(stats.rtt, seconds)
+            self._succeeded(stats)
+        self._maybeSave()
+
+    def recordError(self, hostPort: str):
+        stats = self.get(hostPort)
+        with self.lock:
+            stats.errors += 1
+            self._failed(hostPort, stats)
+        self._maybeSave()
+
+    def recordTimeout(self, hostPort: str):
+        stats = self.get(hostPort)
+        with self.lock:
+            stats.timeouts += 1
+            self._failed(hostPort, stats)
+        self._maybeSave()
+
+    def available(self, hostPort: str) -> bool:
+        return time.time() >= self.get(hostPort).retryAt
+
+    def ranked(self, servers: list[str]) -> list[str]:
+        '''
+        available servers by score, servers we've never seen are tried before
+        known slow ones, benched servers follow in order of their retry time.
+        '''
+        available = [s for s in servers if self.available(s)]
+        benched = [s for s in servers if not self.available(s)]
+        known = [
+            self.get(s).score() for s in available
+            if self.get(s).rtt is not None or self.get(s).handshakeTime is not None]
+        unknown = min(known) if len(known) > 0 else 1.0
+        random.shuffle(available)
+        return (
+            sorted(available, key=lambda s: self.get(s).score(unknown=unknown)) +
+            sorted(benched, key=lambda s: self.get(s).retryAt))
+
+    def connect(self, servers: list[str], factory: Callable, race: int = 1):
+        '''
+        calls factory(hostPort) on servers in ranked order and returns the
+        first connection made, timing each handshake. with race > 1 the top
+        servers are tried at the same time and the losers are disconnected.
+        returns None if every server failed.
+        '''
+        ranked = self.ranked(servers)
+        for i in range(0, len(ranked), max(race, 1)):
+            connection = self._race(ranked[i:i+max(race, 1)], factory)
+            if connection is not None:
+                return connection
+        return None
+
+    def attempt(self, hostPort: str, factory: Callable):
+        ''' factory(hostPort), recording how long it took or that it failed '''
+        start = time.time()
+        try:
+            connection = factory(hostPort)
+        except Exception as e:
+            if 'timed out' in str(e):
+                self.recordTimeout(hostPort)
+            else:
+                self.recordError(hostPort)
+            logging.debug(f'error connecting to {hostPort}: {e}')
+            return None
+        if connection is None:
+            self.recordError(hostPort)
+            return None
+        self.recordHandshake(hostPort, time.time() - start)
+        return connection
+
+    def _race(self, servers: list[str], factory: Callable):
+        if len(servers) == 1:
+            return self.attempt(servers[0], factory)
+        lock = threading.Lock()
+        done = threading.Event()
+        results = []
+
+        def run(hostPort: str):
+            connection = self.attempt(hostPort, factory)
+            with lock:
+                results.append(connection)
+                if connection is not None and not done.is_set():
+                    done.set()
+                    winner.append(connection)
+                elif connection is not None:
+                    # the wallet and vault subscription sockets too
+                    connection.disconnect()
+                    connection.disconnectSubscriptions()
+                if len(results) == len(servers):
+                    done.set()
+
+        winner = []
+        for hostPort in servers:
+            threading.Thread(target=run, args=(hostPort,), daemon=True).start()
+        done.wait()
+        return winner[0] if len(winner) > 0 else None
+
+    def load(self):
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                raw = json.load(f)
+            with self.lock:
+                self.stats = {
+                    hostPort: ServerStats(**stats)
+                    for hostPort, stats in raw.items()}
+        except Exception as e:
+            logging.error(f'unable to load server scoreboard {self.path}: {e}')
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            raw = {hostPort: stats.toDict() for hostPort, stats in self.stats.items()}
+        try:
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(raw, f)
+            os.replace(temporary, self.path)
+            self.lastSave = time.time()
+        except Exception as e:
+            logging.error(f'unable to save server scoreboard {self.path}: {e}')
+
+    def _maybeSave(self):
+        if self.path is not None and time.time() - self.lastSave > self.saveInterval:
+            self.save()
@@ -0,0 +1,250 @@
+from typing import Union, Callable
+import logging
+import queue
+import threading
+from satoriwallet.api.blockchain.electrumx.electrumx import Electrumx
+from satoriwallet.api.blockchain.electrumx.scoreboard import ServerScoreboard
+
+
+class SubscriptionManager():
+    '''
+    carries any number of scripthash and header subscriptions on a single
+    pipelined connection. notifications are routed to their callbacks by a
+    dict lookup on scripthash, and when the connection drops it is reopened
+    (on the best server) and every subscription is replayed, each on its
+    own and retried until the server has taken it. callbacks run
+    one at a time on a delivery thread, not the reader, so they may make
+    requests of their own.
+    '''
+
+    def __init__(
+        self,
+        servers: list[str],
+        ssl: bool = True,
+        timeout: int = 10*60,
+        keepaliveInterval: int = 60,
+        watchInterval: float = 5,
+        scoreboard: ServerScoreboard = None,
+    ):
+        self.servers = servers
+        self.ssl = ssl
+        self.timeout = timeout
+        self.keepaliveInterval = keepaliveInterval
+        self.watchInterval = watchInterval
+        self.scoreboard = scoreboard or ServerScoreboard.default()
+        self.lock = threading.Lock()
+        self.scripthashCallbacks: dict[str, list[Callable]] = {}
+        self.statuses: dict[str, Union[str, None]] = {}
+        self.headerCallbacks: list[Callable] = []
+        self.header: Union[dict, None] = None
+        # what still has to be subscribed again on the current connection
+        self.pending: set[str] = set()
+        self.headersPending = False
+        self.stop = threading.Event()
+        self.notifications: queue.Queue = queue.Queue()
+        self.deliveryThread = threading.Thread(
+            target=self._deliver,
+            name='ElectrumxNotifications',
+            daemon=True)
+        self.deliveryThread.start()
+        self.conn: Electrumx = None
+        self.conn = self._connect()
+        self.watchThread = threading.Thread(
+            target=self._watch,
+            name='ElectrumxSubscriptions',
+            daemon=True)
+        self.watchThread.start()
+
+    def _open(self, hostPort: str) -> Electrumx:
+        host, port = hostPort.split(':')[0], int(hostPort.split(':')[1])
+        conn = Electrumx(
+            host=host,
+            port=port,
+            hostSubscription=host,
+            portSubscription=port,
+            ssl=self.ssl,
+            sslSubscription=self.ssl,
+            timeout=self.timeout,
+            pipelined=True,
+            subscriptions=False,
+            keepaliveInterval=self.keepaliveInterval,
+            onNotification=self.notifications.put)
+        if conn.handshaked is None:
+            conn.disconnect()
+            raise Exception(f'handshake with {hostPort} failed')
+        return conn
+
+    def _connect(self) -> Electrumx:
+        conn = self.scoreboard.connect(self.servers, self._open)
+        if conn is None:
+            raise Exception('unable to connect to electrumx servers')
+        return conn
+
+    def connected(self) -> bool:
+        return self.conn is not None and self.conn.connected()
+
+    def _watch(self):
+        while not self.stop.wait(self.watchInterval):
+            self._check()
+
+    def _check(self):
+        ''' reconnects if the connection is lost, then replays what's pending '''
+        if not self.connected():
+            logging.debug('subscription connection lost, reconnecting')
+            try:
+                if self.conn is not None:
+                    self.conn.disconnect()
+                self.conn = self._connect()
+            except Exception as e:
+                logging.error(f'error reconnecting subscriptions: {e}')
+                return
+            with self.lock:
+                self.pending = set(self.scripthashCallbacks.keys())
+                self.headersPending = len(self.headerCallbacks) > 0
+        if self.headersPending or len(self.pending) > 0:
+            self.replay()
+
+    def _deliver(self):
+        while not self.stop.is_set():
+            notification = self.notifications.get()
+            if notification is None:
+                break
+            self._onNotification(notification)
+
+    def replay(self):
+        '''
+        subscribes again to what's pending after a reconnect. callbacks of
+        scripthashes whose status changed while we were away are called
+        with a notification carrying the new status. whatever fails stays
+        pending for the next check.
+        '''
+        if self.headersPending and len(self.headerCallbacks) > 0:
+            try:
+                header = self._subscribe('blockchain.headers.subscribe')
+                self.headersPending = False
+                self.notifications.put({
+                    'jsonrpc': '2.0',
+                    'method': 'blockchain.headers.subscribe',
+                    'params': [header]})
+            except Exception as e:
+                logging.error(f'error replaying header subscription: {e}')
+        with self.lock:
+            self.headersPending = self.headersPending and len(self.headerCallbacks) > 0
+            self.pending &= set(self.scripthashCallbacks.keys())
+            scripthashes = list(self.pending)
+        for scripthash in scripthashes:
+            try:
+                status = self._subscribe('blockchain.scripthash.subscribe', scripthash)
+            except Exception as e:
+                logging.error(f'error replaying subscription to {scripthash}: {e}')
+                continue
+            with self.lock:
+                self.pending.discard(scripthash)
+            if status != self.statuses.get(scripthash):
+                self.notifications.put({
+                    'jsonrpc': '2.0',
+                    'method': 'blockchain.scripthash.subscribe',
+                    'params': [scripthash, status]})
+
+    def _subscribe(self, method: str, *args):
+        response = self.conn.send(method, *args)
+        if response is None or 'error' in response:
+            raise Exception(f'{method} failed: {response}')
+        return response.get('result')
+
+    def _onHeader(self, header: Union[dict, None]):
+        if header is None:
+            return
+        self.header = header
+        notification = {
+            'jsonrpc': '2.0',
+            'method': 'blockchain.headers.subscribe',
+            'params': [header]}
+        for callback in list(self.headerCallbacks):
+            try:
+                callback(notification)
+            except Exception as e:
+                logging.error(f'error in header callback: {e}')
+
+    def _onNotification(self, notification: dict):
+        method = notification.get('method')
+        params = notification.get('params') or []
+        if method == 'blockchain.headers.subscribe' and len(params) > 0:
+            return self._onHeader(params[0])
+        if method != 'blockchain.scripthash.subscribe' or len(params) != 2:
+            logging.debug(f'Received unknown notification: {notification}')
+            return
+        scripthash, status = params
+        with self.lock:
+            self.statuses[scripthash] = status
+            callbacks = list(self.scripthashCallbacks.get(scripthash, []))
+        for callback in callbacks:
+            try:
+                callback(notification)
+            except Exception as e:
+                logging.error(f'error in scripthash callback: {e}')
+
+    def status(self, scripthash: str) -> Union[str, None]:
+        ''' the last status hash seen for scripthash '''
+        return self.statuses.get(scripthash)
+
+    def subscribeScripthash(self, scripthash: str, callback: Callable) -> Union[str, None]:
+        '''
+        registers callback for notifications on scripthash and returns its
+        current status hash. the server is only asked once per scripthash.
+        '''
+        with self.lock:
+            callbacks = self.scripthashCallbacks.setdefault(scripthash, [])
+            callbacks.append(callback)
+            if len(callbacks) > 1:
+                return self.statuses.get(scripthash)
+        try:
+            status = self._subscribe('blockchain.scripthash.subscribe', scripthash)
+        except Exception as e:
+            # not subscribed, so later subscribers must ask the server again
+            with self.lock:
+                callbacks = self.scripthashCallbacks.get(scripthash, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if len(callbacks) == 0:
+                    self.scripthashCallbacks.pop(scripthash, None)
+            raise e
+        with self.lock:
+            self.statuses[scripthash] = status
+        return status
+
+    def unsubscribeScripthash(self, scripthash: str, callback: Union[Callable, None] = None):
+        ''' removes callback, or all callbacks, and unsubscribes when none remain '''
+        with self.lock:
+            callbacks = self.scripthashCallbacks.get(scripthash, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if callback is not None and len(callbacks) > 0:
+                return
+            self.scripthashCallbacks.pop(scripthash, None)
+            self.statuses.pop(scripthash, None)
+        try:
+            self.conn.send('blockchain.scripthash.unsubscribe', scripthash)
+        except Exception as e:
+            logging.error(f'error unsubscribing from {scripthash}: {e}')
+
+    def subscribeHeaders(self, callback: Callable) -> Union[dict, None]:
+        ''' registers callback for new blocks and returns the current tip '''
+        self.headerCallbacks.append(callback)
+        if self.header is None or len(self.headerCallbacks) == 1:
+            try:
+                self.header = self._subscribe('blockchain.headers.subscribe')
+            except Exception as e:
+                self.unsubscribeHeaders(callback)
+                raise e
+        return self.header
+
+    def unsubscribeHeaders(self, callback: Callable):
+        if callback in self.headerCallbacks:
+            self.headerCallbacks.remove(callback)
+
+    def close(self):
+        self.stop.set()
+        self.notifications.put(None)
+        if self.conn is not None:
+            self.conn.disconnect()
@@ -0,0 +1,185 @@
+from typing import Union, Any
+import json
+import logging
+import os
+import threading
+from satoriwallet.lib.cache import LRUCache
+
+
+class ScripthashCache():
+    '''
+    remembers query results per scripthash for as long as its electrumx
+    status hash stays the same. the status changes whenever the history of
+    the scripthash does, so a cached balance, history or utxo set is good
+    until a new status arrives by subscription. nothing is cached for a
+    scripthash whose status we don't know. (a status of None is known, it
+    means the scripthash has no history.)
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses: dict[str, Union[str, None]] = {}
+        self.generations: dict[str, int] = {}
+        self.values: dict[str, dict[str, Any]] = {}
+        self.histories: dict[str, list[dict]] = {}
+        self.heights: dict[str, int] = {}
+        self.reservations: dict[str, set[tuple[str, int]]] = {}
+
+    def status(self, scripthash: str) -> Union[str, None]:
+        return self.statuses.get(scripthash)
+
+    def generation(self, scripthash: str) -> Union[int, None]:
+        ''' changes with every new status, None while the status is unknown '''
+        return self.generations.get(scripthash)
+
+    def setStatus(self, scripthash: str, status: Union[str, None]) -> bool:
+        ''' records a new status, dropping cached values if it changed '''
+        with self.lock:
+            if scripthash in self.statuses and self.statuses[scripthash] == status:
+                return False
+            self.statuses[scripthash] = status
+            self.generations[scripthash] = self.generations.get(scripthash, 0) + 1
+            self.values.pop(scripthash, None)
+            # the spends we reserved are reflected in the new unspents
+            self.reservations.pop(scripthash, None)
+            return True
+
+    def get(self, scripthash: str, key: str) -> tuple[bool, Any]:
+        ''' returns (hit, value) '''
+        with self.lock:
+            if scripthash not in self.generations:
+                return False, None
+            values = self.values.get(scripthash, {})
+            if key not in values:
+                return False, None
+            return True, values[key]
+
+    def put(self, scripthash: str, key: str, value: Any, generation: Union[int, None]):
+        ''' caches value if the generation it was fetched under is still current '''
+        if generation is None:
+            return
+        with self.lock:
+            if self.generations.get(scripthash) != generation:
+                return
+            self.values.setdefault(scripthash, {})[key] = value
+
+    def mergeHistory(self, scripthash: str, history: list[dict]) -> list[dict]:
+        '''
+        takes a full get_history result and returns only the entries that
+        are new since the last merge: confirmed above the last known height,
+        or still in the mempool (height <= 0).
+        '''
+        with self.lock:
+            lastHeight = self.heights.get(scripthash, 0)
+            known = {
+                (h.get('tx_hash'), h.get('height'))
+                for h in self.histories.get(scripthash, [])}
+            new = [
+                h for h in history
+                if (h.get('tx_hash'), h.get('height')) not in known and (
+                    h.get('height', 0) <= 0 or h.get('height', 0) > lastHeight)]
+            self.histories[scripthash] = history
+            confirmed = [h.get('height', 0) for h in history if h.get('height', 0) > 0]
+            self.heights[scripthash] = max(confirmed + [lastHeight])
+            return new
+
+    def reserve(self, scripthash: str, outpoints: list[tuple[str, int]]):
+        '''
+        marks (tx_hash, tx_pos) outpoints as spent by us until the status of
+        scripthash changes, so they aren't chosen again in the meantime.
+        '''
+        with self.lock:
+            self.reservations.setdefault(scripthash, set()).update(outpoints)
+
+    def reserved(self, scripthash: str) -> set[tuple[str, int]]:
+        with self.lock:
+            return set(self.reservations.get(scripthash, set()))
+
+    def height(self, scripthash: str) -> int:
+        ''' the highest confirmed height seen in the history of scripthash '''
+        return self.heights.get(scripthash, 0)
+
+    def forget(self, scripthash: str):
+        with self.lock:
+            self.statuses.pop(scripthash, None)
+            self.generations.pop(scripthash, None)
+            self.values.pop(scripthash, None)
+            self.histories.pop(scripthash, None)
+            self.heights.pop(scripthash, None)
+            self.reservations.pop(scripthash, None)
+
+
+class TransactionCache():
+    '''
+    verbose transactions by txid. a confirmed transaction never changes, so
+    once seen it's kept in a bounded in-memory LRU and, if a path is given,
+    as json on disk where it survives restarts. only the transaction itself
+    is kept: fields that describe where it sits in the chain (confirmations,
+    blockhash, blocktime, time) go stale or change in a reorg, so they're
+    left out and callers that need them ask the server.
+    '''
+
+    chainFields = ('confirmations', 'blockhash', 'blocktime', 'time')
+
+    shared: 'TransactionCache' = None
+
+    @staticmethod
+    def default() -> 'TransactionCache':
+        ''' the in-memory cache shared by everything that doesn't bring its own '''
+        if TransactionCache.shared is None:
+            TransactionCache.shared = TransactionCache()
+        return TransactionCache.shared
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        path: Union[str, None] = None,
+        minConfirmations: int = 1,
+    ):
+        self.memory = LRUCache(maxsize)
+        self.path = path
+        self.minConfirmations = minConfirmations
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def body(tx: Union[dict, None]) -> Union[dict, None]:
+        ''' tx without the fields that change as the chain grows '''
+        if not isinstance(tx, dict):
+            return tx
+        return {k: v for k, v in tx.items() if k not in TransactionCache.chainFields}
+
+    def _file(self, txid: str) -> str:
+        return os.path.join(self.path, txid[:2], f'{txid}.json')
+
+    def get(self, txid: str) -> Union[dict, None]:
+        tx = self.memory.get(txid)
+        if tx is not None or self.path is None:
+            return tx
+        try:
+            with open(self._file(txid), 'r') as f:
+                tx = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f'unable to read cached transaction {txid}: {e}')
+            return None
+        self.memory.put(txid, tx)
+        return tx
+
+    def put(self, txid: str, tx: Union[dict, None]) -> bool:
+        ''' caches tx if it's confirmed deeply enough, returns whether it was '''
+        if not isinstance(tx, dict) or tx.get('confirmations', 0) < self.minConfirmations:
+            return False
+        tx = TransactionCache.body(tx)
+        self.memory.put(txid, tx)
+        if self.path is not None:
+            try:
+                os.makedirs(os.path.dirname(self._file(txid)), exist_ok=True)
+                temporary = self._file(txid) + '.tmp'
+                with open(temporary, 'w') as f:
+                    json.dump(tx, f)
+                os.replace(temporary, self._file(txid))
+            except Exception as e:
+                logging.error(f'unable to write cached transaction {txid}: {e}')
+        return True
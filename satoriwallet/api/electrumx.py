@@ -1,10 +1,17 @@
 import logging
-import random
 from typing import Union, Dict
+from concurrent.futures import Future
 from threading import Thread, Event, Lock
 import socket
 import time
-from satoriwallet.api.blockchain import Electrumx
+from satoriwallet.api.blockchain import Electrumx, ConnectionPool, ServerScoreboard, SubscriptionManager
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+from satoriwallet.api.cache import ScripthashCache, TransactionCache
+from satoriwallet.api.headers import HeaderTracker
+from satoriwallet.api.holders import HolderScanner
+from satoriwallet.lib.transaction.utils import TxUtils
+from satoriwallet.lib.transaction.coinselect import CoinSelector, Selection
+from satoriwallet.lib.transaction.fees import FeeEstimator
 
 logging.basicConfig(level=logging.INFO)
 
@@ -22,6 +29,15 @@ class ElectrumxAPI():
         retryAttempts: int = 3,
         onScripthashNotification=None,
         onBlockNotification=None,
+        pipelined: bool = False,
+        pool: ConnectionPool = None,
+        scoreboard: ServerScoreboard = None,
+        race: int = 1,
+        subscriptionManager: SubscriptionManager = None,
+        cache: ScripthashCache = None,
+        transactionCache: TransactionCache = None,
+        headerTracker: HeaderTracker = None,
+        feeEstimator: FeeEstimator = None,
     ):
         self.chain = chain
         self.address = address
@@ -41,8 +57,34 @@ class ElectrumxAPI():
         self.onScripthashNotification = onScripthashNotification
         self.onBlockNotification = onBlockNotification
         self.lastBlockTime = 0
+        # the last tip seen on the header subscription
+        self.header: Union[dict, None] = None
         self.type = type
-        if self.conn is None:
+        self.pipelined = pipelined
+        # requests go to the shared pool when given, subscriptions always
+        # use self.conn which is then only opened once it's needed.
+        self.pool = pool
+        # server choice and backoff come from the scoreboard, shared by
+        # every ElectrumxAPI in the process unless one is given. race > 1
+        # connects to that many of the best servers at once.
+        self.scoreboard = scoreboard or ServerScoreboard.default()
+        self.race = race
+        # a shared manager carries this instance's subscriptions on its one
+        # connection instead of the wallet and vault subscription sockets
+        self.subscriptionManager = subscriptionManager
+        # results for self.scripthash are reused until its status changes
+        self.cache = cache or ScripthashCache()
+        # confirmed transactions by txid, shared process wide unless given
+        self.transactionCache = transactionCache or TransactionCache.default()
+        self.newTransactionHistory = []
+        # header notifications are fed to the tracker, which works out
+        # confirmations and notices reorgs
+        self.headerTracker = headerTracker
+        # the subscription socket our scripthash status comes in on
+        self.subscribedOn = None
+        # sizes and the server's fee rate, fetched once per block
+        self.feeEstimator = feeEstimator or FeeEstimator(self)
+        if self.conn is None and self.pool is None:
             self.conn = self.makeConnection()
 
     def connected(self):
@@ -52,6 +94,8 @@ class ElectrumxAPI():
         # ):
         #    print('FALSE')
         #    return False
+        if self.pool is not None:
+            return self.pool.connected()
         return self.conn is not None and self.conn.connected()
 
     def connectedSubscriptions(self):
@@ -61,49 +105,65 @@ class ElectrumxAPI():
         # ):
         #    print('FALSE')
         #    return False
+        if self.subscriptionManager is not None:
+            return self.subscriptionManager.connected()
         return self.conn is not None and self.conn.connectedWalletSubscription()
 
-    def makeConnection(self):
+    def makeConnection(self, exclude: Union[list[str], None] = None):
         if len(self.servers) == 0:
             return
-        tries = 0
-        failedServers = []
-        while tries <= len(self.servers):
-            tries += 1
-            hostPort = random.choice(self.servers)
-            if hostPort in failedServers:
-                continue
-            try:
-                return Electrumx(
-                    host=hostPort.split(':')[0],
-                    port=int(hostPort.split(':')[1]),
-                    ssl=True)
-            except socket.timeout:
-                failedServers.append(hostPort)
-                continue
-            except Exception as _:
-                failedServers.append(hostPort)
-                continue
-        hostPort = random.choice(self.servers)
-        return Electrumx(
-            host=hostPort.split(':')[0],
-            port=int(hostPort.split(':')[1]),
-            ssl=True)
+        servers = [s for s in self.servers if s not in (exclude or [])]
+        conn = self.scoreboard.connect(
+            servers or self.servers,
+            self._makeElectrumx,
+            race=self.race)
+        if conn is None:
+            raise Exception('unable to connect to electrumx servers')
+        return conn
+
+    def _makeElectrumx(self, hostPort: str) -> Electrumx:
+        host, port = hostPort.split(':')[0], int(hostPort.split(':')[1])
+        conn = Electrumx(
+            host=host,
+            port=port,
+            hostSubscription=host,
+            portSubscription=port,
+            ssl=True,
+            sslSubscription=True,
+            pipelined=self.pipelined)
+        if conn.handshaked is None:
+            conn.disconnect()
+            conn.disconnectSubscriptions()
+            raise Exception(f'handshake with {hostPort} failed')
+        return conn
+
+    @staticmethod
+    def _hostPort(conn: Electrumx) -> str:
+        return f'{conn.host}:{conn.port}'
 
     def disconnect(self):
-        self.conn.disconnect()
+        if self.conn is not None:
+            self.conn.disconnect()
 
     def disconnectSubscriptions(self):
-        self.conn.disconnectSubscriptions()
+        if self.conn is not None:
+            self.conn.disconnectSubscriptions()
 
     def connect(self):
+        if self.pool is not None:
+            self.pool.fill()
+            return self.pool
         if len(self.servers) == 0:
             raise Exception("No servers available")
         logging.debug('connected6')
         if self.connected():
             return self.conn
+        if self.conn is None:
+            self.conn = self.makeConnection()
+            return self.conn
+        hostPort = ElectrumxAPI._hostPort(self.conn)
         tries = 0
-        while tries <= self.retryAttempts:
+        while tries <= self.retryAttempts and self.scoreboard.available(hostPort):
             tries += 1
             try:
                 self.conn.connect()
@@ -111,8 +171,14 @@ class ElectrumxAPI():
                 if self.connected():
                     self.handshake()
                     # self.makeSubscriptions()
+                    return self.conn
             except Exception as _:
-                time.sleep(1)
+                self.scoreboard.recordError(hostPort)
+                time.sleep(ServerScoreboard.jitter(tries))
+        # fail over to the best other server
+        logging.debug(f'failing over from {hostPort}')
+        self.conn = self.makeConnection(exclude=[hostPort])
+        return self.conn
 
     # Ensure if the connection is established or not
     def _ensureConnected(self):
@@ -123,6 +189,9 @@ class ElectrumxAPI():
 
     def handshake(self) -> bool:
         self._ensureConnected()
+        if self.pool is not None:
+            # pool sessions are handshaked as they are opened
+            return self.connected()
         logging.debug('connected7')
         if self.connected() and self.lastHandshake != None and time.time() - self.lastHandshake < 60*60:
             return True
@@ -165,6 +234,14 @@ class ElectrumxAPI():
         else:
             return decoded
 
+    def _requests(self) -> Union[Electrumx, ConnectionPool]:
+        return self.pool if self.pool is not None else self.conn
+
+    def _subscriptions(self) -> Electrumx:
+        if self.conn is None:
+            self.conn = self.makeConnection()
+        return self.conn
+
     # _sendRequest function to send the data through socket to Electrumx server
     # Private Method
 
@@ -174,9 +251,29 @@ class ElectrumxAPI():
             # To check whether the connection is till active or not
             if not self.handshake():
                 raise Exception("Handshake failed")
+        if self.pool is not None:
+            return ElectrumxAPI.interpret(
+                self._sendRequestTo(self.pool, method, *params))
+        hostPort = ElectrumxAPI._hostPort(self.conn)
+        start = time.time()
         try:
-            response = self.conn.send(method, *params)
-            return ElectrumxAPI.interpret(response)
+            response = self._sendRequestTo(self.conn, method, *params)
+        except socket.timeout as e:
+            self.scoreboard.recordTimeout(hostPort)
+            raise
+        except Exception as e:
+            self.scoreboard.recordError(hostPort)
+            raise
+        if response is None:
+            # the connection swallows timeouts and returns nothing
+            self.scoreboard.recordTimeout(hostPort)
+        else:
+            self.scoreboard.recordRtt(hostPort, time.time() - start)
+        return ElectrumxAPI.interpret(response)
+
+    def _sendRequestTo(self, requests: Union[Electrumx, ConnectionPool], method: str, *params):
+        try:
+            return requests.send(method, *params)
         except socket.timeout as e:
             logging.error(f"Timeout during {method}: {str(e)}")
             raise
@@ -184,6 +281,53 @@ class ElectrumxAPI():
             logging.error(f"Error during {method}: {str(e)}")
             raise
 
+    def _sendRequestAsync(self, method: str, *params) -> Future:
+        '''
+        sends without waiting for the response, returns a future of the
+        interpreted result. use with pipelined=True to fan out many calls.
+        '''
+        interpreted = Future()
+
+        def relay(response: Future):
+            try:
+                interpreted.set_result(
+                    ElectrumxAPI.interpret(response.result()))
+            except Exception as e:
+                logging.error(f"Error during {method}: {str(e)}")
+                interpreted.set_exception(e)
+
+        self._requests().sendAsync(method, *params).add_done_callback(relay)
+        return interpreted
+
+    def batch(self, calls: list[tuple], checkConnection=False) -> list:
+        '''
+        sends many calls in one request, such as
+        [('blockchain.transaction.get', txid, True), ...], and returns their
+        results in the same order. an item that failed is returned as an
+        ElectrumxError instead of a result.
+        '''
+        if checkConnection:
+            self._ensureConnected()
+            if not self.handshake():
+                raise Exception("Handshake failed")
+        try:
+            responses = self._requests().sendBatch(calls)
+        except socket.timeout as e:
+            logging.error(f"Timeout during batch: {str(e)}")
+            raise
+        except Exception as e:
+            logging.error(f"Error during batch: {str(e)}")
+            raise
+        results = []
+        for response in responses:
+            if response is None:
+                results.append(ElectrumxError('no response'))
+            elif 'error' in response.keys():
+                results.append(ElectrumxError(response.get('error')))
+            else:
+                results.append(ElectrumxAPI.interpret(response))
+        return results
+
     def _sendSubscriptionRequest(self, method: str, checkConnection=True, *params):
         if checkConnection:
             self._ensureConnected()
@@ -192,9 +336,9 @@ class ElectrumxAPI():
                 raise Exception("Handshake failed")
         try:
             if self.type == 'wallet':
-                response = self.conn.sendWalletSubscription(method, *params)
+                response = self._subscriptions().sendWalletSubscription(method, *params)
             else:
-                response = self.conn.sendVaultSubscription(method, *params)
+                response = self._subscriptions().sendVaultSubscription(method, *params)
             return ElectrumxAPI.interpret(response)
         except socket.timeout as e:
             logging.error(f"Timeout during {method}: {str(e)}")
@@ -203,11 +347,44 @@ class ElectrumxAPI():
             logging.error(f"Error during {method}: {str(e)}")
             raise
 
+    def _subscriptionSocket(self):
+        if self.conn is None:
+            return None
+        if self.type == 'wallet':
+            return self.conn.connectionWalletSubscription
+        return self.conn.connectionVaultSubscription
+
+    def _subscriptionLive(self) -> bool:
+        '''
+        is the subscription that keeps our status current still there. if
+        it dropped or was reopened, notifications may have been missed.
+        '''
+        if self.subscriptionManager is not None:
+            return self.subscriptionManager.connected()
+        conn = self._subscriptionSocket()
+        return (
+            conn is not None and
+            conn is self.subscribedOn and
+            self.conn.connectedSubscription(conn))
+
+    def _cached(self, key: str, fetch: callable):
+        ''' fetch() unless we have its result for the current status '''
+        if self.cache.generation(self.scripthash) is not None and not self._subscriptionLive():
+            logging.debug(f'subscription for {self.scripthash} lost, dropping cache')
+            self.cache.forget(self.scripthash)
+        generation = self.cache.generation(self.scripthash)
+        hit, value = self.cache.get(self.scripthash, key)
+        if hit:
+            return value
+        value = fetch()
+        self.cache.put(self.scripthash, key, value, generation)
+        return value
+
     def getCurrency(self):
         # >>> b.send("blockchain.scripthash.get_balance", script_hash('REsQeZT8KD8mFfcD4ZQQWis4Ju9eYjgxtT'))
         # b'{"jsonrpc":"2.0","result":{"confirmed":18193623332178,"unconfirmed":0},"id":1656046285682}\n'
-        result = self._sendRequest(
-            'blockchain.scripthash.get_balance', False, self.scripthash)
+        result = self._cached('get_balance', lambda: self._sendRequest(
+            'blockchain.scripthash.get_balance', False, self.scripthash))
         return (result or {}).get('confirmed', 0) + (result or {}).get('unconfirmed', 0)
 
     def getBanner(self):
@@ -217,43 +394,64 @@ class ElectrumxAPI():
             logging.error(f"Error getting banner: {str(e)}")
             return "timeout error - unable to get banner"
 
+    def _fetchTransactionHistory(self):
+        history = self._sendRequest(
+            'blockchain.scripthash.get_history', False, self.scripthash)
+        if isinstance(history, list):
+            # electrumx always returns the whole history, remember which
+            # entries are new so callers only need to decode those
+            self.newTransactionHistory = self.cache.mergeHistory(
+                self.scripthash, history)
+        return history
+
     def getTransactionHistory(self):
         # b.send("blockchain.scripthash.get_history", script_hash('REsQeZT8KD8mFfcD4ZQQWis4Ju9eYjgxtT'))
         # b'{"jsonrpc":"2.0","result":[{"tx_hash":"a015f44b866565c832022cab0dec94ce0b8e568dbe7c88dce179f9616f7db7e3","height":2292586}],"id":1656046324946}\n'
         try:
-            return self._sendRequest(
-                'blockchain.scripthash.get_history', False, self.scripthash)
+            return self._cached('get_history', self._fetchTransactionHistory)
         except Exception as e:
             logging.error(f"Error getting transaction history: {str(e)}")
             return []
 
+    def getNewTransactionHistory(self) -> list[dict]:
+        '''
+        history entries that appeared since the previous fetch: confirmed
+        above the last known height, or unconfirmed. empty if the status
+        hasn't changed.
+        '''
+        hit, _ = self.cache.get(self.scripthash, 'get_history')
+        if hit:
+            return []
+        self.getTransactionHistory()
+        return self.newTransactionHistory
+
     def getUnspentCurrency(self):
-        return self._sendRequest(
-            'blockchain.scripthash.listunspent', False, self.scripthash)
+        return self._cached('listunspent', lambda: self._sendRequest(
+            'blockchain.scripthash.listunspent', False, self.scripthash))
 
     def getUnspentAssets(self):
         # {'jsonrpc': '2.0', 'result': [{'tx_hash': 'bea0e23c0aa8a4f1e1bb8cda0c6f487a3c0c0e7a54c47b6e1883036898bdc101', 'tx_pos': 0, 'height': 868584, 'asset': 'KINKAJOU/GROOMER1', 'value': 100000000}], 'id': 1719672839478}
         if self.chain == 'Evrmore':
-            return self._sendRequest(
+            return self._cached('listunspent SATORI', lambda: self._sendRequest(
                 'blockchain.scripthash.listunspent',
                 False,
                 self.scripthash,
-                'SATORI')
+                'SATORI'))
         else:
-            return self._sendRequest(
+            return self._cached('listassets', lambda: self._sendRequest(
                 'blockchain.scripthash.listassets',
                 False,
-                self.scripthash)
+                self.scripthash))
 
     def getBalance(self):
         # {'jsonrpc': '2.0', 'result': {'confirmed': 0, 'unconfirmed': 0}, 'id': 1719672672565}
         if self.chain == 'Evrmore':
-            balances = self._sendRequest(
-                'blockchain.scripthash.get_asset_balance', False, self.scripthash, 'SATORI')
+            balances = self._cached('get_asset_balance SATORI', lambda: self._sendRequest(
+                'blockchain.scripthash.get_asset_balance', False, self.scripthash, 'SATORI'))
             return balances.get('confirmed', 0) + balances.get('unconfirmed', 0)
         else:
-            return self._sendRequest(
-                'blockchain.scripthash.get_asset_balance', False, self.scripthash).get('confirmed', {}).get('SATORI', 0)
+            return self._cached('get_asset_balance', lambda: self._sendRequest(
+                'blockchain.scripthash.get_asset_balance', False, self.scripthash)).get('confirmed', {}).get('SATORI', 0)
 
         # if self._balance is None:
         #     if self.chain == 'Evrmore':
@@ -265,38 +463,105 @@ class ElectrumxAPI():
         #         self._balance = self.balances.get('confirmed', {}).get('SATORI', 0)
         # return self._balance
 
+    def selectCoins(
+        self,
+        amount: int,
+        assetAmount: int = 0,
+        selector: CoinSelector = None,
+        reserve: bool = True,
+        **kwargs,
+    ) -> Selection:
+        '''
+        chooses inputs from our (cached) unspents to send amount sats of
+        currency and assetAmount sats of SATORI, see CoinSelector.select.
+        with reserve the chosen inputs aren't offered again until our status
+        changes, so sends in quick succession don't pick the same coins.
+        without a selector the fee is sized by our FeeEstimator.
+        '''
+        selector = selector or self.feeEstimator.selector(
+            currency='evr' if self.chain == 'Evrmore' else 'rvn')
+        selection = selector.select(
+            self.getUnspentCurrency() or [],
+            amount,
+            assetUtxos=[
+                u for u in self.getUnspentAssets() or []
+                if u.get('asset', u.get('name')) == 'SATORI'],
+            assetAmount=assetAmount,
+            exclude=self.cache.reserved(self.scripthash),
+            **kwargs)
+        if reserve:
+            self.cache.reserve(self.scripthash, selection.outpoints())
+        return selection
+
     def getStats(self):
         return self._sendRequest('blockchain.asset.get_meta', False, 'SATORI')
 
     # getTransaction Method to get the transaction
-    def getTransaction(self, tx_hash: str, throttle: int = 0.34):
-        time.sleep(throttle)
-        return self._sendRequest('blockchain.transaction.get', False, tx_hash, True)
+    def getTransaction(self, tx_hash: str, throttle: Union[float, None] = None, cached: bool = False):
+        # pacing is up to the connection's rate limiter, throttle only adds
+        # a fixed sleep for callers that still ask for one. cached returns
+        # the transaction without its chain fields (confirmations and the
+        # like, see TransactionCache) from the cache when it's there
+        if cached:
+            tx = self.transactionCache.get(tx_hash)
+            if tx is not None:
+                return tx
+        if throttle is not None:
+            time.sleep(throttle)
+        tx = self._sendRequest('blockchain.transaction.get', False, tx_hash, True)
+        self.transactionCache.put(tx_hash, tx)
+        return TransactionCache.body(tx) if cached else tx
+
+    def getTransactions(
+        self,
+        tx_hashes: list[str],
+        chunkSize: int = 250,
+        cached: bool = True,
+    ) -> list[Union[dict, None]]:
+        '''
+        verbose transactions in the order given, None where one failed. each
+        txid is fetched at most once. with cached (for decoding inputs and
+        outputs) they come without chain fields and cached ones aren't
+        fetched at all, otherwise all are fetched with current confirmations.
+        '''
+        found = {}
+        for txHash in tx_hashes:
+            if txHash not in found:
+                found[txHash] = self.transactionCache.get(txHash) if cached else None
+        missing = [txHash for txHash, tx in found.items() if tx is None]
+        for i in range(0, len(missing), chunkSize):
+            chunk = missing[i:i+chunkSize]
+            for txHash, tx in zip(chunk, self.batch([
+                ('blockchain.transaction.get', txHash, True)
+                for txHash in chunk
+            ])):
+                if isinstance(tx, ElectrumxError):
+                    logging.error(f"Error getting transaction: {str(tx)}")
+                    tx = None
+                self.transactionCache.put(txHash, tx)
+                found[txHash] = TransactionCache.body(tx) if cached else tx
+        return [found[txHash] for txHash in tx_hashes]
 
     # getAssetBalanceForHolder Method
-    def getAssetBalanceForHolder(self, scripthash: str, throttle: int = 1):
-        time.sleep(throttle)
+    def getAssetBalanceForHolder(self, scripthash: str, throttle: Union[float, None] = None):
+        if throttle is not None:
+            time.sleep(throttle)
         return self._sendRequest('blockchain.scripthash.get_asset_balance', True, scripthash).get('confirmed', {}).get('SATORI', 0)
 
     # getAssetHolders
     def getAssetHolders(self, target_address: Union[str, None] = None) -> Union[Dict[str, int], bool]:
         if not self.handshake():
             return False
-        addresses = {}
-        last_addresses = None
-        i = 0
-        while last_addresses != addresses:
-            last_addresses = addresses
-            response = self._sendRequest(
-                'blockchain.asset.list_addresses_by_asset', False, 'SATORI', False, 1000, i)
-            if target_address is not None and target_address in response.keys():
-                return {target_address: response[target_address]}
-            addresses = {**addresses, **response}
-            if len(response) < 1000:
-                break
-            i += 1000
-            time.sleep(1)  # Throttle to avoid hitting server limits
-        return addresses
+        if target_address is not None:
+            # one balance lookup instead of scanning every holder
+            amount = self.getAssetBalanceForHolder(
+                TxUtils.addressToScripthash(target_address))
+            return {target_address: amount} if amount else {}
+        return dict(HolderScanner(self).scan())
+
+    def scanAssetHolders(self, asset: str = 'SATORI', concurrency: int = 4) -> HolderScanner:
+        ''' a scanner to stream holders of asset from, see HolderScanner '''
+        return HolderScanner(self, asset=asset, concurrency=concurrency)
 
     # broadcast method
     def broadcast(self, raw_tx: str):
@@ -327,8 +592,17 @@ class ElectrumxAPI():
         # if not self.handshake():
         #    raise Exception("Not connected to Electrumx server.")
         # Subscribe to the scripthash
-        initial_status = self._sendSubscriptionRequest(
-            'blockchain.scripthash.subscribe', False, self.scripthash)
+        if self.subscriptionManager is not None:
+            initial_status = self.subscriptionManager.subscribeScripthash(
+                self.scripthash, self._onNotification)
+            self.cache.setStatus(self.scripthash, initial_status)
+        else:
+            # the reply, and with it the status, arrives in the notification
+            # stream. until then nothing is cached
+            self.cache.forget(self.scripthash)
+            initial_status = self._sendSubscriptionRequest(
+                'blockchain.scripthash.subscribe', False, self.scripthash)
+            self.subscribedOn = self._subscriptionSocket()
         logging.debug(
             f"Initial status for scripthash {self.scripthash}: {initial_status}")
 
@@ -343,57 +617,103 @@ class ElectrumxAPI():
         # if not self.handshake():
         #    raise Exception("Not connected to Electrumx server.")
         # Subscribe to the headers for new block
-        initial_status_header = self._sendSubscriptionRequest(
-            'blockchain.headers.subscribe', False)
+        if self.subscriptionManager is not None:
+            initial_status_header = self.subscriptionManager.subscribeHeaders(
+                self._onNotification)
+        else:
+            initial_status_header = self._sendSubscriptionRequest(
+                'blockchain.headers.subscribe', False)
         logging.debug(f"Initial status for header: {initial_status_header}")
+        if self.headerTracker is not None and isinstance(initial_status_header, dict):
+            self.headerTracker.add(initial_status_header)
+
+    def currentHeader(self) -> Union[dict, None]:
+        '''
+        the tip as last seen on the header subscription, subscribing first
+        if there isn't one. headers.subscribe is only ever sent on a
+        subscription connection, on the request connection its notifications
+        would be read as responses. without a manager the reply comes in
+        with the notifications, so until it has this returns None.
+        '''
+        if self.subscriptionManager is not None:
+            if self._onNotification not in self.subscriptionManager.headerCallbacks:
+                self.subscribeBlockHeaders()
+            return self.subscriptionManager.header
+        if self.header is None:
+            self.subscribeBlockHeaders()
+        return self.header
 
     def processNotifications(self):
         """
         Processes incoming notifications for the subscribed scripthash and headers.
         """
         logging.debug("_processNotifications started")
+        if self.subscriptionManager is not None:
+            # the manager delivers straight to _onNotification
+            logging.debug("_processNotifications ended, using subscription manager")
+            return
         try:
             for notification in (
-                self.conn.receiveWalletNotifications()
+                self._subscriptions().receiveWalletNotifications()
                 if self.type == 'wallet'
-                else self.conn.receiveVaultNotifications()
+                else self._subscriptions().receiveVaultNotifications()
             ):
                 logging.debug(f"Received notification {notification}")
                 if self.stopAllSubscriptions.is_set():
                     logging.debug("Stop event set, breaking loop")
                     break
-                if 'method' in notification:
-                    if notification['method'] == 'blockchain.scripthash.subscribe':
-                        if 'params' in notification and len(notification['params']) == 2:
-                            scripthash, status = notification['params']
-                            if self.scripthash == scripthash:
-                                logging.debug(
-                                    f"Received update for scripthash {scripthash}: {status}")
-                                if callable(self.onScripthashNotification):
-                                    self.onScripthashNotification(notification)
-                    elif notification['method'] == 'blockchain.headers.subscribe':
-                        if 'params' in notification and len(notification['params']) > 0:
-                            header = notification['params'][0]
-                            logging.debug(
-                                f"Received new block header: height {header.get('height')}, hash {header.get('hex')[:64]}")
-                            self.lastBlockTime = time.time()
-                            if callable(self.onBlockNotification):
-                                self.onBlockNotification(notification)
-                    else:
-                        logging.error(
-                            f"Received unknown method: {notification['method']}")
+                self._onNotification(notification)
         except Exception as e:
             logging.error(f"Error in _processNotifications: {str(e)}")
         logging.debug("_processNotifications ended")
 
+    def _onNotification(self, notification: dict):
+        if 'method' in notification:
+            if notification['method'] == 'blockchain.scripthash.subscribe':
+                if 'params' in notification and len(notification['params']) == 2:
+                    scripthash, status = notification['params']
+                    if self.scripthash == scripthash:
+                        known = self.cache.generation(scripthash) is not None
+                        changed = self.cache.setStatus(scripthash, status)
+                        logging.debug(
+                            f"Received update for scripthash {scripthash}: {status}")
+                        # the reply to our subscribe (it has an id) is only
+                        # news if it differs from a status we already had
+                        if 'id' in notification and not (known and changed):
+                            return
+                        if callable(self.onScripthashNotification):
+                            self.onScripthashNotification(notification)
+            elif notification['method'] == 'blockchain.headers.subscribe':
+                if 'params' in notification and len(notification['params']) > 0:
+                    header = notification['params'][0]
+                    logging.debug(
+                        f"Received new block header: height {header.get('height')}, hash {header.get('hex')[:64]}")
+                    self.lastBlockTime = time.time()
+                    self.header = header
+                    if self.headerTracker is not None:
+                        self.headerTracker.onNotification(notification)
+                    if 'id' in notification:
+                        # the reply to our subscribe, the current tip
+                        return
+                    if callable(self.onBlockNotification):
+                        self.onBlockNotification(notification)
+            else:
+                logging.error(
+                    f"Received unknown method: {notification['method']}")
+
     # Method to stop subscription
     # unsubscribe from the Electrumx server
     # Stop the event and thread
     def stopScripthashSubscription(self):
         ''' Stops the subscription thread. '''
         try:
-            self._sendSubscriptionRequest(
-                'blockchain.scripthash.unsubscribe', False, self.scripthash)
+            if self.subscriptionManager is not None:
+                self.subscriptionManager.unsubscribeScripthash(
+                    self.scripthash, self._onNotification)
+                self.subscriptionManager.unsubscribeHeaders(self._onNotification)
+            else:
+                self._sendSubscriptionRequest(
+                    'blockchain.scripthash.unsubscribe', False, self.scripthash)
             logging.debug(
                 f"Unsubscribed from scripthash {self.scripthash}")
         except Exception as e:
@@ -0,0 +1,202 @@
+from typing import Union, Callable
+import hashlib
+import logging
+import threading
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+
+
+class ConfirmationWatch():
+    ''' calls callback(txid, confirmations) once txid has k confirmations '''
+
+    def __init__(self, txid: str, height: Union[int, None], k: int, callback: Callable):
+        self.txid = txid
+        self.height = height
+        self.k = k
+        self.callback = callback
+
+
+class HeaderTracker():
+    '''
+    follows the chain tip from blockchain.headers.subscribe notifications,
+    keeping the last size headers by height. a new tip is checked against
+    what we have: a lower or equal height, a gap, or a previous hash that
+    doesn't match the header below means a reorg (or missed blocks), and
+    the fork point is found by asking the server for the headers we hold.
+    confirmations are worked out from the tip and a transaction's height,
+    and watches fire when a transaction reaches k confirmations, so nothing
+    needs to poll blockchain.transaction.get.
+
+    kawpow headers (Ravencoin, Evrmore) don't hash with sha256d, for those
+    the header below a new tip is compared with the server's copy instead.
+    '''
+
+    def __init__(self, electrumx: 'ElectrumxAPI', size: int = 100):
+        self.electrumx = electrumx
+        self.size = size
+        self.lock = threading.RLock()
+        self.headers: dict[int, str] = {}
+        self.tip = 0
+        self.watches: list[ConfirmationWatch] = []
+        self.reorgCallbacks: list[Callable] = []
+
+    @staticmethod
+    def prevHash(header: str) -> str:
+        ''' the previous block hash a header commits to, as usually displayed '''
+        return bytes.fromhex(header[8:72])[::-1].hex()
+
+    @staticmethod
+    def blockHash(header: str) -> Union[str, None]:
+        ''' sha256d of an 80 byte header, None for longer (kawpow) headers '''
+        if len(header) != 160:
+            return None
+        return hashlib.sha256(
+            hashlib.sha256(bytes.fromhex(header)).digest()).digest()[::-1].hex()
+
+    def confirmations(self, height: Union[int, None]) -> int:
+        ''' confirmations of a transaction at height, 0 if unconfirmed '''
+        if height is None or height <= 0 or height > self.tip:
+            return 0
+        return self.tip - height + 1
+
+    def onReorg(self, callback: Callable):
+        ''' registers callback(forkHeight) to be called after every reorg '''
+        self.reorgCallbacks.append(callback)
+
+    def watch(self, txid: str, height: Union[int, None], k: int, callback: Callable) -> ConfirmationWatch:
+        '''
+        calls callback(txid, confirmations) once the transaction at height
+        (None or <= 0 while unconfirmed) has k confirmations, at once if it
+        already does.
+        '''
+        watch = ConfirmationWatch(txid, height, k, callback)
+        with self.lock:
+            self.watches.append(watch)
+        self._fire()
+        return watch
+
+    def unwatch(self, watch: ConfirmationWatch):
+        with self.lock:
+            if watch in self.watches:
+                self.watches.remove(watch)
+
+    def confirm(self, txid: str, height: int):
+        ''' tells watches on txid it was mined at height '''
+        with self.lock:
+            for watch in self.watches:
+                if watch.txid == txid:
+                    watch.height = height
+        self._fire()
+
+    def _fire(self):
+        with self.lock:
+            ready = [
+                w for w in self.watches
+                if self.confirmations(w.height) >= w.k]
+            for watch in ready:
+                self.watches.remove(watch)
+        for watch in ready:
+            try:
+                watch.callback(watch.txid, self.confirmations(watch.height))
+            except Exception as e:
+                logging.error(f'error in confirmation callback for {watch.txid}: {e}')
+
+    def _request(self, method: str, *params):
+        result = self.electrumx.batch([(method, *params)])[0]
+        if isinstance(result, ElectrumxError):
+            raise result
+        return result
+
+    def sync(self):
+        '''
+        takes the current tip from the header subscription, for when no
+        notification has come yet. without a subscription manager the tip
+        arrives later, as the reply to the subscribe.
+        '''
+        self.add(self.electrumx.currentHeader())
+
+    def onNotification(self, notification: dict):
+        ''' takes blockchain.headers.subscribe notifications '''
+        params = notification.get('params') or []
+        if len(params) > 0 and isinstance(params[0], dict):
+            self.add(params[0])
+
+    def _linked(self, height: int, header: str) -> bool:
+        ''' does header at height build on the header we hold below it '''
+        below = self.headers.get(height - 1)
+        if below is None:
+            return len(self.headers) == 0
+        if HeaderTracker.blockHash(below) is not None:
+            return HeaderTracker.prevHash(header) == HeaderTracker.blockHash(below)
+        return self._request('blockchain.block.header', height - 1) == below
+
+    def _forkPoint(self) -> int:
+        ''' the lowest height whose header we hold but the server disagrees with '''
+        low = min(self.headers.keys())
+        result = self._request('blockchain.block.headers', low, len(self.headers))
+        served = result.get('hex', '')
+        offset = 0
+        for height in range(low, low + len(self.headers)):
+            header = self.headers.get(height)
+            if header is None or served[offset:offset + len(header)] != header:
+                return height
+            offset += len(header)
+        return low + len(self.headers)
+
+    def add(self, header: Union[dict, None]):
+        ''' takes a new tip {'height': int, 'hex': str} '''
+        if not isinstance(header, dict) or 'height' not in header:
+            return
+        height, hex = header.get('height'), header.get('hex', '')
+        reorg = None
+        with self.lock:
+            if self.headers.get(height) == hex:
+                return
+            try:
+                if len(self.headers) > 0 and (
+                    height <= self.tip or
+                    height > self.tip + 1 or
+                    not self._linked(height, hex)
+                ):
+                    fork = self._forkPoint()
+                    if fork <= self.tip:
+                        self._rollback(fork)
+                        reorg = fork
+                if (len(self.headers) > 0 or reorg is not None) and height > self.tip + 1:
+                    # missed blocks, fill the gap from the server
+                    self._extend(self.tip + 1, self._request(
+                        'blockchain.block.headers',
+                        self.tip + 1,
+                        height - self.tip - 1))
+            except Exception as e:
+                logging.error(f'error checking header {height}: {e}')
+            self.headers[height] = hex
+            self.tip = height
+            for old in [h for h in self.headers if h <= height - self.size or h > height]:
+                del self.headers[old]
+        if reorg is not None:
+            logging.warning(f'reorg from height {reorg}, new tip {height}')
+            for callback in list(self.reorgCallbacks):
+                try:
+                    callback(reorg)
+                except Exception as e:
+                    logging.error(f'error in reorg callback: {e}')
+        self._fire()
+
+    def _extend(self, start: int, result: dict):
+        served = result.get('hex', '')
+        count = result.get('count', 0)
+        if count == 0:
+            return
+        size = len(served) // count
+        for i in range(count):
+            self.headers[start + i] = served[i * size:(i + 1) * size]
+        self.tip = start + count - 1
+
+    def _rollback(self, fork: int):
+        ''' drops headers from fork up and unconfirms watches mined there '''
+        for height in [h for h in self.headers if h >= fork]:
+            del self.headers[height]
+        self.tip = fork - 1
+        for watch in self.watches:
+            if watch.height is not None and watch.height >= fork:
+                watch.height = None
@@ -0,0 +1,312 @@
+from typing import Union, Callable, Iterator
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import json
+import logging
+import os
+import threading
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+from satoriwallet.api.blockchain.electrumx.subscriptions import SubscriptionManager
+from satoriwallet.lib.transaction.utils import TxUtils
+
+
+class HolderScanner():
+    '''
+    pages through blockchain.asset.list_addresses_by_asset and yields
+    (address, amount) pairs as they arrive, never holding more than the
+    pages in flight. with a pipelined connection or a pool, up to
+    concurrency pages are requested at once, the rate limiter of the
+    connection decides how fast they actually go out (its 'asset' class,
+    sized for the default concurrency; a higher concurrency needs a
+    RateLimiter with a larger 'asset' budget). pages are read from a
+    live holder set, so an address whose balance changes mid scan may be
+    missed or seen twice. a page that isn't answered within timeout (the
+    connection's by default) fails the scan.
+    '''
+
+    def __init__(
+        self,
+        electrumx: 'ElectrumxAPI',
+        asset: str = 'SATORI',
+        pageSize: int = 1000,
+        concurrency: int = 4,
+        timeout: Union[float, None] = None,
+    ):
+        self.electrumx = electrumx
+        self.asset = asset
+        self.pageSize = pageSize
+        self.concurrency = max(concurrency, 1)
+        self.timeout = timeout
+
+    def _request(self, offset: int) -> Future:
+        return self.electrumx._requests().sendAsync(
+            'blockchain.asset.list_addresses_by_asset',
+            self.asset,
+            False,
+            self.pageSize,
+            offset)
+
+    def _page(self, future: Future) -> dict[str, int]:
+        try:
+            response = future.result(timeout=self.timeout or self.electrumx._requests().timeout)
+        except FutureTimeoutError:
+            # failing the future lets the connection (or pool) count it
+            if not future.done():
+                future.set_exception(ElectrumxError('no response'))
+            raise ElectrumxError('no response')
+        if response is None:
+            raise ElectrumxError('no response')
+        if 'error' in response:
+            raise ElectrumxError(response.get('error'))
+        return response.get('result') or {}
+
+    def pages(self) -> Iterator[dict[str, int]]:
+        ''' each page in offset order, the last one is short '''
+        self.electrumx._ensureConnected()
+        inflight: deque[Future] = deque()
+        offset = 0
+        try:
+            while True:
+                while len(inflight) < self.concurrency:
+                    inflight.append(self._request(offset))
+                    offset += self.pageSize
+                page = self._page(inflight.popleft())
+                yield page
+                if len(page) < self.pageSize:
+                    return
+        finally:
+            for future in inflight:
+                future.cancel()
+
+    def scan(self) -> Iterator[tuple[str, int]]:
+        for page in self.pages():
+            yield from page.items()
+
+    def toCallback(self, callback: Callable) -> int:
+        ''' calls callback(address, amount) for every holder, returns how many '''
+        count = 0
+        for address, amount in self.scan():
+            callback(address, amount)
+            count += 1
+        return count
+
+    def toFile(self, path: str) -> int:
+        ''' writes address,amount lines to path, returns how many '''
+        with open(path, 'w') as f:
+            count = self.toCallback(
+                lambda address, amount: f.write(f'{address},{amount}\n'))
+        logging.debug(f'wrote {count} {self.asset} holders to {path}')
+        return count
+
+
+class HolderSnapshot():
+    '''
+    every holder of an asset and their confirmed amount as of a block
+    height, persisted to path if one is given. refresh() rescans the whole
+    holder set and diffs it against the snapshot. between refreshes,
+    follow() keeps it current cheaply: it subscribes to the scripthash of
+    each holder and re-reads the balance of only those whose status
+    changed. a block's header notification comes before its scripthash
+    notifications, so the re-read waits until no notification has come for
+    delay seconds and is then tagged with the latest tip. electrumx can't
+    tell us which scripthashes a block touched, so new holders only appear
+    with the next refresh().
+    '''
+
+    def __init__(
+        self,
+        electrumx: 'ElectrumxAPI',
+        asset: str = 'SATORI',
+        path: Union[str, None] = None,
+        chunkSize: int = 250,
+        delay: float = 2,
+    ):
+        self.electrumx = electrumx
+        self.asset = asset
+        self.path = path
+        self.chunkSize = chunkSize
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.holders: dict[str, int] = {}
+        self.height = 0
+        self.ranked: Union[list[tuple[str, int]], None] = None
+        self.scripthashes: dict[str, str] = {}
+        # holders notified since the last re-read, the tip they go with and
+        # the timer that re-reads them once notifications settle
+        self.touched: set[str] = set()
+        self.tip: Union[int, None] = None
+        self.timer: Union[threading.Timer, None] = None
+        self.touchedLock = threading.Lock()
+        # our own callbacks on the manager, by scripthash
+        self.callbacks: dict[str, Callable] = {}
+        self.manager: Union[SubscriptionManager, None] = None
+        self.load()
+
+    def lookup(self, address: str) -> int:
+        return self.holders.get(address, 0)
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        ''' the n largest holders, largest first '''
+        with self.lock:
+            if self.ranked is None:
+                self.ranked = sorted(
+                    self.holders.items(),
+                    key=lambda item: item[1],
+                    reverse=True)
+            return self.ranked[:n]
+
+    def _tip(self) -> int:
+        ''' the tip from a header subscription, raises if there's none yet '''
+        if self.manager is not None and self.manager.header is not None:
+            header = self.manager.header
+        else:
+            header = self.electrumx.currentHeader()
+        if not isinstance(header, dict) or 'height' not in header:
+            raise Exception(
+                'no chain tip to tag the snapshot with yet, follow() a '
+                'SubscriptionManager or run processNotifications first')
+        return header['height']
+
+    def _apply(self, changes: dict[str, int], height: int) -> dict[str, int]:
+        with self.lock:
+            for address, amount in changes.items():
+                if amount > 0:
+                    self.holders[address] = amount
+                else:
+                    self.holders.pop(address, None)
+            self.height = max(self.height, height)
+            if len(changes) > 0:
+                self.ranked = None
+        self.save()
+        return changes
+
+    def refresh(self) -> dict[str, int]:
+        '''
+        rescans every holder, returns {address: amount} of what changed.
+        needs a header subscription to know the height it's as of.
+        '''
+        height = self._tip()
+        seen = set()
+        changes = {}
+        for address, amount in HolderScanner(self.electrumx, asset=self.asset).scan():
+            seen.add(address)
+            if self.holders.get(address) != amount:
+                changes[address] = amount
+        for address in self.holders.keys() - seen:
+            changes[address] = 0
+        if self.manager is not None:
+            self._watch([a for a, amount in changes.items() if amount > 0])
+        return self._apply(changes, height)
+
+    def _scripthash(self, address: str) -> str:
+        if address not in self.scripthashes:
+            self.scripthashes[address] = TxUtils.addressToScripthash(address)
+        return self.scripthashes[address]
+
+    def _amount(self, balance: Union[dict, None]) -> int:
+        confirmed = (balance or {}).get('confirmed', 0)
+        if isinstance(confirmed, dict):
+            return confirmed.get(self.asset, 0)
+        return confirmed or 0
+
+    def balances(self, addresses: list[str]) -> dict[str, int]:
+        ''' confirmed amounts of asset held by addresses, read in batches '''
+        amounts = {}
+        for i in range(0, len(addresses), self.chunkSize):
+            chunk = addresses[i:i+self.chunkSize]
+            results = self.electrumx.batch([
+                ('blockchain.scripthash.get_asset_balance', self._scripthash(address)) +
+                ((self.asset,) if self.electrumx.chain == 'Evrmore' else ())
+                for address in chunk])
+            for address, balance in zip(chunk, results):
+                if isinstance(balance, ElectrumxError):
+                    logging.error(f'error getting balance of {address}: {balance}')
+                    continue
+                amounts[address] = self._amount(balance)
+        return amounts
+
+    def update(self, addresses: list[str], height: Union[int, None] = None) -> dict[str, int]:
+        ''' re-reads the given addresses only, returns what changed '''
+        changes = {
+            address: amount
+            for address, amount in self.balances(addresses).items()
+            if self.holders.get(address, 0) != amount}
+        return self._apply(changes, height if height is not None else self.height)
+
+    def follow(self, manager: SubscriptionManager):
+        ''' keeps the snapshot current block by block using manager '''
+        self.manager = manager
+        self._watch(list(self.holders.keys()))
+        header = manager.subscribeHeaders(self._onHeader)
+        if isinstance(header, dict):
+            self.tip = header.get('height')
+
+    def _watch(self, addresses: list[str]):
+        for address in addresses:
+            scripthash = self._scripthash(address)
+            if scripthash in self.callbacks:
+                continue
+            callback = lambda notification, address=address: self._touch(address)
+            self.manager.subscribeScripthash(scripthash, callback)
+            self.callbacks[scripthash] = callback
+
+    def _touch(self, address: str):
+        with self.touchedLock:
+            self.touched.add(address)
+        self._schedule()
+
+    def _schedule(self):
+        ''' (re)starts the timer, so the re-read happens once things are quiet '''
+        with self.touchedLock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self._flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _onHeader(self, notification: dict):
+        header = (notification.get('params') or [{}])[0]
+        with self.touchedLock:
+            self.tip = header.get('height', self.tip)
+        # the block's scripthash notifications are still to come
+        self._schedule()
+
+    def _flush(self):
+        with self.touchedLock:
+            touched, self.touched = self.touched, set()
+            height = self.tip
+            self.timer = None
+        try:
+            changes = self.update(list(touched), height=height)
+        except Exception as e:
+            logging.error(f'error updating {self.asset} holders: {e}')
+            with self.touchedLock:
+                self.touched.update(touched)
+            return
+        if len(changes) > 0:
+            logging.debug(f'{len(changes)} {self.asset} holders changed at {height}')
+
+    def load(self):
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                raw = json.load(f)
+            if raw.get('asset') == self.asset:
+                self.holders = raw.get('holders', {})
+                self.height = raw.get('height', 0)
+        except Exception as e:
+            logging.error(f'unable to load holder snapshot {self.path}: {e}')
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            raw = {'asset': self.asset, 'height': self.height, 'holders': dict(self.holders)}
+        try:
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(raw, f)
+            os.replace(temporary, self.path)
+        except Exception as e:
+            logging.error(f'unable to save holder snapshot {self.path}: {e}')
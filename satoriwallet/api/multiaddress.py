@@ -0,0 +1,116 @@
+from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+
+
+class MultiAddressClient():
+    '''
+    balances and unspents of many scripthashes at once over the connection
+    (or pool) of an ElectrumxAPI. duplicates are asked for once, calls go
+    out as json-rpc batches of chunkSize with at most concurrency batches in
+    flight, and the differences between the Evrmore and Ravencoin asset
+    calls are hidden: every result is keyed by the currency symbol and the
+    asset name alike.
+    '''
+
+    def __init__(
+        self,
+        electrumx: 'ElectrumxAPI',
+        asset: str = 'SATORI',
+        chunkSize: int = 250,
+        concurrency: int = 4,
+    ):
+        self.electrumx = electrumx
+        self.asset = asset
+        self.chunkSize = chunkSize
+        self.concurrency = max(concurrency, 1)
+        self.currency = 'EVR' if electrumx.chain == 'Evrmore' else 'RVN'
+
+    def _assetCall(self, method: str, scripthash: str) -> tuple:
+        if self.electrumx.chain == 'Evrmore':
+            return (method, scripthash, self.asset)
+        if method == 'blockchain.scripthash.listunspent':
+            return ('blockchain.scripthash.listassets', scripthash)
+        return (method, scripthash)
+
+    def _fanOut(self, calls: list[tuple]) -> list:
+        ''' results of calls in order, ElectrumxError where one failed '''
+        chunks = [
+            calls[i:i+self.chunkSize]
+            for i in range(0, len(calls), self.chunkSize)]
+        if len(chunks) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as executor:
+            results = []
+            for batch in executor.map(self._batch, chunks):
+                results.extend(batch)
+            return results
+
+    def _batch(self, calls: list[tuple]) -> list:
+        try:
+            return self.electrumx.batch(calls)
+        except Exception as e:
+            logging.error(f'error in batch of {len(calls)} calls: {e}')
+            return [ElectrumxError(str(e)) for _ in calls]
+
+    @staticmethod
+    def _error(*results) -> Union[ElectrumxError, None]:
+        return next((r for r in results if isinstance(r, ElectrumxError)), None)
+
+    @staticmethod
+    def _total(balance: Union[dict, None], asset: Union[str, None] = None) -> int:
+        ''' confirmed plus unconfirmed, from either shape of balance '''
+        total = 0
+        for key in ('confirmed', 'unconfirmed'):
+            amount = (balance or {}).get(key, 0)
+            if isinstance(amount, dict):
+                amount = amount.get(asset, 0)
+            total += amount or 0
+        return total
+
+    def getBalances(self, scripthashes: list[str]) -> dict[str, Union[dict[str, int], None]]:
+        '''
+        {scripthash: {'EVR': sats, 'SATORI': sats}} (RVN on Ravencoin),
+        None for a scripthash whose balance couldn't be read.
+        '''
+        unique = list(dict.fromkeys(scripthashes))
+        results = self._fanOut(
+            [('blockchain.scripthash.get_balance', sh) for sh in unique] +
+            [self._assetCall('blockchain.scripthash.get_asset_balance', sh) for sh in unique])
+        balances = {}
+        for sh, currency, asset in zip(unique, results[:len(unique)], results[len(unique):]):
+            error = MultiAddressClient._error(currency, asset)
+            if error is not None:
+                logging.error(f'error getting balance of {sh}: {error}')
+                balances[sh] = None
+                continue
+            balances[sh] = {
+                self.currency: MultiAddressClient._total(currency),
+                self.asset: MultiAddressClient._total(asset, self.asset)}
+        return balances
+
+    def listUnspent(self, scripthashes: list[str]) -> dict[str, Union[dict[str, list[dict]], None]]:
+        '''
+        {scripthash: {'EVR': [utxo, ...], 'SATORI': [utxo, ...]}} (RVN on
+        Ravencoin), None for a scripthash whose unspents couldn't be read.
+        '''
+        unique = list(dict.fromkeys(scripthashes))
+        results = self._fanOut(
+            [('blockchain.scripthash.listunspent', sh) for sh in unique] +
+            [self._assetCall('blockchain.scripthash.listunspent', sh) for sh in unique])
+        unspents = {}
+        for sh, currency, asset in zip(unique, results[:len(unique)], results[len(unique):]):
+            error = MultiAddressClient._error(currency, asset)
+            if error is not None:
+                logging.error(f'error listing unspent of {sh}: {error}')
+                unspents[sh] = None
+                continue
+            unspents[sh] = {
+                self.currency: [
+                    utxo for utxo in currency or []
+                    if utxo.get('asset') is None],
+                self.asset: [
+                    utxo for utxo in asset or []
+                    if utxo.get('asset', utxo.get('name')) == self.asset]}
+        return unspents
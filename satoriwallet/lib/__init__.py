@@ -1 +1,2 @@
-from satoriwallet.lib.connection import authPayload
+from satoriwallet.lib.connection import authPayload, ChallengeVerifier
+from satoriwallet.lib.addresses import validateAddresses, AddressReason
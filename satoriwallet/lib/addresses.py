@@ -0,0 +1,72 @@
+from typing import Union, Iterable
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+from satoriwallet.lib import b58
+from satoriwallet.lib.ethereum.valid_eth import checksumAddress
+
+
+class AddressReason():
+    ''' why validateAddresses rejected an address, 0 means it's valid '''
+    valid = 0
+    format = 1  # wrong prefix, length or characters
+    checksum = 2
+    version = 3  # decodes fine but is for another chain or network
+    names = {0: 'valid', 1: 'format', 2: 'checksum', 3: 'version'}
+
+
+# P2PKH and P2SH version bytes and what addresses with them look like
+chains = {
+    'evr': (re.compile(r'^[Ee][1-9A-HJ-NP-Za-km-z]{33}$'), (0x21, 0x5c)),
+    'rvn': (re.compile(r'^[Rr][1-9A-HJ-NP-Za-km-z]{33}$'), (0x3c, 0x7a)),
+    'eth': (re.compile(r'^0x[a-fA-F0-9]{40}$'), ()),
+}
+
+chainNames = {'evrmore': 'evr', 'ravencoin': 'rvn', 'ethereum': 'eth'}
+
+
+def _reason(address: str, chain: str) -> int:
+    pattern, versions = chains[chain]
+    if not isinstance(address, str) or pattern.match(address) is None:
+        return AddressReason.format
+    if chain == 'eth':
+        return AddressReason.valid if checksumAddress(address) else AddressReason.checksum
+    payload = b58.checkDecode(address)
+    if payload is None:
+        return AddressReason.checksum
+    if len(payload) != 21 or payload[0] not in versions:
+        return AddressReason.version
+    return AddressReason.valid
+
+
+def _validateChunk(addresses: list[str], chain: str) -> bytes:
+    return bytes(_reason(address, chain) for address in addresses)
+
+
+def validateAddresses(
+    addresses: Iterable[str],
+    chain: str,
+    processes: Union[int, None] = 1,
+    chunkSize: int = 50000,
+) -> array:
+    '''
+    an AddressReason code per address (an unsigned byte array, 0 is valid)
+    for chain 'evr', 'rvn' or 'eth' (or 'evrmore', 'ravencoin', 'ethereum').
+    evr and rvn addresses are base58check with a P2PKH or P2SH version
+    byte, mixed case eth addresses must carry an EIP-55 checksum. lists
+    longer than chunkSize are split across processes workers, None meaning
+    all cores.
+    '''
+    chain = chainNames.get(chain.lower(), chain.lower())
+    if chain not in chains:
+        raise Exception(f'unknown chain {chain}')
+    addresses = list(addresses)
+    if processes == 1 or len(addresses) <= chunkSize:
+        return array('B', _validateChunk(addresses, chain))
+    chunks = [addresses[i:i + chunkSize] for i in range(0, len(addresses), chunkSize)]
+    results = array('B')
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        for codes in pool.map(_validateChunk, chunks, [chain] * len(chunks)):
+            results.frombytes(codes)
+    return results
@@ -0,0 +1,39 @@
+from typing import Union
+import hashlib
+
+alphabet = b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# byte -> digit value, 0xff for bytes outside the alphabet. bytes.translate
+# maps a whole address at once, so the loop in decode only does arithmetic
+table = bytes(
+    alphabet.index(c) if c in alphabet else 0xff
+    for c in range(256))
+
+
+def decode(encoded: Union[str, bytes]) -> Union[bytes, None]:
+    ''' base58 decode, None if encoded has a character outside the alphabet '''
+    if isinstance(encoded, str):
+        try:
+            encoded = encoded.encode('ascii')
+        except UnicodeEncodeError:
+            return None
+    digits = encoded.translate(table)
+    if 0xff in digits:
+        return None
+    n = 0
+    for digit in digits:
+        n = n * 58 + digit
+    # leading '1's are leading zero bytes
+    zeros = len(digits) - len(digits.lstrip(b'\x00'))
+    return b'\x00' * zeros + n.to_bytes((n.bit_length() + 7) // 8, 'big')
+
+
+def checkDecode(encoded: Union[str, bytes]) -> Union[bytes, None]:
+    ''' the payload (version byte included) of base58check data, None if invalid '''
+    decoded = decode(encoded)
+    if decoded is None or len(decoded) < 5:
+        return None
+    payload, checksum = decoded[:-4], decoded[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
@@ -0,0 +1,77 @@
+from typing import Any, Callable, Hashable
+from collections import OrderedDict
+import threading
+
+
+class LRUCache():
+    ''' a thread-safe, size bounded, least recently used cache with counters '''
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.items
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            return self.items.pop(key, default)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.items),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses}
+
+
+class AddressCache(LRUCache):
+    '''
+    addresses derived from public keys, keyed by (chain, pubkey). a pubkey
+    always gives the same address so entries never go stale, the cache is
+    only bounded to keep memory in check. shared by the verify modules.
+    '''
+
+    shared: 'AddressCache' = None
+
+    @staticmethod
+    def default() -> 'AddressCache':
+        if AddressCache.shared is None:
+            AddressCache.shared = AddressCache()
+        return AddressCache.shared
+
+    def address(self, chain: str, publicKey: str, derive: Callable[[str], str]) -> str:
+        ''' the cached address of publicKey on chain, derive(publicKey) if new '''
+        address = self.get((chain, publicKey))
+        if address is None:
+            address = derive(publicKey)
+            self.put((chain, publicKey), address)
+        return address
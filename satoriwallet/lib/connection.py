@@ -1,8 +1,19 @@
 # a satori node uses the wallet public key to connect to the server via signing a message.
 # the message is the date in UTC now that way the server doesn't have to give the client
 # a message to sign. so the client just sends up the public key and the sig. done.
+from typing import Union
 import json
+import time
 import datetime as dt
+from satoriwallet.lib.cache import LRUCache
+from satoriwallet.lib.evrmore.verify import (
+    verify as verifyEvrmore,
+    verifyMany as verifyManyEvrmore,
+    generateAddress as generateAddressEvrmore)
+from satoriwallet.lib.ravencoin.verify import (
+    verify as verifyRavencoin,
+    verifyMany as verifyManyRavencoin,
+    generateAddress as generateAddressRavencoin)
 
 
 def authPayload(wallet, challenge: str = None):
@@ -55,3 +66,133 @@ class AuthPayload:
             'pubkey': self.pubkey,
             'address': self.address,
             'signature': self.signature}
+
+
+class ChallengeVerifier():
+    '''
+    verifies authPayloads signed over getFullDateMessage(). the timestamp is
+    checked first: a challenge older than window seconds (or more than
+    future seconds ahead, for clock skew) is rejected before any signature
+    math, as is a payload whose address isn't the one its pubkey gives.
+    results are kept by (pubkey, address, message, signature) until the
+    challenge falls out of the window, so retries and duplicate submissions
+    are answered from the cache. challenges that aren't a date are rejected.
+    '''
+
+    chains = {
+        'evrmore': (verifyEvrmore, verifyManyEvrmore, generateAddressEvrmore),
+        'ravencoin': (verifyRavencoin, verifyManyRavencoin, generateAddressRavencoin)}
+
+    def __init__(
+        self,
+        chain: str = 'evrmore',
+        window: float = 600,
+        future: float = 60,
+        maxsize: int = 100000,
+    ):
+        if chain not in ChallengeVerifier.chains:
+            raise Exception(f'unknown chain {chain}')
+        (
+            self.verifySignature,
+            self.verifySignatures,
+            self.generateAddress,
+        ) = ChallengeVerifier.chains[chain]
+        self.window = window
+        self.future = future
+        self.verified = LRUCache(maxsize=maxsize)
+
+    @staticmethod
+    def _unpack(payload: Union[AuthPayload, dict]) -> tuple:
+        if isinstance(payload, dict):
+            return (
+                payload.get('message'), payload.get('signature'),
+                payload.get('pubkey'), payload.get('address'))
+        return payload.message, payload.signature, payload.pubkey, payload.address
+
+    @staticmethod
+    def timestamp(message: str) -> Union[float, None]:
+        ''' unix time of a getFullDateMessage() challenge, None if it isn't one '''
+        try:
+            signedAt = dt.datetime.fromisoformat(message)
+        except (TypeError, ValueError):
+            return None
+        if signedAt.tzinfo is None:
+            signedAt = signedAt.replace(tzinfo=dt.timezone.utc)
+        return signedAt.timestamp()
+
+    def expires(self, message: str, now: float = None) -> Union[float, None]:
+        ''' when the challenge goes stale, None if it's stale or not a date '''
+        now = now or time.time()
+        signedAt = ChallengeVerifier.timestamp(message)
+        if signedAt is None or not (-self.future <= now - signedAt <= self.window):
+            return None
+        return signedAt + self.window
+
+    def _consistent(self, pubkey: Union[str, None], address: Union[str, None]) -> bool:
+        ''' does the payload name an address, and its pubkey's if it has both '''
+        if pubkey is None:
+            return address is not None
+        if address is None:
+            return True
+        try:
+            return self.generateAddress(pubkey) == address
+        except Exception:
+            return False
+
+    def _cached(self, key: tuple, now: float) -> Union[bool, None]:
+        cached = self.verified.get(key)
+        if cached is None:
+            return None
+        result, expires = cached
+        if expires < now:
+            self.verified.pop(key)
+            return None
+        return result
+
+    def verify(self, payload: Union[AuthPayload, dict], now: float = None) -> bool:
+        ''' is payload signed by its pubkey (or address) over a fresh challenge '''
+        now = now or time.time()
+        message, signature, pubkey, address = ChallengeVerifier._unpack(payload)
+        expires = self.expires(message, now)
+        if expires is None or not self._consistent(pubkey, address):
+            return False
+        key = (pubkey, address, message, signature)
+        result = self._cached(key, now)
+        if result is None:
+            try:
+                result = bool(self.verifySignature(
+                    message, signature,
+                    publicKey=pubkey,
+                    address=address))
+            except Exception:
+                result = False
+            self.verified.put(key, (result, expires))
+        return result
+
+    def verifyMany(self, payloads: list[Union[AuthPayload, dict]], now: float = None, **kwargs) -> list[bool]:
+        '''
+        a bool per payload, stale and cached ones are answered at once and
+        the rest go to the chain's verifyMany (kwargs are passed along).
+        '''
+        now = now or time.time()
+        results = [False] * len(payloads)
+        pending = {}
+        for i, payload in enumerate(payloads):
+            message, signature, pubkey, address = ChallengeVerifier._unpack(payload)
+            expires = self.expires(message, now)
+            if expires is None or not self._consistent(pubkey, address):
+                continue
+            key = (pubkey, address, message, signature)
+            result = self._cached(key, now)
+            if result is not None:
+                results[i] = result
+            else:
+                pending.setdefault(key, (payload, expires, []))[2].append(i)
+        if len(pending) == 0:
+            return results
+        verified = self.verifySignatures([payload for payload, _, _ in pending.values()], **kwargs)
+        for (key, (_, expires, indexes)), result in zip(pending.items(), verified):
+            self.verified.put(key, (result, expires))
+            for i in indexes:
+                results[i] = result
+        return results
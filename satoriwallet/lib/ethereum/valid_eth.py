@@ -1,14 +1,45 @@
+from typing import Union, Iterable
 import re
-from eth_utils import is_checksum_address, to_checksum_address
+from eth_utils import to_checksum_address
+from satoriwallet.lib.cache import LRUCache
+
+pattern = re.compile(r'^0x[a-fA-F0-9]{40}$')
+
+# checksummed addresses by lowercase address, the same bridge addresses
+# come up again and again so keccak runs once for each
+checksums = LRUCache(maxsize=10000)
+
+
+def checksumAddress(address: str, cache: LRUCache = None) -> Union[str, None]:
+    '''
+    the EIP-55 checksummed form of address, None if it isn't an address or
+    is mixed case with a wrong checksum. all lower or upper case addresses
+    carry no checksum and are accepted as they are.
+    '''
+    if not isinstance(address, str) or pattern.match(address) is None:
+        return None
+    cache = cache if cache is not None else checksums
+    lower = address.lower()
+    checksummed = cache.get(lower)
+    if checksummed is None:
+        checksummed = to_checksum_address(lower)
+        cache.put(lower, checksummed)
+    digits = address[2:]
+    if digits != digits.lower() and digits != digits.upper() and address != checksummed:
+        return None
+    return checksummed
+
+
+def checksumAddresses(addresses: Iterable[str], cache: LRUCache = None) -> list[Union[str, None]]:
+    ''' checksumAddress of each address, each distinct address worked out once '''
+    results = {}
+    return [
+        results[address] if address in results else
+        results.setdefault(address, checksumAddress(address, cache))
+        for address in addresses]
 
 
 def isValidEthereumAddress(address: str) -> bool:
     # address = "0x32Be343B94f860124dC4fEe278FDCBD38C102D88"
-    # Check if it starts with '0x' and is 40 hexadecimal characters long
-    if re.match(r'^0x[a-fA-F0-9]{40}$', address):
-        # Optional: Verify checksum if it's a mixed-case address
-        if address == address.lower() or address == address.upper():
-            return True  # Not a checksummed address, but valid
-        else:
-            return is_checksum_address(address)  # Validate checksum
-    return False
+    # 0x and 40 hexadecimal characters, with a valid checksum if mixed case
+    return checksumAddress(address) is not None
@@ -1,2 +1,2 @@
-from satoriwallet.lib.evrmore.verify import verify
+from satoriwallet.lib.evrmore.verify import verify, verifyMany
 from satoriwallet.lib.evrmore.sign import signMessage
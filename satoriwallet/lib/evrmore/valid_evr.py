@@ -1,30 +1,21 @@
 from typing import Union
-import hashlib
-import base58
+import re
+from satoriwallet.lib import b58
+
+basicPattern = re.compile(r'^[E][a-zA-Z0-9]{33}$')
 
 
 def isValidEvrmoreAddressBasic(address: str) -> bool:
     '''Evrmore addresses typically start with 'E' and are 34 characters long'''
-    import re
-    pattern = r'^[E][a-zA-Z0-9]{33}$'
-    return bool(re.match(pattern, address))
+    return bool(basicPattern.match(address))
 
 
 def base58_check_decode(address: Union[str, bytes]) -> tuple[bool, Union[int, None]]:
     ''' Decode Base58Check address and return the payload and version byte. '''
-    try:
-        decoded = base58.b58decode(address)
-        version = decoded[0]
-        checksum = decoded[-4:]
-        payload = decoded[:-4]
-        # Calculate checksum of the payload
-        checksum_check = hashlib.sha256(
-            hashlib.sha256(payload).digest()).digest()[:4]
-        if checksum != checksum_check:
-            return False, None  # Checksum does not match
-        return True, version  # Return payload and version byte
-    except Exception:
-        return False, None
+    payload = b58.checkDecode(address)
+    if payload is None:
+        return False, None  # Bad character or checksum does not match
+    return True, payload[0]  # Return payload and version byte
 
 
 def isValidEvrmoreAddress(address: str) -> bool:
@@ -0,0 +1,222 @@
+from typing import Union
+import json
+import logging
+import sqlite3
+import threading
+from satoriwallet.lib.transaction.decoder import TransactionDecoder
+from satoriwallet.lib.structs import memoBytes
+
+
+class HistoryIndex():
+    '''
+    a local sqlite index of wallet history: per scripthash and txid the
+    height, block time, satoshis sent and received per asset and the memo.
+    update() only downloads transactions that aren't indexed yet at their
+    current height (or are still unconfirmed), so after a restart the
+    history is available at once and catching up costs a few requests.
+    follow() a HeaderTracker to have reorged blocks forgotten as they happen.
+    '''
+
+    schema = '''
+        create table if not exists transactions (
+            scripthash text not null,
+            txid text not null,
+            height integer not null,
+            time integer,
+            sent text not null,
+            received text not null,
+            memo blob,
+            primary key (scripthash, txid));
+        create index if not exists transactionsByHeight
+            on transactions (scripthash, height);
+        create index if not exists transactionsByTime
+            on transactions (scripthash, time);
+        create table if not exists scripthashes (
+            scripthash text primary key,
+            height integer not null);
+    '''
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock, self.db:
+            self.db.executescript(HistoryIndex.schema)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def lastHeight(self, scripthash: str) -> int:
+        ''' the highest confirmed height indexed for scripthash '''
+        with self.lock:
+            row = self.db.execute(
+                'select height from scripthashes where scripthash = ?',
+                (scripthash,)).fetchone()
+        return row['height'] if row is not None else 0
+
+    def indexed(self, scripthash: str) -> dict[str, int]:
+        ''' {txid: height} of everything indexed for scripthash '''
+        with self.lock:
+            return {
+                row['txid']: row['height']
+                for row in self.db.execute(
+                    'select txid, height from transactions where scripthash = ?',
+                    (scripthash,))}
+
+    def store(self, scripthash: str, rows: list[tuple]):
+        '''
+        rows of (txid, height, time, sent, received, memo), replacing what
+        was indexed for those txids, and advances the last indexed height.
+        '''
+        if len(rows) == 0:
+            return
+        with self.lock, self.db:
+            self.db.executemany(
+                'insert or replace into transactions values (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (scripthash, txid, height, time, json.dumps(sent), json.dumps(received), memo)
+                    for txid, height, time, sent, received, memo in rows])
+            self.db.execute(
+                'insert into scripthashes values (?, ?) on conflict(scripthash) '
+                'do update set height = max(height, excluded.height)',
+                (scripthash, max(row[1] for row in rows)))
+
+    def rollback(self, scripthash: Union[str, None], height: int):
+        ''' forgets everything above height of scripthash (or all), as after a reorg '''
+        with self.lock, self.db:
+            if scripthash is None:
+                self.db.execute('delete from transactions where height > ?', (height,))
+                self.db.execute(
+                    'update scripthashes set height = min(height, ?)', (height,))
+                return
+            self.db.execute(
+                'delete from transactions where scripthash = ? and height > ?',
+                (scripthash, height))
+            self.db.execute(
+                'update scripthashes set height = min(height, ?) where scripthash = ?',
+                (height, scripthash))
+
+    def onReorg(self, fork: int):
+        ''' a HeaderTracker reorg callback, forgets every block from fork up '''
+        self.rollback(None, fork - 1)
+
+    def follow(self, tracker: 'HeaderTracker'):
+        ''' rolls the index back whenever tracker sees a reorg '''
+        tracker.onReorg(self.onReorg)
+
+    def forget(self, scripthash: str, txids: list[str]):
+        '''
+        drops txids of scripthash, as when they've left the server's history
+        (evicted from the mempool, or reorged out), and lowers the last
+        indexed height to what remains.
+        '''
+        if len(txids) == 0:
+            return
+        with self.lock, self.db:
+            self.db.executemany(
+                'delete from transactions where scripthash = ? and txid = ?',
+                [(scripthash, txid) for txid in txids])
+            self.db.execute(
+                'update scripthashes set height = ('
+                'select coalesce(max(height), 0) from transactions where scripthash = ?'
+                ') where scripthash = ?',
+                (scripthash, scripthash))
+
+    def _history(self, electrumx: 'ElectrumxAPI', scripthash: str) -> list[dict]:
+        if scripthash == electrumx.scripthash:
+            return electrumx.getTransactionHistory() or []
+        history = electrumx.batch([('blockchain.scripthash.get_history', scripthash)])[0]
+        if isinstance(history, Exception):
+            raise history
+        return history or []
+
+    def update(self, electrumx: 'ElectrumxAPI', scripthash: Union[str, None] = None) -> int:
+        '''
+        indexes what's new in the history of scripthash (by default that of
+        electrumx) since the last update and drops what's no longer in it,
+        returns how many transactions were written.
+        '''
+        scripthash = scripthash or electrumx.scripthash
+        indexed = self.indexed(scripthash)
+        history = self._history(electrumx, scripthash)
+        self.forget(scripthash, list(indexed.keys() - {h.get('tx_hash') for h in history}))
+        # unconfirmed entries are always refreshed, confirmed ones only if
+        # they're not indexed yet or were indexed at another height
+        new = [
+            h for h in history
+            if h.get('height', 0) <= 0 or
+            indexed.get(h.get('tx_hash')) != h.get('height')]
+        if len(new) == 0:
+            return 0
+        heights = {h.get('tx_hash'): max(h.get('height', 0), 0) for h in new}
+        # these need their block time, which isn't kept in the cache
+        txs = [
+            tx for tx in electrumx.getTransactions(list(heights.keys()), cached=False)
+            if tx is not None]
+        decoder = TransactionDecoder()
+        decoder.index(txs)
+        supporting = [
+            vin.get('txid') for tx in txs for vin in tx.get('vin', [])
+            if vin.get('txid') is not None and
+            decoder.output(vin.get('txid'), vin.get('vout')) is None]
+        decoder.index(electrumx.getTransactions(list(dict.fromkeys(supporting))))
+        rows = []
+        for tx in txs:
+            rows.append((
+                tx.get('txid'),
+                heights.get(tx.get('txid'), 0),
+                tx.get('blocktime', tx.get('time')),
+                decoder.sent(tx),
+                decoder.received(tx),
+                memoBytes(tx)))
+        self.store(scripthash, rows)
+        logging.debug(f'indexed {len(rows)} transactions of {scripthash}')
+        return len(rows)
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> dict:
+        return {
+            'txid': row['txid'],
+            'height': row['height'],
+            'time': row['time'],
+            'sent': json.loads(row['sent']),
+            'received': json.loads(row['received']),
+            'memo': row['memo']}
+
+    def _query(self, column: str, scripthash: str, start, end, limit: int, offset: int) -> list[dict]:
+        query = 'select * from transactions where scripthash = ?'
+        params = [scripthash]
+        if start is not None:
+            query += f' and {column} >= ?'
+            params.append(start)
+        if end is not None:
+            query += f' and {column} <= ?'
+            params.append(end)
+        query += f' order by {column} desc, txid limit ? offset ?'
+        with self.lock:
+            rows = self.db.execute(query, params + [limit, offset]).fetchall()
+        return [HistoryIndex._decode(row) for row in rows]
+
+    def byHeight(
+        self,
+        scripthash: str,
+        start: Union[int, None] = None,
+        end: Union[int, None] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[dict]:
+        ''' a page of transactions between heights start and end, newest first '''
+        return self._query('height', scripthash, start, end, limit, offset)
+
+    def byTime(
+        self,
+        scripthash: str,
+        start: Union[int, None] = None,
+        end: Union[int, None] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[dict]:
+        ''' a page of transactions between unix times start and end, newest first '''
+        return self._query('time', scripthash, start, end, limit, offset)
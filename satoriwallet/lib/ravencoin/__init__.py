@@ -1,2 +1,2 @@
-from satoriwallet.lib.ravencoin.verify import verify
+from satoriwallet.lib.ravencoin.verify import verify, verifyMany
 from satoriwallet.lib.ravencoin.sign import signMessage
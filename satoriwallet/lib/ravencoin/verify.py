@@ -1,11 +1,14 @@
 from typing import Union
+from concurrent.futures import Executor
 from ravencoin.signmessage import RavencoinMessage, VerifyMessage
+from ravencoin.wallet import P2PKHRavencoinAddress
+from ravencoin.core.key import CPubKey
+from satoriwallet.lib.cache import AddressCache
+from satoriwallet.lib import verification
 
 
-def generateAddress(publicKey: str):
-    ''' returns address from pubkey '''
-    from ravencoin.wallet import P2PKHRavencoinAddress
-    from ravencoin.core.key import CPubKey
+def deriveAddress(publicKey: str):
+    ''' returns address from pubkey, without the cache '''
     return str(
         P2PKHRavencoinAddress.from_pubkey(
             CPubKey(
@@ -13,6 +16,12 @@ def generateAddress(publicKey: str):
                     publicKey))))
 
 
+def generateAddress(publicKey: str, cache: AddressCache = None):
+    ''' returns address from pubkey, derived once per pubkey '''
+    cache = cache if cache is not None else AddressCache.default()
+    return cache.address('ravencoin', publicKey, deriveAddress)
+
+
 def verify(
     message: Union[str, RavencoinMessage],
     signature: Union[bytes, str],
@@ -24,3 +33,19 @@ def verify(
         address or generateAddress(publicKey),
         RavencoinMessage(message) if isinstance(message, str) else message,
         signature if isinstance(signature, bytes) else signature.encode())
+
+
+def verifyMany(
+    payloads: list[Union['AuthPayload', dict]],
+    processes: int = None,
+    chunkSize: int = 500,
+    executor: Executor = None,
+) -> list[bool]:
+    ''' verifies many AuthPayloads at once, see lib.verification.verifyMany '''
+    return verification.verifyMany(
+        verify,
+        generateAddress,
+        payloads,
+        processes=processes,
+        chunkSize=chunkSize,
+        executor=executor)
@@ -1,6 +1,78 @@
 from typing import Union
 
-from satoriwallet.lib.ethereum.valid_eth import isValidEthereumAddress
+from satoriwallet.lib.transaction.decoder import TransactionDecoder
+
+
+_undecoded = object()
+
+
+def memoOf(raw: dict) -> Union[str, None]:
+    ''' hex of the last zero value OP_RETURN output, raw is left untouched '''
+    for vout in reversed(raw.get('vout', [])):
+        op_return = vout.get('scriptPubKey', {}).get('asm', '')
+        if (
+            op_return.startswith('OP_RETURN ') and
+            vout.get('value', 0) == 0
+        ):
+            return op_return[10:]
+    return None
+
+
+def memoBytes(raw: dict) -> Union[bytes, None]:
+    ''' the memo of raw as bytes, its text if the OP_RETURN isn't hex '''
+    memo = memoOf(raw)
+    if memo is None:
+        return None
+    try:
+        return bytes.fromhex(memo)
+    except ValueError:
+        return memo.encode()
+
+
+class TransactionRecord():
+    '''
+    the few fields of a verbose transaction a wallet keeps: txid, height,
+    satoshis sent per asset and the memo as bytes. the sums and memo are
+    decoded on first use, after which the raw dict is let go of, so a long
+    history costs a few small objects per transaction. raw is never changed.
+    '''
+
+    __slots__ = ('txid', 'height', '_raw', '_sent', '_memo')
+
+    def __init__(self, raw: dict):
+        self.txid: str = raw.get('txid', 'unknown txid')
+        self.height: Union[int, None] = raw.get('height')
+        self._raw: Union[dict, None] = raw
+        self._sent: Union[dict[str, int], None] = None
+        self._memo: Union[bytes, None, object] = _undecoded
+
+    def _release(self):
+        if self._sent is not None and self._memo is not _undecoded:
+            self._raw = None
+
+    @property
+    def sent(self) -> dict[str, int]:
+        ''' satoshis per asset paid to the outputs '''
+        if self._sent is None:
+            self._sent = TransactionDecoder().sent(self._raw)
+            self._release()
+        return self._sent
+
+    @property
+    def memo(self) -> Union[bytes, None]:
+        if self._memo is _undecoded:
+            self._memo = memoBytes(self._raw)
+            self._release()
+        return self._memo
+
+    def compact(self) -> 'TransactionRecord':
+        ''' decodes everything now and drops the raw dict '''
+        self.sent
+        self.memo
+        return self
+
+    def __repr__(self) -> str:
+        return f'TransactionRecord({self.txid}, {self.height})'
 
 
 class TransactionStruct():
@@ -12,18 +84,31 @@ class TransactionStruct():
         self.txid = self.getTxid(raw)
         self.height = self.getHeight(raw)
         self.confirmations = self.getConfirmations(raw)
-        self.sent = self.getSent(raw)
-        self.memo = self.getMemo(raw)
+        self._sent = None
+        self._memo = _undecoded
+
+    @property
+    def sent(self) -> dict[str, float]:
+        if self._sent is None:
+            self._sent = self.getSent(self.raw)
+        return self._sent
+
+    @property
+    def memo(self) -> Union[str, None]:
+        if self._memo is _undecoded:
+            self._memo = self.getMemo(self.raw)
+        return self._memo
+
+    def record(self) -> 'TransactionRecord':
+        return TransactionRecord(self.raw)
 
     def getSupportingTransactions(self, electrumx: 'ElectrumxAPI'):
-        txs = []
-        for vin in self.raw.get('vin', []):
-            txs.append(
-                electrumx.getTransaction(vin.get('txid', '')))
+        txs = electrumx.getTransactions([
+            vin.get('txid', '') for vin in self.raw.get('vin', [])])
         self.vinVoutsTxs: list[dict] = [t for t in txs if t is not None]
 
     def getAndSetReceived(self, electrumx: 'ElectrumxAPI' = None):
-        if len(self.vinVoutsTxs) > 0 and electrumx:
+        if len(self.vinVoutsTxs) == 0 and electrumx:
             self.getSupportingTransactions(electrumx)
         self.received = self.getReceived(self.raw, self.vinVoutsTxs)
 
@@ -40,40 +125,17 @@ class TransactionStruct():
         return raw.get('confirmations', 'unknown confirmations')
 
     def getSent(self, raw):
-        sent = {}
-        for vout in raw.get('vout', []):
-            if 'asset' in vout:
-                name = vout.get('asset', {}).get('name', 'unknown asset')
-                amount = float(vout.get('asset', {}).get('amount', 0))
-            else:
-                name = 'EVR'
-                amount = float(vout.get('value', 0))
-            if name in sent:
-                sent[name] = sent[name] + amount
-            else:
-                sent[name] = amount
-        return sent
+        return {
+            name: sats / 100000000
+            for name, sats in TransactionDecoder().sent(raw).items()}
 
     def getReceived(self, raw, vinVoutsTxs):
-        received = {}
-        for vin in raw.get('vin', []):
-            position = vin.get('vout', None)
-            for tx in vinVoutsTxs:
-                for vout in tx.get('vout', []):
-                    if position == vout.get('n', None):
-                        if 'asset' in vout:
-                            name = vout.get('asset', {}).get(
-                                'name', 'unknown asset')
-                            amount = float(
-                                vout.get('asset', {}).get('amount', 0))
-                        else:
-                            name = 'EVR'
-                            amount = float(vout.get('value', 0))
-                        if name in received:
-                            received[name] = received[name] + amount
-                        else:
-                            received[name] = amount
-        return received
+        # each vin spends exactly the output (txid, n) of a supporting tx
+        decoder = TransactionDecoder()
+        decoder.index(vinVoutsTxs)
+        return {
+            name: sats / 100000000
+            for name, sats in decoder.received(raw).items()}
 
     def getAsset(self, raw):
         return raw.get('txid', 'not implemented')
@@ -89,16 +151,7 @@ class TransactionStruct():
                 'type': 'nulldata'},
             'valueSat': 0}
         '''
-        vouts = raw.get('vout', [])
-        vouts.reverse()
-        for vout in vouts:
-            op_return = vout.get('scriptPubKey', {}).get('asm', '')
-            if (
-                op_return.startswith('OP_RETURN ') and
-                vout.get('value', 0) == 0
-            ):
-                return op_return[10:]
-        return None
+        return memoOf(raw)
 
     def hexMemo(self) -> Union[str, None]:
         return self.memo
@@ -113,13 +166,17 @@ class TransactionStruct():
             return None
         return self.bytesMemo().decode('utf-8')
 
-    def ethMemo(self, valid_eth_address: Union[None, callable]) -> Union[str, None]:
+    def ethMemo(self, valid_eth_address: Union[None, callable] = None) -> Union[str, None]:
+        '''
+        the memo as an eth address, None if valid_eth_address (for example
+        isValidEthereumAddress) rejects it. see checksumAddresses for many.
+        '''
         if self.memo == None:
             return None
         address = f'0x{self.memo}'
         # Validate Ethereum address
         if not callable(valid_eth_address):
             return address
-        if isValidEthereumAddress(address):
+        if valid_eth_address(address):
             return address
         return None
@@ -1 +1,4 @@
 from satoriwallet.lib.transaction.utils import TxUtils, AssetTransaction, Validate
+from satoriwallet.lib.transaction.decoder import TransactionDecoder, DecodedTransactions
+from satoriwallet.lib.transaction.coinselect import CoinSelector, Selection
+from satoriwallet.lib.transaction.fees import FeeEstimator
@@ -0,0 +1,196 @@
+from typing import Union, Iterable
+
+
+def outpoint(utxo: dict) -> tuple[str, int]:
+    return utxo.get('tx_hash'), utxo.get('tx_pos')
+
+
+class Selection():
+    ''' the inputs chosen for a send, the fee they need and what's left over '''
+
+    def __init__(
+        self,
+        inputs: list[dict],
+        assetInputs: list[dict],
+        fee: int,
+        change: int,
+        assetChange: int,
+        size: int,
+        method: str,
+    ):
+        self.inputs = inputs
+        self.assetInputs = assetInputs
+        self.fee = fee
+        self.change = change
+        self.assetChange = assetChange
+        self.size = size
+        self.method = method
+
+    def outpoints(self) -> list[tuple[str, int]]:
+        return [outpoint(utxo) for utxo in self.assetInputs + self.inputs]
+
+    def __repr__(self) -> str:
+        return (
+            f'Selection({len(self.inputs)} inputs, {len(self.assetInputs)} '
+            f'asset inputs, fee {self.fee}, change {self.change}, asset '
+            f'change {self.assetChange}, {self.method})')
+
+
+class CoinSelector():
+    '''
+    picks inputs for a send of currency and, optionally, an asset. asset
+    inputs are chosen first, exactly if possible so no asset change is
+    needed, then currency inputs cover the amount plus a fee that grows with
+    the size of everything chosen. both use branch and bound to look for a
+    set that needs no change output, falling back to largest first. sizes
+    are in bytes and feeRate is in sats per byte.
+    '''
+
+    def __init__(
+        self,
+        feeRate: int = 1100,
+        inputSize: int = 148,
+        outputSize: int = 34,
+        assetOutputSize: int = 56,
+        overhead: int = 10,
+        dustLimit: int = 546,
+        maxTries: int = 100000,
+    ):
+        self.feeRate = feeRate
+        self.inputSize = inputSize
+        self.outputSize = outputSize
+        self.assetOutputSize = assetOutputSize
+        self.overhead = overhead
+        self.dustLimit = dustLimit
+        self.maxTries = maxTries
+
+    def size(self, inputs: int, outputs: int, assetOutputs: int = 0, extra: int = 0) -> int:
+        return (
+            self.overhead +
+            inputs * self.inputSize +
+            outputs * self.outputSize +
+            assetOutputs * self.assetOutputSize +
+            extra)
+
+    def branchAndBound(self, values: list[int], target: int, tolerance: int) -> Union[list[int], None]:
+        '''
+        indexes of values summing to between target and target + tolerance,
+        as close to target as found, or None if there's no such set (or none
+        was found within maxTries steps). largest values are tried first.
+        '''
+        order = sorted(range(len(values)), key=lambda i: values[i], reverse=True)
+        ordered = [values[i] for i in order]
+        remaining = [0] * (len(ordered) + 1)
+        for depth in range(len(ordered) - 1, -1, -1):
+            remaining[depth] = remaining[depth + 1] + ordered[depth]
+        if remaining[0] < target:
+            return None
+        selected = [False] * len(ordered)
+        best = None
+        bestWaste = None
+        total = 0
+        depth = 0
+        for _ in range(self.maxTries):
+            backtrack = False
+            if total + remaining[depth] < target or total > target + tolerance:
+                backtrack = True
+            elif total >= target:
+                waste = total - target
+                if bestWaste is None or waste < bestWaste:
+                    best = [order[i] for i in range(depth) if selected[i]]
+                    bestWaste = waste
+                if waste == 0:
+                    break
+                backtrack = True
+            if not backtrack:
+                selected[depth] = True
+                total += ordered[depth]
+                depth += 1
+                continue
+            # undo the deepest inclusion and carry on without it
+            depth -= 1
+            while depth >= 0 and not selected[depth]:
+                depth -= 1
+            if depth < 0:
+                break
+            selected[depth] = False
+            total -= ordered[depth]
+            depth += 1
+        return best
+
+    @staticmethod
+    def largestFirst(values: list[int], target: int) -> Union[list[int], None]:
+        ''' indexes of the largest values until they reach target '''
+        chosen = []
+        total = 0
+        for i in sorted(range(len(values)), key=lambda i: values[i], reverse=True):
+            if total >= target:
+                break
+            chosen.append(i)
+            total += values[i]
+        return chosen if total >= target else None
+
+    def _selectAsset(self, utxos: list[dict], amount: int) -> list[dict]:
+        if amount <= 0:
+            return []
+        values = [utxo.get('value', 0) for utxo in utxos]
+        chosen = self.branchAndBound(values, amount, 0)
+        if chosen is None:
+            chosen = CoinSelector.largestFirst(values, amount)
+        if chosen is None:
+            raise Exception(f'insufficient asset funds: {sum(values)} < {amount}')
+        return [utxos[i] for i in chosen]
+
+    def select(
+        self,
+        utxos: list[dict],
+        amount: int,
+        assetUtxos: Iterable[dict] = (),
+        assetAmount: int = 0,
+        outputs: int = 1,
+        assetOutputs: int = 0,
+        extraSize: int = 0,
+        exclude: Iterable[tuple[str, int]] = (),
+    ) -> Selection:
+        '''
+        chooses inputs paying amount sats of currency to outputs outputs and
+        assetAmount of the asset to assetOutputs outputs. extraSize is for
+        anything else in the transaction, like a memo. outpoints in exclude
+        (already spent by us, for example) are never chosen.
+        '''
+        exclude = set(exclude)
+        utxos = [u for u in utxos if outpoint(u) not in exclude]
+        assetUtxos = [u for u in assetUtxos if outpoint(u) not in exclude]
+        assetInputs = self._selectAsset(assetUtxos, assetAmount)
+        assetChange = sum(u.get('value', 0) for u in assetInputs) - assetAmount
+        assetOutputs += 1 if assetChange > 0 else 0
+        # the fee without any currency inputs, each input adds its own cost
+        baseSize = self.size(len(assetInputs), outputs, assetOutputs, extraSize)
+        inputFee = self.inputSize * self.feeRate
+        changeFee = self.outputSize * self.feeRate
+        target = amount + baseSize * self.feeRate
+        effective = [u.get('value', 0) - inputFee for u in utxos]
+        candidates = [i for i, value in enumerate(effective) if value > 0]
+        values = [effective[i] for i in candidates]
+        # no change: anything over target up to what a change output would
+        # cost plus the smallest change worth making goes to the fee instead
+        exact = self.branchAndBound(values, target, changeFee + self.dustLimit)
+        if exact is not None:
+            inputs = [utxos[candidates[i]] for i in exact]
+            size = baseSize + len(inputs) * self.inputSize
+            fee = sum(u.get('value', 0) for u in inputs) - amount
+            return Selection(inputs, assetInputs, fee, 0, assetChange, size, 'branch and bound')
+        chosen = CoinSelector.largestFirst(values, target + changeFee)
+        if chosen is None:
+            raise Exception(
+                f'insufficient funds: {sum(u.get("value", 0) for u in utxos)} < '
+                f'{target + changeFee} including fee')
+        inputs = [utxos[candidates[i]] for i in chosen]
+        size = baseSize + len(inputs) * self.inputSize + self.outputSize
+        fee = size * self.feeRate
+        change = sum(u.get('value', 0) for u in inputs) - amount - fee
+        if change < self.dustLimit:
+            fee += change
+            change = 0
+            size -= self.outputSize
+        return Selection(inputs, assetInputs, fee, change, assetChange, size, 'largest first')
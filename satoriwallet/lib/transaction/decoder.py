@@ -0,0 +1,144 @@
+from typing import Union, Iterable, Iterator
+from array import array
+from decimal import Decimal
+
+
+def toSats(amount: Union[int, float, str, None]) -> int:
+    ''' an amount in coins as exact integer satoshis, avoiding float error '''
+    if amount is None:
+        return 0
+    return int((Decimal(str(amount)) * 100000000).to_integral_value())
+
+
+def voutSats(vout: dict, currency: str = 'EVR') -> tuple[str, int]:
+    ''' (asset name, satoshis) carried by a verbose vout '''
+    if 'asset' in vout:
+        asset = vout.get('asset', {})
+        return asset.get('name', 'unknown asset'), toSats(asset.get('amount', 0))
+    if 'valueSat' in vout:
+        return currency, int(vout['valueSat'])
+    return currency, toSats(vout.get('value', 0))
+
+
+class DecodedTransactions():
+    '''
+    the result of a bulk decode in columns: one row per transaction and
+    asset, with the satoshis its outputs sent and its inputs spent (called
+    received, as on TransactionStruct). columns are typed arrays and asset
+    names are stored once, so very large histories stay small.
+    '''
+
+    def __init__(self):
+        self.txids: list[str] = []
+        self.heights = array('q')
+        self.assetNames: list[str] = []
+        self.assetIndex: dict[str, int] = {}
+        self.rowTx = array('l')
+        self.rowAsset = array('l')
+        self.sent = array('q')
+        self.received = array('q')
+
+    def __len__(self) -> int:
+        return len(self.rowTx)
+
+    def _asset(self, name: str) -> int:
+        if name not in self.assetIndex:
+            self.assetIndex[name] = len(self.assetNames)
+            self.assetNames.append(name)
+        return self.assetIndex[name]
+
+    def add(self, txid: str, height: int, sent: dict[str, int], received: dict[str, int]):
+        tx = len(self.txids)
+        self.txids.append(txid)
+        self.heights.append(height)
+        for name in list(sent) + [n for n in received if n not in sent]:
+            self.rowTx.append(tx)
+            self.rowAsset.append(self._asset(name))
+            self.sent.append(sent.get(name, 0))
+            self.received.append(received.get(name, 0))
+
+    def rows(self) -> Iterator[tuple[str, int, str, int, int]]:
+        ''' (txid, height, asset, sent, received) for every row '''
+        for tx, asset, sent, received in zip(self.rowTx, self.rowAsset, self.sent, self.received):
+            yield self.txids[tx], self.heights[tx], self.assetNames[asset], sent, received
+
+    def totals(self) -> dict[str, tuple[int, int]]:
+        ''' {asset: (sent, received)} over every transaction '''
+        totals = {name: [0, 0] for name in self.assetNames}
+        for asset, sent, received in zip(self.rowAsset, self.sent, self.received):
+            totals[self.assetNames[asset]][0] += sent
+            totals[self.assetNames[asset]][1] += received
+        return {name: tuple(amounts) for name, amounts in totals.items()}
+
+    def byTxid(self) -> dict[str, dict[str, tuple[int, int]]]:
+        ''' {txid: {asset: (sent, received)}} '''
+        result = {txid: {} for txid in self.txids}
+        for txid, _, asset, sent, received in self.rows():
+            result[txid][asset] = (sent, received)
+        return result
+
+
+class TransactionDecoder():
+    '''
+    decodes many verbose transactions at once. every output seen is indexed
+    by (txid, n), so an input is resolved with one dict lookup to exactly
+    the output it spends, and all amounts are summed as integer satoshis.
+    '''
+
+    def __init__(self, currency: str = 'EVR'):
+        self.currency = currency
+        self.outputs: dict[tuple[str, int], tuple[str, int]] = {}
+
+    def index(self, transactions: Iterable[dict]):
+        ''' remembers the outputs of transactions so inputs can find them '''
+        for tx in transactions:
+            if tx is None:
+                continue
+            txid = tx.get('txid')
+            for vout in tx.get('vout', []):
+                self.outputs[(txid, vout.get('n'))] = voutSats(vout, self.currency)
+
+    def output(self, txid: str, n: int) -> Union[tuple[str, int], None]:
+        ''' (asset name, satoshis) of output n of txid, if it's been indexed '''
+        return self.outputs.get((txid, n))
+
+    def sent(self, tx: dict) -> dict[str, int]:
+        ''' satoshis per asset paid to the outputs of tx '''
+        sent = {}
+        for vout in tx.get('vout', []):
+            name, sats = voutSats(vout, self.currency)
+            sent[name] = sent.get(name, 0) + sats
+        return sent
+
+    def received(self, tx: dict) -> dict[str, int]:
+        ''' satoshis per asset of the indexed outputs the inputs of tx spend '''
+        received = {}
+        for vin in tx.get('vin', []):
+            output = self.outputs.get((vin.get('txid'), vin.get('vout')))
+            if output is not None:
+                received[output[0]] = received.get(output[0], 0) + output[1]
+        return received
+
+    def decode(
+        self,
+        transactions: list[dict],
+        supporting: Iterable[dict] = (),
+    ) -> DecodedTransactions:
+        '''
+        sent and received per asset of every transaction. inputs are looked
+        up among the outputs of supporting transactions, of transactions
+        themselves and of anything indexed before.
+        '''
+        self.index(supporting)
+        self.index(transactions)
+        decoded = DecodedTransactions()
+        for tx in transactions:
+            if tx is None:
+                continue
+            height = tx.get('height', 0)
+            decoded.add(
+                tx.get('txid', 'unknown txid'),
+                height if isinstance(height, int) else 0,
+                self.sent(tx),
+                self.received(tx))
+        return decoded
@@ -0,0 +1,169 @@
+from typing import Union
+import logging
+import math
+import threading
+import time
+from satoriwallet.lib.transaction.utils import AssetTransaction
+from satoriwallet.lib.transaction.coinselect import CoinSelector
+from satoriwallet.lib.transaction.decoder import toSats
+
+
+class FeeEstimator():
+    '''
+    predicts the serialized size of a transaction from what goes in it, so
+    the fee can be chosen before it's built: inputs by script type, outputs
+    by script type, asset transfer outputs laid out as in
+    AssetTransaction.satoriHex, and an OP_RETURN memo by its length. the
+    fee rate comes from the server (the larger of blockchain.relayfee and
+    blockchain.estimatefee) and is fetched once per block, or once per
+    maxAge seconds when there's no header tracker to tell blocks apart.
+    sizes are in bytes, rates in sats per byte.
+    '''
+
+    # outpoint 36 + script length 1 + script + sequence 4
+    inputSizes = {
+        'p2pkh': 36 + 1 + 107 + 4,
+        'p2pk': 36 + 1 + 73 + 4,
+    }
+
+    outputScriptSizes = {
+        'p2pkh': 25,
+        'p2sh': 23,
+    }
+
+    def __init__(
+        self,
+        electrumx: Union['ElectrumxAPI', None] = None,
+        blocks: int = 6,
+        defaultRate: int = 1100,
+        maxAge: float = 60,
+    ):
+        self.electrumx = electrumx
+        self.blocks = blocks
+        self.defaultRate = defaultRate
+        self.maxAge = maxAge
+        self.lock = threading.Lock()
+        self.rate: Union[int, None] = None
+        self.rateKey = None
+
+    @staticmethod
+    def varintSize(n: int) -> int:
+        if n < 0xfd:
+            return 1
+        if n <= 0xffff:
+            return 3
+        if n <= 0xffffffff:
+            return 5
+        return 9
+
+    @staticmethod
+    def pushSize(n: int) -> int:
+        ''' bytes of the opcode that pushes n bytes of data '''
+        if n < 0x4c:
+            return 1
+        if n <= 0xff:
+            return 2
+        if n <= 0xffff:
+            return 3
+        return 5
+
+    @staticmethod
+    def outputSize(scriptSize: int) -> int:
+        ''' value 8 + script length + script '''
+        return 8 + FeeEstimator.varintSize(scriptSize) + scriptSize
+
+    @staticmethod
+    def assetPayloadSize(asset: str = 'SATORI', currency: str = 'evr') -> int:
+        ''' symbol, 't', name length and name as in satoriHex, then the amount '''
+        if asset == 'SATORI':
+            return len(AssetTransaction.satoriHex(currency)) // 2 + 8
+        return 3 + 1 + 1 + len(asset.encode()) + 8
+
+    def assetOutputSize(self, asset: str = 'SATORI', currency: str = 'evr', scriptType: str = 'p2pkh') -> int:
+        ''' the destination script, OP_RVN_ASSET, the pushed payload and OP_DROP '''
+        payload = FeeEstimator.assetPayloadSize(asset, currency)
+        return FeeEstimator.outputSize(
+            self.outputScriptSizes[scriptType] + 1 +
+            FeeEstimator.pushSize(payload) + payload + 1)
+
+    @staticmethod
+    def memoOutputSize(memo: Union[str, bytes]) -> int:
+        ''' a zero value OP_RETURN output carrying memo '''
+        if isinstance(memo, str):
+            memo = memo.encode()
+        return FeeEstimator.outputSize(
+            1 + FeeEstimator.pushSize(len(memo)) + len(memo))
+
+    def size(
+        self,
+        inputs: list[str],
+        outputs: list[str],
+        assetOutputs: int = 0,
+        memo: Union[str, bytes, None] = None,
+        asset: str = 'SATORI',
+        currency: str = 'evr',
+    ) -> int:
+        '''
+        bytes of a transaction spending inputs (script types like 'p2pkh')
+        to currency outputs (script types), assetOutputs p2pkh transfers of
+        asset and an optional memo.
+        '''
+        outputCount = len(outputs) + assetOutputs + (1 if memo is not None else 0)
+        return (
+            4 + 4 +
+            FeeEstimator.varintSize(len(inputs)) +
+            FeeEstimator.varintSize(outputCount) +
+            sum(self.inputSizes[scriptType] for scriptType in inputs) +
+            sum(FeeEstimator.outputSize(self.outputScriptSizes[t]) for t in outputs) +
+            assetOutputs * self.assetOutputSize(asset, currency) +
+            (FeeEstimator.memoOutputSize(memo) if memo is not None else 0))
+
+    def _key(self):
+        tracker = getattr(self.electrumx, 'headerTracker', None)
+        if tracker is not None and tracker.tip > 0:
+            return ('height', tracker.tip)
+        return ('time', int(time.time() // self.maxAge))
+
+    def _fetchRate(self) -> int:
+        relayFee, estimate = self.electrumx.batch([
+            ('blockchain.relayfee',),
+            ('blockchain.estimatefee', self.blocks)])
+        # both are coins per kilobyte, estimatefee is -1 if it can't tell
+        rates = [
+            math.ceil(toSats(perKb) / 1000)
+            for perKb in (relayFee, estimate)
+            if isinstance(perKb, (int, float)) and perKb > 0]
+        if len(rates) == 0:
+            return self.defaultRate
+        return max(rates)
+
+    def feeRate(self) -> int:
+        ''' sats per byte, from the server once per block '''
+        if self.electrumx is None:
+            return self.defaultRate
+        key = self._key()
+        with self.lock:
+            if self.rate is not None and self.rateKey == key:
+                return self.rate
+        try:
+            rate = self._fetchRate()
+        except Exception as e:
+            logging.error(f'error getting fee rate: {e}')
+            return self.rate or self.defaultRate
+        with self.lock:
+            self.rate, self.rateKey = rate, key
+        return rate
+
+    def fee(self, *args, **kwargs) -> int:
+        ''' sats for a transaction of size(*args, **kwargs) at the current rate '''
+        return self.size(*args, **kwargs) * self.feeRate()
+
+    def selector(self, asset: str = 'SATORI', currency: str = 'evr', **kwargs) -> CoinSelector:
+        ''' a CoinSelector using these sizes and the current rate '''
+        return CoinSelector(
+            feeRate=self.feeRate(),
+            inputSize=self.inputSizes['p2pkh'],
+            outputSize=FeeEstimator.outputSize(self.outputScriptSizes['p2pkh']),
+            assetOutputSize=self.assetOutputSize(asset, currency),
+            overhead=4 + 4 + 1 + 1,
+            **kwargs)
@@ -7,6 +7,9 @@ import base58
 class TxUtils():
     ''' utility methods for transactions '''
 
+    # base58 version bytes of p2sh addresses: bitcoin, ravencoin, evrmore
+    p2shVersions = (0x05, 0x7a, 0x5c)
+
     @staticmethod
     def estimatedFee(inputCount: int = 0, outputCount: int = 0, feeRate: int = 150000) -> int:
         '''
@@ -34,6 +37,8 @@ class TxUtils():
         blockchain.relayfee(). however, since I'm not willing to write the
         recursive process we're not going to use this function yet.
         feeRate = 1100 # 0.00001100 rvn per byte
+        FeeEstimator predicts the size up front instead, so the transaction
+        only needs to be built once.
         '''
         txSizeInBytes = len(txHex) / 2
         return txSizeInBytes * feeRate
@@ -154,6 +159,21 @@ class TxUtils():
         address = base58.b58encode(step4)
         return address.decode()
 
+    @staticmethod
+    def addressToScripthash(address: str) -> str:
+        '''
+        the electrumx scripthash of a base58 address: the reversed sha256 of
+        its output script, p2sh for the p2sh version bytes of bitcoin,
+        ravencoin and evrmore, p2pkh otherwise.
+        '''
+        decoded = base58.b58decode(address)
+        version, h160 = decoded[0], decoded[1:-4]
+        if version in TxUtils.p2shVersions:
+            script = b'\xa9\x14' + h160 + b'\x87'
+        else:
+            script = b'\x76\xa9\x14' + h160 + b'\x88\xac'
+        return hashlib.sha256(script).digest()[::-1].hex()
+
 
 class AssetTransaction():
     evr = '657672'
@@ -0,0 +1,71 @@
+from typing import Union, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+import logging
+import os
+
+
+def _verifyChunk(verify: Callable, generateAddress: Callable, items: list[tuple]) -> list[bool]:
+    '''
+    (message, signature, pubkey, address) items, checked with a chain's
+    verify. a payload claiming both a pubkey and an address is only good if
+    the address is the pubkey's.
+    '''
+    results = []
+    for message, signature, publicKey, address in items:
+        try:
+            if publicKey is not None:
+                derived = generateAddress(publicKey)
+                if address is not None and address != derived:
+                    results.append(False)
+                    continue
+                address = derived
+            results.append(bool(verify(message, signature, address=address)))
+        except Exception as e:
+            logging.debug(f'invalid signature from {publicKey or address}: {e}')
+            results.append(False)
+    return results
+
+
+def verifyMany(
+    verify: Callable,
+    generateAddress: Callable,
+    payloads: list[Union['AuthPayload', dict]],
+    processes: int = None,
+    chunkSize: int = 500,
+    executor: Executor = None,
+) -> list[bool]:
+    '''
+    verifies many AuthPayloads (or their dicts) at once with a chain's
+    verify and generateAddress functions, returns a bool per payload in
+    order. the address is derived from the pubkey (through each process's
+    AddressCache) and must match the payload's address if it has one, or is
+    taken from the payload if there's no pubkey. chunks run across a process pool of
+    processes workers (all cores by default), pass an executor to reuse one
+    between calls. a handful of payloads are verified here rather than
+    paying for a pool. both functions must be module level so they can be
+    sent to the workers.
+    '''
+    items = [
+        (p.get('message'), p.get('signature'), p.get('pubkey'), p.get('address'))
+        if isinstance(p, dict) else
+        (p.message, p.signature, p.pubkey, p.address)
+        for p in payloads]
+    if len(items) <= chunkSize or processes == 1:
+        return _verifyChunk(verify, generateAddress, items)
+    # a pubkey's payloads go to the same chunk so it's derived only once
+    # per call, and usually in the same worker as last time
+    items = sorted(enumerate(items), key=lambda item: item[1][2] or '')
+    order = [i for i, _ in items]
+    items = [item for _, item in items]
+    chunks = [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+    verifyChunk = partial(_verifyChunk, verify, generateAddress)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+            verified = [r for results in pool.map(verifyChunk, chunks) for r in results]
+    else:
+        verified = [r for results in executor.map(verifyChunk, chunks) for r in results]
+    results = [False] * len(verified)
+    for i, result in zip(order, verified):
+        results[i] = result
+    return results
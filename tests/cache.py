@@ -0,0 +1,74 @@
+import unittest
+
+from satoriwallet.api.cache import ScripthashCache
+
+
+class TestScripthashCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ScripthashCache()
+
+    def test_nothing_is_cached_without_a_status(self):
+        self.assertIsNone(self.cache.generation('a'))
+        self.cache.put('a', 'balance', 5, None)
+        self.cache.put('a', 'balance', 5, 1)
+        self.assertEqual(self.cache.get('a', 'balance'), (False, None))
+
+    def test_a_none_status_is_known(self):
+        self.assertTrue(self.cache.setStatus('a', None))
+        generation = self.cache.generation('a')
+        self.assertEqual(generation, 1)
+        self.cache.put('a', 'balance', 0, generation)
+        self.assertEqual(self.cache.get('a', 'balance'), (True, 0))
+
+    def test_values_last_until_the_status_changes(self):
+        self.cache.setStatus('a', 's1')
+        generation = self.cache.generation('a')
+        self.cache.put('a', 'balance', 5, generation)
+        # the same status again changes nothing
+        self.assertFalse(self.cache.setStatus('a', 's1'))
+        self.assertEqual(self.cache.generation('a'), generation)
+        self.assertEqual(self.cache.get('a', 'balance'), (True, 5))
+        self.assertTrue(self.cache.setStatus('a', 's2'))
+        self.assertEqual(self.cache.generation('a'), generation + 1)
+        self.assertEqual(self.cache.get('a', 'balance'), (False, None))
+
+    def test_put_under_an_old_generation_is_dropped(self):
+        self.cache.setStatus('a', 's1')
+        fetchedUnder = self.cache.generation('a')
+        # the status moves on while the request is out
+        self.cache.setStatus('a', 's2')
+        self.cache.put('a', 'balance', 5, fetchedUnder)
+        self.assertEqual(self.cache.get('a', 'balance'), (False, None))
+        self.cache.put('a', 'balance', 7, self.cache.generation('a'))
+        self.assertEqual(self.cache.get('a', 'balance'), (True, 7))
+
+    def test_reservations_end_with_the_status(self):
+        self.cache.setStatus('a', 's1')
+        self.cache.reserve('a', [('t', 0)])
+        self.assertEqual(self.cache.reserved('a'), {('t', 0)})
+        self.cache.setStatus('a', 's2')
+        self.assertEqual(self.cache.reserved('a'), set())
+
+    def test_forget(self):
+        self.cache.setStatus('a', 's1')
+        self.cache.put('a', 'balance', 5, self.cache.generation('a'))
+        self.cache.forget('a')
+        self.assertIsNone(self.cache.generation('a'))
+        self.assertEqual(self.cache.get('a', 'balance'), (False, None))
+        # the same status after a forget counts as new
+        self.assertTrue(self.cache.setStatus('a', 's1'))
+
+    def test_mergeHistory(self):
+        first = [{'tx_hash': 'a', 'height': 10}, {'tx_hash': 'b', 'height': 0}]
+        self.assertEqual(self.cache.mergeHistory('s', first), first)
+        second = [
+            {'tx_hash': 'a', 'height': 10},
+            {'tx_hash': 'b', 'height': 12},
+            {'tx_hash': 'c', 'height': 0}]
+        self.assertEqual(self.cache.mergeHistory('s', second), second[1:])
+        self.assertEqual(self.cache.height('s'), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
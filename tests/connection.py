@@ -0,0 +1,145 @@
+import datetime as dt
+import unittest
+
+from satoriwallet.lib import verification
+from satoriwallet.lib.cache import AddressCache
+from satoriwallet.lib.evrmore.verify import generateAddress as generateEvrmoreAddress
+from satoriwallet.lib.connection import ChallengeVerifier
+
+
+def challenge(signedAt: float) -> str:
+    ''' a getFullDateMessage() style challenge signed at unix time signedAt '''
+    return dt.datetime.fromtimestamp(signedAt, dt.timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class TestChallengeVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1700000000.0
+        self.verifier = ChallengeVerifier(window=600, future=60)
+        self.calls = []
+        # signatures are good when they read 'good', no curve math needed
+        self.verifier.verifySignature = self.verifySignature
+        self.verifier.verifySignatures = self.verifySignatures
+        self.verifier.generateAddress = generateAddress
+
+    def verifySignature(self, message, signature, publicKey=None, address=None):
+        self.calls.append([message])
+        return signature == 'good'
+
+    def verifySignatures(self, payloads, **kwargs):
+        self.calls.append([p['message'] for p in payloads])
+        return [p['signature'] == 'good' for p in payloads]
+
+    def payload(self, signedAt: float, signature: str = 'good', pubkey: str = 'pk') -> dict:
+        return {'message': challenge(signedAt), 'signature': signature, 'pubkey': pubkey, 'address': None}
+
+    def test_timestamp(self):
+        self.assertEqual(ChallengeVerifier.timestamp(challenge(self.now)), self.now)
+        self.assertEqual(ChallengeVerifier.timestamp('2023-11-14T22:13:20+00:00'), self.now)
+        self.assertEqual(ChallengeVerifier.timestamp('2023-11-15T00:13:20+02:00'), self.now)
+        self.assertIsNone(ChallengeVerifier.timestamp('hello'))
+        self.assertIsNone(ChallengeVerifier.timestamp(''))
+        self.assertIsNone(ChallengeVerifier.timestamp(None))
+
+    def test_expires_window_edges(self):
+        self.assertEqual(
+            self.verifier.expires(challenge(self.now - 600), self.now), self.now)
+        self.assertIsNone(self.verifier.expires(challenge(self.now - 601), self.now))
+        self.assertEqual(
+            self.verifier.expires(challenge(self.now), self.now), self.now + 600)
+
+    def test_expires_skew_edges(self):
+        self.assertEqual(
+            self.verifier.expires(challenge(self.now + 60), self.now), self.now + 660)
+        self.assertIsNone(self.verifier.expires(challenge(self.now + 61), self.now))
+
+    def test_non_date_challenges_are_rejected(self):
+        for message in ('hello', '', None, '12345'):
+            payload = {'message': message, 'signature': 'good', 'pubkey': 'pk', 'address': None}
+            self.assertFalse(self.verifier.verify(payload, self.now))
+            self.assertEqual(self.verifier.verifyMany([payload], self.now), [False])
+        self.assertEqual(self.calls, [])
+
+    def test_verify_is_cached(self):
+        payload = self.payload(self.now - 10)
+        self.assertTrue(self.verifier.verify(payload, self.now))
+        self.assertTrue(self.verifier.verify(payload, self.now + 5))
+        self.assertEqual(len(self.calls), 1)
+        self.assertFalse(self.verifier.verify(self.payload(self.now - 10, 'bad'), self.now))
+
+    def test_address_must_match_pubkey(self):
+        matching = dict(self.payload(self.now - 10), address='address of pk')
+        other = dict(matching, address='address of someone else')
+        self.assertTrue(self.verifier.verify(matching, self.now))
+        self.assertFalse(self.verifier.verify(other, self.now))
+        self.assertEqual(self.verifier.verifyMany([other, matching], self.now), [False, True])
+        # rejected before any signature check, and the good result cached
+        # for matching doesn't carry over to another address
+        self.assertEqual(len(self.calls), 1)
+        addressOnly = {'message': other['message'], 'signature': 'bad', 'pubkey': None, 'address': 'x'}
+        self.assertFalse(self.verifier.verify(addressOnly, self.now))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_verifyMany(self):
+        good = self.payload(self.now - 10)
+        bad = self.payload(self.now - 20, 'bad')
+        stale = self.payload(self.now - 700)
+        results = self.verifier.verifyMany([good, bad, good, stale], self.now)
+        self.assertEqual(results, [True, False, True, False])
+        # duplicates are verified once, stale ones not at all
+        self.assertEqual(self.calls, [[good['message'], bad['message']]])
+        self.assertEqual(self.verifier.verifyMany([bad, good], self.now + 1), [False, True])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_verifyMany_cache_expiry(self):
+        payload = self.payload(self.now - 10)
+        self.assertEqual(self.verifier.verifyMany([payload], self.now), [True])
+        key = ('pk', None, payload['message'], 'good')
+        self.assertEqual(self.verifier.verified.get(key), (True, self.now + 590))
+        # still answered from the cache on the last second of the window
+        self.assertEqual(self.verifier.verifyMany([payload], self.now + 590), [True])
+        self.assertEqual(len(self.calls), 1)
+        # then the challenge is stale, and so is its cache entry
+        self.assertEqual(self.verifier.verifyMany([payload], self.now + 591), [False])
+        self.assertEqual(len(self.calls), 1)
+        self.assertIsNone(self.verifier._cached(key, self.now + 591))
+        self.assertIsNone(self.verifier.verified.get(key))
+
+
+def generateAddress(publicKey: str) -> str:
+    return f'address of {publicKey}'
+
+
+def verify(message, signature, publicKey=None, address=None) -> bool:
+    ''' signatures read "signed by <address>" '''
+    return signature == f'signed by {address or generateAddress(publicKey)}'
+
+
+class TestVerifyMany(unittest.TestCase):
+
+    def test_address_must_match_pubkey(self):
+        signed = 'signed by address of a'
+        payloads = [
+            {'message': 'm', 'signature': signed, 'pubkey': 'a', 'address': 'address of b'},
+            {'message': 'm', 'signature': signed, 'pubkey': 'a', 'address': 'address of a'},
+            {'message': 'm', 'signature': signed, 'pubkey': 'a', 'address': None},
+            {'message': 'm', 'signature': signed, 'pubkey': None, 'address': 'address of a'},
+            {'message': 'm', 'signature': signed, 'pubkey': 'b', 'address': None}]
+        self.assertEqual(
+            verification.verifyMany(verify, generateAddress, payloads),
+            [False, True, True, True, False])
+
+
+class TestAddressCache(unittest.TestCase):
+
+    def test_given_cache_is_used_even_when_empty(self):
+        publicKey = '0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798'
+        cache = AddressCache(maxsize=5)
+        address = generateEvrmoreAddress(publicKey, cache=cache)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(('evrmore', publicKey)), address)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import logging
+import socket
+import threading
+import unittest
+
+from satoriwallet.api.blockchain.electrumx.framing import FrameReader
+from satoriwallet.api.blockchain.electrumx.electrumx import Electrumx
+
+
+class TestFrameReader(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.reader = FrameReader(self.client, chunkSize=8)
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def test_coalesced_frames_are_kept(self):
+        self.server.sendall(b'{"id": 1}\n{"id": 2}\n{"id"')
+        self.assertEqual(self.reader.read(), b'{"id": 1}')
+        self.assertEqual(self.reader.read(), b'{"id": 2}')
+        self.server.sendall(b': 3}\n')
+        self.assertEqual(self.reader.read(), b'{"id": 3}')
+
+    def test_frame_larger_than_chunk(self):
+        frame = b'{"result": "' + b'a' * 1000 + b'"}'
+        self.server.sendall(frame + b'\n')
+        self.assertEqual(self.reader.read(), frame)
+
+    def test_partial_frame_survives_timeout(self):
+        self.client.settimeout(0.1)
+        self.server.sendall(b'{"id"')
+        with self.assertRaises(socket.timeout):
+            self.reader.read()
+        self.server.sendall(b': 4}\n')
+        self.assertEqual(self.reader.read(), b'{"id": 4}')
+
+    def test_closed_connection(self):
+        self.server.close()
+        self.assertIsNone(self.reader.read())
+
+
+class TestReceiveResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        # just what _receiveResponse needs, without connecting anywhere
+        self.electrumx = Electrumx.__new__(Electrumx)
+        self.electrumx.log = logging.getLogger('test')
+        self.electrumx.connection = self.client
+        self.electrumx.frameReaders = {}
+        self.electrumx.frameReadersLock = threading.Lock()
+        self.notifications = []
+        self.electrumx.onNotification = self.notifications.append
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def test_other_frames_are_skipped(self):
+        self.server.sendall(
+            b'{"method": "blockchain.headers.subscribe", "params": [{"height": 5}]}\n'
+            b'{"id": 1, "result": null}\n'
+            b'{"id": 2, "result": "ours"}\n')
+        self.assertEqual(self.electrumx._receiveResponse([2])['result'], 'ours')
+        self.assertEqual(len(self.notifications), 1)
+
+    def test_timeout_with_only_other_frames(self):
+        self.server.sendall(b'{"id": 1, "result": null}\n')
+        self.assertIsNone(self.electrumx._receiveResponse([2], timeout=0.2))
+
+
+if __name__ == '__main__':
+    unittest.main()
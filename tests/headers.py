@@ -0,0 +1,122 @@
+import hashlib
+import unittest
+
+from satoriwallet.api.headers import HeaderTracker
+
+
+def chain(length: int, salt: str = 'a', parent: bytes = bytes(32)) -> list[str]:
+    ''' length linked 80 byte headers, the first building on parent '''
+    headers = []
+    for i in range(length):
+        header = bytes(4) + parent + hashlib.sha256(f'{salt}{i}'.encode()).digest() + bytes(12)
+        headers.append(header.hex())
+        parent = hashlib.sha256(hashlib.sha256(header).digest()).digest()
+    return headers
+
+
+class Server():
+    ''' answers header requests from headers, headers[0] being height 1 '''
+
+    def __init__(self, headers: list[str]):
+        self.headers = headers
+        self.calls = []
+        self.header = None
+
+    def batch(self, calls: list[tuple]) -> list:
+        self.calls.extend(calls)
+        results = []
+        for method, *params in calls:
+            if method == 'blockchain.block.header':
+                results.append(self.headers[params[0] - 1])
+            elif method == 'blockchain.block.headers':
+                served = self.headers[params[0] - 1:params[0] - 1 + params[1]]
+                results.append({'hex': ''.join(served), 'count': len(served)})
+        return results
+
+    def currentHeader(self):
+        return self.header
+
+
+class TestHeaderTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.mainChain = chain(6)
+        self.server = Server(self.mainChain)
+        self.tracker = HeaderTracker(self.server)
+        self.reorgs = []
+        self.tracker.onReorg(self.reorgs.append)
+
+    def tip(self, height: int, headers: list[str] = None) -> dict:
+        return {'height': height, 'hex': (headers or self.mainChain)[height - 1]}
+
+    def test_add_follows_linked_headers(self):
+        for height in range(1, 4):
+            self.tracker.add(self.tip(height))
+        self.assertEqual(self.tracker.tip, 3)
+        self.assertEqual(self.tracker.headers, {
+            h: self.mainChain[h - 1] for h in range(1, 4)})
+        # linked sha256d headers need nothing from the server
+        self.assertEqual(self.server.calls, [])
+        self.assertEqual(self.reorgs, [])
+
+    def test_add_fills_a_gap(self):
+        self.tracker.add(self.tip(1))
+        self.tracker.add(self.tip(4))
+        self.assertEqual(self.tracker.tip, 4)
+        self.assertEqual(self.tracker.headers, {
+            h: self.mainChain[h - 1] for h in range(1, 5)})
+        self.assertIn(('blockchain.block.headers', 2, 2), self.server.calls)
+        self.assertEqual(self.reorgs, [])
+
+    def test_forkPoint(self):
+        for height in range(1, 6):
+            self.tracker.add(self.tip(height))
+        self.assertEqual(self.tracker._forkPoint(), 6)
+        self.server.headers = self.mainChain[:3] + chain(3, salt='b')
+        self.assertEqual(self.tracker._forkPoint(), 4)
+
+    def test_rollback(self):
+        for height in range(1, 6):
+            self.tracker.add(self.tip(height))
+        mined = self.tracker.watch('t', 4, 10, lambda txid, confirmations: None)
+        below = self.tracker.watch('u', 3, 10, lambda txid, confirmations: None)
+        self.tracker._rollback(4)
+        self.assertEqual(self.tracker.tip, 3)
+        self.assertEqual(sorted(self.tracker.headers), [1, 2, 3])
+        self.assertIsNone(mined.height)
+        self.assertEqual(below.height, 3)
+
+    def test_add_reorg(self):
+        for height in range(1, 6):
+            self.tracker.add(self.tip(height))
+        forked = self.mainChain[:3] + chain(3, salt='b', parent=bytes.fromhex(
+            HeaderTracker.blockHash(self.mainChain[2]))[::-1])
+        self.server.headers = forked
+        self.tracker.add(self.tip(6, forked))
+        self.assertEqual(self.reorgs, [4])
+        self.assertEqual(self.tracker.tip, 6)
+        self.assertEqual(self.tracker.headers, {
+            h: forked[h - 1] for h in range(1, 7)})
+
+    def test_watch(self):
+        fired = []
+        self.tracker.add(self.tip(1))
+        self.tracker.watch('t', 1, 1, lambda txid, confirmations: fired.append((txid, confirmations)))
+        self.assertEqual(fired, [('t', 1)])
+        self.tracker.watch('u', None, 2, lambda txid, confirmations: fired.append((txid, confirmations)))
+        self.tracker.confirm('u', 2)
+        self.tracker.add(self.tip(2))
+        self.assertEqual(fired, [('t', 1)])
+        self.tracker.add(self.tip(3))
+        self.assertEqual(fired, [('t', 1), ('u', 2)])
+        self.assertEqual(self.tracker.watches, [])
+
+    def test_sync_takes_the_subscribed_tip(self):
+        self.server.header = self.tip(2)
+        self.tracker.sync()
+        self.assertEqual(self.tracker.tip, 2)
+        self.assertEqual(self.server.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
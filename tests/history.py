@@ -0,0 +1,138 @@
+import unittest
+
+from satoriwallet.lib.history import HistoryIndex
+
+
+class Server():
+    ''' a wallet whose history and transactions are given up front '''
+
+    def __init__(self, history: list[dict], transactions: dict[str, dict]):
+        self.scripthash = 'wallet'
+        self.history = history
+        self.transactions = transactions
+        self.fetched = []
+
+    def getTransactionHistory(self):
+        return self.history
+
+    def getTransactions(self, txids: list[str], cached: bool = True):
+        self.fetched.append((txids, cached))
+        return [self.transactions.get(txid) for txid in txids]
+
+
+class Tracker():
+
+    def __init__(self):
+        self.reorgCallbacks = []
+
+    def onReorg(self, callback):
+        self.reorgCallbacks.append(callback)
+
+
+def tx(txid: str, value: float, spends: list[tuple] = (), time: int = None) -> dict:
+    return {
+        'txid': txid,
+        'time': time,
+        'blocktime': time,
+        'vin': [{'txid': parent, 'vout': n} for parent, n in spends],
+        'vout': [{'n': 0, 'value': value}]}
+
+
+class TestHistoryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = HistoryIndex()
+
+    def tearDown(self):
+        self.index.close()
+
+    def fill(self):
+        self.index.store('wallet', [
+            (f't{i}', i, 1000 + i * 60, {'EVR': i}, {}, None)
+            for i in range(1, 11)])
+
+    def test_store(self):
+        self.index.store('wallet', [('a', 5, 1000, {'EVR': 10}, {'EVR': 20}, b'hi')])
+        self.index.store('wallet', [('b', 3, 900, {}, {}, None)])
+        self.assertEqual(self.index.lastHeight('wallet'), 5)
+        self.assertEqual(self.index.indexed('wallet'), {'a': 5, 'b': 3})
+        self.index.store('wallet', [('a', 6, 1060, {'EVR': 10}, {'EVR': 20}, b'hi')])
+        self.assertEqual(self.index.byHeight('wallet', limit=1), [{
+            'txid': 'a', 'height': 6, 'time': 1060,
+            'sent': {'EVR': 10}, 'received': {'EVR': 20}, 'memo': b'hi'}])
+        self.assertEqual(self.index.indexed('other'), {})
+
+    def test_byHeight_pages(self):
+        self.fill()
+        pages = [
+            [row['txid'] for row in self.index.byHeight('wallet', limit=4, offset=offset)]
+            for offset in (0, 4, 8)]
+        self.assertEqual(pages, [
+            ['t10', 't9', 't8', 't7'], ['t6', 't5', 't4', 't3'], ['t2', 't1']])
+        self.assertEqual(
+            [row['height'] for row in self.index.byHeight('wallet', start=3, end=5)],
+            [5, 4, 3])
+
+    def test_byTime_pages(self):
+        self.fill()
+        self.assertEqual(
+            [row['txid'] for row in self.index.byTime('wallet', start=1120, limit=2)],
+            ['t10', 't9'])
+        self.assertEqual(
+            [row['txid'] for row in self.index.byTime('wallet', start=1120, limit=2, offset=8)],
+            ['t2'])
+        self.assertEqual(self.index.byTime('wallet', end=1000), [])
+
+    def test_update(self):
+        server = Server(
+            history=[
+                {'tx_hash': 'b', 'height': 11},
+                {'tx_hash': 'c', 'height': 0}],
+            transactions={
+                'a': tx('a', 1),
+                'b': tx('b', 0.5, spends=[('a', 0)], time=1000),
+                'c': tx('c', 0.25, spends=[('b', 0)])})
+        self.assertEqual(self.index.update(server), 2)
+        # the new ones fresh, for their block time, the parent from the cache
+        self.assertEqual(server.fetched, [(['b', 'c'], False), (['a'], True)])
+        rows = {row['txid']: row for row in self.index.byHeight('wallet')}
+        self.assertEqual(rows['b']['time'], 1000)
+        self.assertEqual(rows['b']['sent'], {'EVR': 50000000})
+        self.assertEqual(rows['b']['received'], {'EVR': 100000000})
+        self.assertEqual(rows['c']['received'], {'EVR': 50000000})
+        self.assertEqual(self.index.lastHeight('wallet'), 11)
+        # confirmed and already indexed: nothing to fetch but c
+        server.fetched = []
+        self.assertEqual(self.index.update(server), 1)
+        self.assertEqual(server.fetched[0], (['c'], False))
+
+    def test_update_forgets_what_left_the_history(self):
+        server = Server(
+            history=[
+                {'tx_hash': 'a', 'height': 10},
+                {'tx_hash': 'b', 'height': 12},
+                {'tx_hash': 'c', 'height': 0}],
+            transactions={
+                'a': tx('a', 1, time=900),
+                'b': tx('b', 1, time=1000),
+                'c': tx('c', 1)})
+        self.index.update(server)
+        server.history = [{'tx_hash': 'a', 'height': 10}]
+        self.assertEqual(self.index.update(server), 0)
+        self.assertEqual(self.index.indexed('wallet'), {'a': 10})
+        self.assertEqual(self.index.lastHeight('wallet'), 10)
+
+    def test_follow_rolls_back_on_reorg(self):
+        self.fill()
+        self.index.store('other', [('x', 9, None, {}, {}, None)])
+        tracker = Tracker()
+        self.index.follow(tracker)
+        for callback in tracker.reorgCallbacks:
+            callback(8)
+        self.assertEqual(sorted(self.index.indexed('wallet').values()), list(range(1, 8)))
+        self.assertEqual(self.index.indexed('other'), {})
+        self.assertEqual(self.index.lastHeight('wallet'), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from concurrent.futures import Future
+
+from satoriwallet.api.blockchain.electrumx.electrumx import ElectrumxError
+from satoriwallet.api.holders import HolderScanner
+
+
+class Connection():
+    ''' answers holder pages from pages, never answering once they run out '''
+
+    def __init__(self, pages: list[dict], timeout: float = 0.05):
+        self.pages = pages
+        self.timeout = timeout
+        self.futures = []
+
+    def sendAsync(self, method: str, asset: str, _, pageSize: int, offset: int) -> Future:
+        future = Future()
+        if offset // pageSize < len(self.pages):
+            future.set_result({'result': self.pages[offset // pageSize]})
+        self.futures.append(future)
+        return future
+
+
+class Server():
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def _ensureConnected(self):
+        pass
+
+    def _requests(self) -> Connection:
+        return self.connection
+
+
+class TestHolderScanner(unittest.TestCase):
+
+    def test_scan(self):
+        connection = Connection([{'a': 1, 'b': 2}, {'c': 3}])
+        scanner = HolderScanner(Server(connection), pageSize=2, concurrency=2)
+        self.assertEqual(list(scanner.scan()), [('a', 1), ('b', 2), ('c', 3)])
+
+    def test_unanswered_page_fails_the_scan(self):
+        connection = Connection([{'a': 1, 'b': 2}])
+        scanner = HolderScanner(Server(connection), pageSize=2, concurrency=2)
+        with self.assertRaises(ElectrumxError):
+            list(scanner.scan())
+        # the lost request is failed, so a pool releases its session
+        self.assertIsInstance(connection.futures[1].exception(), ElectrumxError)
+
+
+if __name__ == '__main__':
+    unittest.main()
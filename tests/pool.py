@@ -0,0 +1,97 @@
+import unittest
+
+from satoriwallet.api.blockchain.electrumx.pool import ConnectionPool
+from satoriwallet.api.blockchain.electrumx.scoreboard import ServerScoreboard
+
+
+class Session():
+    ''' answers requests with answers[hostPort], raising it if it's an exception '''
+
+    def __init__(self, hostPort: str, answers: dict):
+        self.hostPort = hostPort
+        self.answers = answers
+        self.live = True
+        self.sent = 0
+
+    def connected(self) -> bool:
+        return self.live
+
+    def disconnect(self):
+        self.live = False
+
+    def send(self, method: str, *args, **kwargs):
+        self.sent += 1
+        answer = self.answers.get(self.hostPort, {'result': self.hostPort})
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def sendBatch(self, calls: list[tuple], **kwargs):
+        return [self.send(*call) for call in calls]
+
+
+class Pool(ConnectionPool):
+    ''' a ConnectionPool of Sessions, answers by host:port '''
+
+    def __init__(self, servers: list[str], answers: dict = None, **kwargs):
+        self.answers = answers if answers is not None else {}
+        self.opened: list[Session] = []
+        super().__init__(servers, scoreboard=ServerScoreboard(), **kwargs)
+
+    def _open(self, hostPort: str) -> Session:
+        session = Session(hostPort, self.answers)
+        self.opened.append(session)
+        return session
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_requests_spread_over_sessions(self):
+        pool = Pool(['a:1', 'b:1'], size=2)
+        self.assertEqual(len(pool.sessions), 2)
+        for _ in range(4):
+            pool.send('server.ping')
+        self.assertEqual([s.sent for s in pool.sessions], [2, 2])
+        self.assertEqual([pool.inflight[s] for s in pool.sessions], [0, 0])
+
+    def test_dead_sessions_are_dropped_on_acquire(self):
+        pool = Pool(['a:1', 'b:1'], size=2)
+        dead = pool.sessions[0]
+        dead.live = False
+        for _ in range(3):
+            pool.send('server.ping')
+        self.assertNotIn(dead, pool.sessions)
+        self.assertEqual(dead.sent, 0)
+
+    def test_unanswered_request_is_retried_elsewhere(self):
+        pool = Pool(['a:1', 'b:1'], size=2, answers={'a:1': None})
+        first = min(pool.sessions, key=lambda s: s.hostPort)
+        # make a:1 the least used so it's picked first
+        pool.used[first] = -1
+        self.assertEqual(pool.send('server.ping'), {'result': 'b:1'})
+        self.assertNotIn(first, pool.sessions)
+        self.assertFalse(first.live)
+        self.assertEqual(pool.scoreboard.get('a:1').errors, 1)
+
+    def test_failed_request_is_retried_elsewhere(self):
+        pool = Pool(['a:1', 'b:1'], size=2, answers={'a:1': ConnectionError('closed')})
+        first = min(pool.sessions, key=lambda s: s.hostPort)
+        pool.used[first] = -1
+        self.assertEqual(pool.sendBatch([('server.ping',)]), [{'result': 'b:1'}])
+        self.assertNotIn(first, pool.sessions)
+
+    def test_unanswered_with_nowhere_else_to_go(self):
+        pool = Pool(['a:1'], size=1, answers={'a:1': None})
+        self.assertIsNone(pool.send('server.ping'))
+        self.assertEqual(pool.sessions, [])
+
+    def test_second_failure_is_raised(self):
+        error = ConnectionError('closed')
+        pool = Pool(['a:1', 'b:1'], size=2, answers={'a:1': error, 'b:1': error})
+        with self.assertRaises(ConnectionError):
+            pool.send('server.ping')
+        self.assertEqual(pool.sessions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+from satoriwallet.api.blockchain.electrumx.ratelimit import TokenBucket, RateLimiter
+
+
+class Clock():
+    ''' a time.monotonic that only moves when told to '''
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch(
+            'satoriwallet.api.blockchain.electrumx.ratelimit.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        for _ in range(5):
+            self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+    def test_refill_is_capped_at_burst(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        bucket.reserve(5)
+        self.clock.now += 0.3
+        self.assertAlmostEqual(bucket.reserve(3), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.clock.now += 60
+        self.assertEqual(bucket.reserve(5), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_cost_above_burst_goes_into_debt(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        self.assertAlmostEqual(bucket.reserve(8), 0.3)
+        # the debt is paid off before anyone else goes
+        self.assertAlmostEqual(bucket.reserve(), 0.4)
+        self.clock.now += 0.4
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_slowDown_halves_down_to_floor(self):
+        bucket = TokenBucket(rate=10, burst=5, floor=2)
+        bucket.slowDown()
+        self.assertEqual(bucket.rate, 5)
+        # tokens in hand are given up, the next request waits
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+        bucket.slowDown()
+        bucket.slowDown()
+        self.assertEqual(bucket.rate, 2)
+
+    def test_speedUp_creeps_back_to_ceiling(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        bucket.slowDown()
+        for _ in range(10):
+            bucket.speedUp()
+        self.assertAlmostEqual(bucket.rate, 6)
+        for _ in range(100):
+            bucket.speedUp()
+        self.assertEqual(bucket.rate, 10)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_methods_share_their_class_bucket_per_server(self):
+        limiter = RateLimiter(classes={'scripthash': (10, 2)})
+        self.assertEqual(limiter.methodClass('blockchain.scripthash.get_balance'), 'scripthash')
+        self.assertEqual(limiter.methodClass('server.ping'), 'default')
+        self.assertEqual(limiter.reserve('a:1', [
+            'blockchain.scripthash.get_balance',
+            'blockchain.scripthash.listunspent',
+            'server.ping']), 0)
+        self.assertGreater(limiter.reserve('a:1', ['blockchain.scripthash.get_history']), 0)
+        self.assertEqual(limiter.reserve('b:1', ['blockchain.scripthash.get_history']), 0)
+        self.assertEqual(limiter.reserve('a:1', ['server.ping']), 0)
+
+    def test_limited(self):
+        self.assertTrue(RateLimiter.limited(
+            {'error': {'code': -101, 'message': 'excessive resource usage'}}))
+        self.assertTrue(RateLimiter.limited({'error': {'message': 'Server busy, try later'}}))
+        self.assertFalse(RateLimiter.limited({'error': {'message': 'unknown method'}}))
+        self.assertFalse(RateLimiter.limited({'error': 'rate limit'}))
+        self.assertFalse(RateLimiter.limited({'result': 1}))
+        self.assertFalse(RateLimiter.limited(None))
+
+    def test_observe(self):
+        limiter = RateLimiter(classes={'default': (10, 5)})
+        bucket = limiter.bucket('a:1', 'default')
+        limiter.observe('a:1', 'server.ping', {'error': {'message': 'rate limit'}})
+        self.assertEqual(bucket.rate, 5)
+        limiter.observe('a:1', 'server.ping', {'result': None})
+        self.assertAlmostEqual(bucket.rate, 5.1)
+        # no answer is no evidence either way
+        limiter.observe('a:1', 'server.ping', None)
+        self.assertAlmostEqual(bucket.rate, 5.1)
+
+    def test_observeBatch_slows_once_per_method(self):
+        limiter = RateLimiter(classes={'default': (16, 5)})
+        bucket = limiter.bucket('a:1', 'default')
+        limited = {'error': {'message': 'too many requests'}}
+        limiter.observeBatch(
+            'a:1',
+            [('server.ping',), ('server.ping',), ('server.version',)],
+            [limited, limited, limited])
+        self.assertEqual(bucket.rate, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
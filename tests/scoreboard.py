@@ -0,0 +1,63 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from satoriwallet.api.blockchain.electrumx.scoreboard import ServerScoreboard
+
+
+class Connection():
+
+    def __init__(self, hostPort: str):
+        self.hostPort = hostPort
+        self.closed = []
+
+    def disconnect(self):
+        self.closed.append('connection')
+
+    def disconnectSubscriptions(self):
+        self.closed.append('subscriptions')
+
+
+class TestServerScoreboard(unittest.TestCase):
+
+    def test_race_closes_every_socket_of_the_losers(self):
+        opened = []
+        slow = threading.Event()
+
+        def factory(hostPort: str) -> Connection:
+            if hostPort != 'fast:1':
+                slow.wait(1)
+            connection = Connection(hostPort)
+            opened.append(connection)
+            if hostPort == 'fast:1':
+                slow.set()
+            return connection
+        winner = ServerScoreboard().connect(['fast:1', 'slow:1', 'slow:2'], factory, race=3)
+        self.assertEqual(winner.hostPort, 'fast:1')
+        deadline = time.time() + 2
+        while len(opened) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(winner.closed, [])
+        for connection in opened:
+            if connection is not winner:
+                self.assertEqual(connection.closed, ['connection', 'subscriptions'])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scoreboard.json')
+            scoreboard = ServerScoreboard(path=path)
+            scoreboard.recordRtt('a:1', 0.5)
+            scoreboard.recordError('b:1')
+            scoreboard.save()
+            self.assertEqual(os.listdir(directory), ['scoreboard.json'])
+            loaded = ServerScoreboard(path=path)
+            self.assertEqual(loaded.get('a:1').rtt, 0.5)
+            self.assertEqual(loaded.get('b:1').errors, 1)
+            self.assertFalse(loaded.available('b:1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import threading
+import unittest
+
+from satoriwallet.api.blockchain.electrumx.asyncelectrumx import AsyncElectrumx
+from satoriwallet.api.blockchain.electrumx.subscriptions import SubscriptionManager
+
+
+class Connection():
+    ''' answers subscribes from statuses, failing the scripthashes in failing '''
+
+    def __init__(self, statuses: dict, failing: set = ()):
+        self.statuses = statuses
+        self.failing = set(failing)
+        self.sent = []
+        self.live = True
+
+    def connected(self) -> bool:
+        return self.live
+
+    def disconnect(self):
+        self.live = False
+
+    def send(self, method: str, *args):
+        self.sent.append((method, *args))
+        if len(args) > 0 and args[0] in self.failing:
+            return None
+        if method == 'blockchain.headers.subscribe':
+            return {'result': {'height': 7, 'hex': '00'}}
+        return {'result': self.statuses.get(args[0]) if len(args) > 0 else None}
+
+
+def manager(conn: Connection) -> SubscriptionManager:
+    ''' a SubscriptionManager on conn, without its threads '''
+    manager = SubscriptionManager.__new__(SubscriptionManager)
+    manager.lock = threading.Lock()
+    manager.scripthashCallbacks = {}
+    manager.statuses = {}
+    manager.headerCallbacks = []
+    manager.header = None
+    manager.pending = set()
+    manager.headersPending = False
+    manager.notifications = queue.Queue()
+    manager.conn = conn
+    return manager
+
+
+def drain(manager: SubscriptionManager) -> list[dict]:
+    notifications = []
+    while not manager.notifications.empty():
+        notifications.append(manager.notifications.get())
+    return notifications
+
+
+class TestSubscriptionManager(unittest.TestCase):
+
+    def test_subscribe_once_per_scripthash(self):
+        conn = Connection({'a': 'sa'})
+        subscriptions = manager(conn)
+        self.assertEqual(subscriptions.subscribeScripthash('a', print), 'sa')
+        self.assertEqual(subscriptions.subscribeScripthash('a', repr), 'sa')
+        self.assertEqual(conn.sent, [('blockchain.scripthash.subscribe', 'a')])
+
+    def test_failed_subscribe_is_unregistered(self):
+        conn = Connection({'a': 'sa'}, failing={'a'})
+        subscriptions = manager(conn)
+        with self.assertRaises(Exception):
+            subscriptions.subscribeScripthash('a', print)
+        self.assertEqual(subscriptions.scripthashCallbacks, {})
+        conn.failing = set()
+        self.assertEqual(subscriptions.subscribeScripthash('a', print), 'sa')
+
+    def test_reconnect_replays_each_subscription_until_taken(self):
+        first = Connection({'a': 'sa', 'b': 'sb', 'c': 'sc'})
+        subscriptions = manager(first)
+        for scripthash in ('a', 'b', 'c'):
+            subscriptions.subscribeScripthash(scripthash, print)
+        subscriptions.subscribeHeaders(print)
+        drain(subscriptions)
+        # a changed while we were away, b can't be subscribed to at first
+        second = Connection({'a': 'sa2', 'b': 'sb', 'c': 'sc'}, failing={'b'})
+        subscriptions._connect = lambda: second
+        first.live = False
+        subscriptions._check()
+        self.assertIs(subscriptions.conn, second)
+        self.assertEqual(subscriptions.pending, {'b'})
+        self.assertFalse(subscriptions.headersPending)
+        self.assertEqual(
+            sorted(args for method, *args in second.sent if method == 'blockchain.scripthash.subscribe'),
+            [['a'], ['b'], ['c']])
+        notifications = drain(subscriptions)
+        self.assertEqual(notifications[0]['method'], 'blockchain.headers.subscribe')
+        self.assertEqual(
+            [n['params'] for n in notifications[1:]],
+            [['a', 'sa2']])
+        # still connected, so the next check only retries b
+        second.failing = set()
+        second.sent = []
+        subscriptions._check()
+        self.assertEqual(second.sent, [('blockchain.scripthash.subscribe', 'b')])
+        self.assertEqual(subscriptions.pending, set())
+        self.assertEqual(drain(subscriptions), [])
+
+    def test_unsubscribed_scripthashes_are_not_replayed(self):
+        conn = Connection({'a': 'sa'}, failing={'a'})
+        subscriptions = manager(conn)
+        subscriptions.scripthashCallbacks['a'] = [print]
+        subscriptions.pending = {'a'}
+        subscriptions.replay()
+        self.assertEqual(subscriptions.pending, {'a'})
+        subscriptions.unsubscribeScripthash('a')
+        conn.sent = []
+        subscriptions.replay()
+        self.assertEqual(subscriptions.pending, set())
+        self.assertEqual(conn.sent, [])
+
+
+class TestAsyncSubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.client = AsyncElectrumx('localhost', 50001)
+        self.responses = []
+
+        async def send(method, *args):
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.client.send = send
+
+    def test_failed_subscribes_are_unregistered(self):
+        self.responses = [None, ConnectionError('closed'), {'error': 'busy'}, {'result': 'sa'}]
+        self.assertIsNone(asyncio.run(self.client.subscribeScripthash('a', print)))
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.client.subscribeScripthash('a', print))
+        self.assertEqual(asyncio.run(self.client.subscribeScripthash('a', print)), {'error': 'busy'})
+        self.assertEqual(self.client.scripthashCallbacks, {})
+        # the next subscriber asks the server rather than taking a None status
+        self.assertEqual(asyncio.run(self.client.subscribeScripthash('a', print)), {'result': 'sa'})
+        self.assertEqual(self.client.scripthashCallbacks, {'a': [print]})
+
+    def test_failed_header_subscribe_is_unregistered(self):
+        self.responses = [None, ConnectionError('closed'), {'result': {'height': 1}}]
+        asyncio.run(self.client.subscribeHeaders(print))
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.client.subscribeHeaders(print))
+        self.assertEqual(self.client.headerCallbacks, [])
+        asyncio.run(self.client.subscribeHeaders(print))
+        self.assertEqual(self.client.headerCallbacks, [print])
+
+
+if __name__ == '__main__':
+    unittest.main()
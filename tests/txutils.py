@@ -4,6 +4,10 @@ import unittest
 
 import base58
 from satoriwallet import TxUtils
+from satoriwallet.lib.transaction import TransactionDecoder, CoinSelector, FeeEstimator
+from satoriwallet.lib import validateAddresses, AddressReason
+from satoriwallet.lib.ethereum.valid_eth import checksumAddresses
+from satoriwallet.lib.cache import LRUCache
 
 
 class TestTxUtils(unittest.TestCase):
@@ -85,6 +89,114 @@ class TestTxUtils(unittest.TestCase):
         self.assertEqual(TxUtils.hash160ToAddress(
             '99f2e5e5c46e84b30697ddd61b18664340d07512', (33).to_bytes(1, 'big')), 'EXBurnXXXXXXXXXXXXXXXXXXXXXXZ8ZjfN')
 
+    def test_addressToScripthash(self):
+        # the example from the electrumx protocol docs
+        self.assertEqual(TxUtils.addressToScripthash(
+            '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa'), '8b01df4e368ea28f8dc0423bcf7a4923e3a12d307c875e47a0cfbf90b5c39161')
+
+
+class TestTransactionDecoder(unittest.TestCase):
+
+    def test_inputsMatchedByTxidAndN(self):
+        parentA = {'txid': 'a', 'vout': [
+            {'n': 0, 'value': 0.1},
+            {'n': 1, 'asset': {'name': 'SATORI', 'amount': 2.5}}]}
+        parentB = {'txid': 'b', 'vout': [
+            {'n': 0, 'value': 0.2, 'valueSat': 20000000},
+            {'n': 1, 'value': 7}]}
+        tx = {'txid': 't', 'vin': [
+            {'txid': 'a', 'vout': 1},
+            {'txid': 'b', 'vout': 0}], 'vout': [
+            {'n': 0, 'value': 0.3},
+            {'n': 1, 'asset': {'name': 'SATORI', 'amount': 2.5}}]}
+        decoded = TransactionDecoder().decode([tx], supporting=[parentA, parentB])
+        self.assertEqual(decoded.byTxid(), {'t': {
+            'EVR': (30000000, 20000000),
+            'SATORI': (250000000, 250000000)}})
+
+
+class TestCoinSelector(unittest.TestCase):
+
+    def test_exactMatchNeedsNoChange(self):
+        selector = CoinSelector(feeRate=1)
+        utxos = [
+            {'tx_hash': 'a', 'tx_pos': 0, 'value': 5000},
+            {'tx_hash': 'b', 'tx_pos': 0, 'value': 3000 + 148 + 10 + 34},
+            {'tx_hash': 'c', 'tx_pos': 0, 'value': 9000}]
+        selection = selector.select(utxos, 3000)
+        self.assertEqual(selection.outpoints(), [('b', 0)])
+        self.assertEqual(selection.change, 0)
+
+    def test_largestFirstWithChange(self):
+        selector = CoinSelector(feeRate=1)
+        utxos = [
+            {'tx_hash': 'a', 'tx_pos': 0, 'value': 5000},
+            {'tx_hash': 'b', 'tx_pos': 0, 'value': 100000}]
+        selection = selector.select(utxos, 10000, exclude=[('a', 0)])
+        self.assertEqual(selection.outpoints(), [('b', 0)])
+        self.assertEqual(selection.fee, selection.size)
+        self.assertEqual(selection.change, 100000 - 10000 - selection.fee)
+
+
+class TestFeeEstimator(unittest.TestCase):
+
+    def test_size(self):
+        estimator = FeeEstimator()
+        # 1 input, 1 output: the common 192 byte transaction
+        self.assertEqual(estimator.size(['p2pkh'], ['p2pkh']), 192)
+        # SATORI transfer script: 25 + OP_RVN_ASSET + push + 19 + OP_DROP
+        self.assertEqual(estimator.assetOutputSize('SATORI', 'evr'), 8 + 1 + 47)
+        self.assertEqual(FeeEstimator.memoOutputSize('a' * 80), 8 + 1 + 83)
+        self.assertEqual(
+            estimator.size(['p2pkh', 'p2pkh'], ['p2pkh'], assetOutputs=2, memo=b'hi'),
+            10 + 2 * 148 + 34 + 2 * 56 + 8 + 1 + 4)
+
+    def test_feeRateCachedPerBlock(self):
+        class Server():
+            calls = 0
+            headerTracker = type('Tracker', (), {'tip': 100})()
+
+            def batch(self, calls):
+                Server.calls += 1
+                return [0.01, 0.02]
+        server = Server()
+        estimator = FeeEstimator(server)
+        self.assertEqual(estimator.feeRate(), 2000)
+        self.assertEqual(estimator.feeRate(), 2000)
+        self.assertEqual(Server.calls, 1)
+        server.headerTracker.tip = 101
+        estimator.feeRate()
+        self.assertEqual(Server.calls, 2)
+
+
+class TestValidateAddresses(unittest.TestCase):
+
+    def test_reasons(self):
+        evr = 'EXBurnXXXXXXXXXXXXXXXXXXXXXXZ8ZjfN'
+        rvn = 'RXBurnXXXXXXXXXXXXXXXXXXXXXXWUo9FV'
+        self.assertEqual(list(validateAddresses([evr, rvn, evr[:-1] + 'M'], 'evr')), [
+            AddressReason.valid, AddressReason.format, AddressReason.checksum])
+        self.assertEqual(list(validateAddresses([rvn], 'ravencoin')), [AddressReason.valid])
+        self.assertEqual(list(validateAddresses([
+            '0x32Be343B94f860124dC4fEe278FDCBD38C102D88',
+            '0x32be343b94f860124dc4fee278fdcbd38c102d88',
+            '0x32Be343B94f860124dC4fEe278FDCBD38C102d88'], 'eth')), [
+            AddressReason.valid, AddressReason.valid, AddressReason.checksum])
+
+    def test_checksumAddresses(self):
+        checksummed = '0x32Be343B94f860124dC4fEe278FDCBD38C102D88'
+        self.assertEqual(checksumAddresses([
+            checksummed.lower(),
+            checksummed,
+            '0x32Be343B94f860124dC4fEe278FDCBD38C102d88',
+            '0x32be']), [checksummed, checksummed, None, None])
+
+    def test_checksumAddresses_uses_given_cache(self):
+        cache = LRUCache(maxsize=5)
+        checksummed = '0x32Be343B94f860124dC4fEe278FDCBD38C102D88'
+        self.assertEqual(checksumAddresses([checksummed], cache), [checksummed])
+        self.assertEqual(cache.get(checksummed.lower()), checksummed)
+
 
 @staticmethod
 def hash160ToAddress(pubKeyHash: Union[str, bytes], networkByte: bytes = b'\x3c'):